@@ -168,6 +168,10 @@ def create_app(config_name="development"):
             "public.index",
             "public.scripts",
             "explore.index",
+            "explore.cone_search",
+            "explore.autocomplete",
+            "explore.cache_stats",
+            "explore.facet_snapshot",
             "team.index",
             "dataset.list_dataset_comments",
             "dataset.download_dataset",
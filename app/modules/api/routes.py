@@ -1,3 +1,5 @@
+import os
+
 from flask import flash, jsonify, redirect, render_template, request, url_for
 from flask_login import current_user, login_required
 
@@ -6,7 +8,17 @@ from app.modules.api import api_bp
 from app.modules.api.forms import ApiKeyForm, RevokeApiKeyForm
 from app.modules.api.models import ApiKey
 from app.modules.api.services import limiter, require_api_key
-from app.modules.dataset.models import DataSet, DSMetaData
+from app.modules.dataset.crossmatch import MAX_CROSSMATCH_RADIUS_ARCSEC, observation_index, parse_sources
+from app.modules.dataset.models import DataSet, DSMetaData, Observation
+from app.modules.dataset.repositories import ObservationRepository
+from app.modules.dataset.sky import parse_cone_arguments
+from app.modules.explore.repositories import (
+    OBSERVATION_FILTERS,
+    STREAM_BATCH_SIZE,
+    ExploreRepository,
+    observation_conditions,
+)
+from core.serialisers.ndjson import ndjson_response, wants_ndjson
 
 
 @api_bp.route("/manage", methods=["GET"])
@@ -174,35 +186,125 @@ def list_datasets(api_key_obj):
     GET /api/datasets
     Headers: X-API-Key: your_api_key_here
 
-    Devuelve TODOS los datasets sin paginación
+    Devuelve TODOS los datasets sin paginación. Con "Accept: application/x-ndjson"
+    se envían en streaming, un dataset por línea.
+
+    Filtros opcionales sobre la observación: object_name, filter_used,
+    observed_after / observed_before (YYYY-MM-DD), magnitude_min / magnitude_max.
+    Ej.: /api/datasets?object_name=M31&filter_used=R&magnitude_max=12&observed_after=2024-01-01
     """
     try:
-        datasets = DataSet.query.all()
+        conditions = observation_conditions(**{name: request.args.get(name) for name in OBSERVATION_FILTERS})
+    except ValueError as exc:
+        return jsonify({"error": "bad_request", "message": str(exc)}), 400
 
-        results = []
-        for dataset in datasets:
-            metadata = DSMetaData.query.get(dataset.ds_meta_data_id) if dataset.ds_meta_data_id else None
+    try:
+        # Metadata comes in the same row, so yield_per never has to issue another query
+        rows = (
+            db.session.query(DataSet, DSMetaData)
+            .outerjoin(DSMetaData, DataSet.ds_meta_data_id == DSMetaData.id)
+            .order_by(DataSet.id)
+        )
+        if conditions:
+            rows = rows.join(Observation, Observation.ds_meta_data_id == DSMetaData.id).filter(*conditions)
 
-            results.append(
-                {
-                    "id": dataset.id,
-                    "title": metadata.title if metadata else None,
-                    "description": metadata.description if metadata else None,
-                    "publication_type": (
-                        metadata.publication_type.value if metadata and metadata.publication_type else None
-                    ),
-                    "tags": metadata.tags if metadata else None,
-                    "created_at": dataset.created_at.isoformat() if dataset.created_at else None,
-                    "user_id": dataset.user_id,
-                }
+        if wants_ndjson():
+            return ndjson_response(
+                _dataset_summary(dataset, metadata) for dataset, metadata in rows.yield_per(STREAM_BATCH_SIZE)
             )
 
+        results = [_dataset_summary(dataset, metadata) for dataset, metadata in rows]
+
         return jsonify({"total": len(results), "datasets": results}), 200
 
     except Exception as e:
         return jsonify({"error": "internal_error", "message": str(e)}), 500
 
 
+def _dataset_summary(dataset, metadata):
+    return {
+        "id": dataset.id,
+        "title": metadata.title if metadata else None,
+        "description": metadata.description if metadata else None,
+        "publication_type": metadata.publication_type.value if metadata and metadata.publication_type else None,
+        "tags": metadata.tags if metadata else None,
+        "created_at": dataset.created_at.isoformat() if dataset.created_at else None,
+        "user_id": dataset.user_id,
+    }
+
+
+@api_bp.route("/datasets/cone", methods=["GET"])
+@limiter.limit("100 per hour")
+@require_api_key(scope="read:datasets")
+def cone_search_datasets(api_key_obj):
+    """
+    GET /api/datasets/cone?ra=83.82&dec=-5.39&radius=0.5
+    Headers: X-API-Key: your_api_key_here
+
+    Datasets con una observación a menos de `radius` grados de (ra, dec), la más cercana primero.
+    ra y dec en grados o sexagesimales (hh:mm:ss / dd:mm:ss).
+    """
+    try:
+        ra, dec, radius = parse_cone_arguments(request.args)
+    except ValueError as exc:
+        return jsonify({"error": "bad_request", "message": str(exc)}), 400
+
+    try:
+        results = []
+        for dataset, observation, separation in ExploreRepository().cone_search(ra, dec, radius, published_only=False):
+            result = _dataset_summary(dataset, dataset.ds_meta_data)
+            result["object_name"] = observation.object_name
+            result["ra_deg"] = observation.ra_deg
+            result["dec_deg"] = observation.dec_deg
+            result["separation_deg"] = round(separation, 6)
+            results.append(result)
+
+        return jsonify({"ra": ra, "dec": dec, "radius": radius, "total": len(results), "datasets": results}), 200
+
+    except Exception as e:
+        return jsonify({"error": "internal_error", "message": str(e)}), 500
+
+
+@api_bp.route("/crossmatch", methods=["POST"])
+@limiter.limit("20 per hour")
+@require_api_key(scope="read:datasets")
+def crossmatch_sources(api_key_obj):
+    """
+    POST /api/crossmatch?radius=2
+    Headers: X-API-Key: your_api_key_here
+
+    Cruza una lista de posiciones (CSV con columnas ra, dec e id opcional, o JSON
+    [{"ra", "dec", "id"}] / [[ra, dec]]) con todas las observaciones. Se envía como
+    fichero "file" o en el cuerpo. radius en segundos de arco (1 por defecto).
+    Responde en streaming NDJSON, una línea por cada pareja fuente/observación.
+    """
+    try:
+        radius = float(request.args.get("radius", 1.0))
+        if not 0 < radius <= MAX_CROSSMATCH_RADIUS_ARCSEC:
+            raise ValueError(f"radius must be within (0, {MAX_CROSSMATCH_RADIUS_ARCSEC:g}] arcseconds")
+
+        upload = request.files.get("file")
+        if upload is not None:
+            content = upload.read().decode("utf-8-sig")
+            extension = os.path.splitext(upload.filename or "")[1].lower()
+            fmt = {".json": "json", ".csv": "csv"}.get(extension)
+        else:
+            content = request.get_data(as_text=True)
+            fmt = "json" if request.is_json else "csv" if request.mimetype == "text/csv" else None
+        sources = parse_sources(content, fmt)
+    except (ValueError, UnicodeDecodeError) as exc:
+        return jsonify({"error": "bad_request", "message": str(exc)}), 400
+
+    observation_index.ensure_fresh(ObservationRepository())
+
+    def matches():
+        for match in observation_index.crossmatch(sources, radius / 3600):
+            match["separation_arcsec"] = round(match.pop("separation") * 3600, 4)
+            yield match
+
+    return ndjson_response(matches())
+
+
 @api_bp.route("/search", methods=["GET"])
 @limiter.limit("100 per hour")
 @require_api_key(scope="read:datasets")
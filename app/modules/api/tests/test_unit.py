@@ -1,3 +1,4 @@
+import json
 from datetime import datetime, timedelta
 from unittest.mock import Mock, patch
 
@@ -364,6 +365,151 @@ class TestApiRoutes:
                 response = client.get(endpoint, headers=headers)
                 assert response.status_code in [200, 404, 500]
 
+    @patch("app.modules.api.services.ApiKey.query")
+    def test_list_datasets_streams_ndjson(self, mock_query, client, app, user):
+        """Test que /api/datasets envía un dataset por línea con Accept: application/x-ndjson"""
+        from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+
+        with app.app_context():
+            mock_key = Mock()
+            mock_key.has_scope.return_value = True
+            mock_query.filter_by.return_value.first.return_value = mock_key
+
+            for i in range(3):
+                metadata = DSMetaData(
+                    title=f"Dataset {i}", description="Streamed", publication_type=PublicationType.DATA_PAPER
+                )
+                db.session.add(DataSet(user_id=user.id, ds_meta_data=metadata))
+            db.session.commit()
+
+            response = client.get("/api/datasets", headers={"X-API-Key": "test-key", "Accept": "application/x-ndjson"})
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+            assert response.status_code == 200
+            assert response.mimetype == "application/x-ndjson"
+            assert [line["title"] for line in lines] == ["Dataset 0", "Dataset 1", "Dataset 2"]
+
+            response = client.get("/api/datasets", headers={"X-API-Key": "test-key"})
+            assert response.get_json()["total"] == 3
+
+    @patch("app.modules.api.services.ApiKey.query")
+    def test_cone_search_datasets(self, mock_query, client, app, user):
+        """Test de búsqueda por cono sobre las coordenadas de las observaciones"""
+        from app.modules.dataset.models import DataSet, DSMetaData, Observation, PublicationType
+
+        with app.app_context():
+            mock_key = Mock()
+            mock_key.has_scope.return_value = True
+            mock_query.filter_by.return_value.first.return_value = mock_key
+
+            for name, ra, dec in [("M42", "05:35:17.3", "-05:23:28"), ("M31", "00:42:44.3", "+41:16:07.5")]:
+                observation = Observation(
+                    object_name=name, ra=ra, dec=dec, observation_date=datetime(2024, 1, 1).date()
+                )
+                metadata = DSMetaData(
+                    title=name,
+                    description="Cone",
+                    publication_type=PublicationType.DATA_PAPER,
+                    observation=observation,
+                )
+                db.session.add(DataSet(user_id=user.id, ds_meta_data=metadata))
+            db.session.commit()
+
+            headers = {"X-API-Key": "test-key"}
+            response = client.get("/api/datasets/cone?ra=83.82&dec=-5.39&radius=0.5", headers=headers)
+            data = response.get_json()
+
+            assert response.status_code == 200
+            assert [dataset["object_name"] for dataset in data["datasets"]] == ["M42"]
+            assert data["datasets"][0]["separation_deg"] < 0.01
+
+            response = client.get("/api/datasets/cone?ra=83.82&dec=-5.39", headers=headers)
+            assert response.status_code == 400
+
+    @patch("app.modules.api.services.ApiKey.query")
+    def test_list_datasets_observation_filters(self, mock_query, client, app, user):
+        """Test de filtros sobre la observación en el listado de datasets"""
+        from app.modules.dataset.models import DataSet, DSMetaData, Observation, PublicationType
+
+        with app.app_context():
+            mock_key = Mock()
+            mock_key.has_scope.return_value = True
+            mock_query.filter_by.return_value.first.return_value = mock_key
+
+            for title, filter_used, magnitude in [("R bright", "R", 11.0), ("R faint", "R", 14.0), ("V", "V", 10.0)]:
+                observation = Observation(
+                    object_name="M31",
+                    ra="00:42:44.3",
+                    dec="+41:16:07.5",
+                    magnitude=magnitude,
+                    filter_used=filter_used,
+                    observation_date=datetime(2024, 3, 1).date(),
+                )
+                metadata = DSMetaData(
+                    title=title,
+                    description="Filters",
+                    publication_type=PublicationType.DATA_PAPER,
+                    observation=observation,
+                )
+                db.session.add(DataSet(user_id=user.id, ds_meta_data=metadata))
+            db.session.commit()
+
+            headers = {"X-API-Key": "test-key"}
+            response = client.get(
+                "/api/datasets?object_name=M31&filter_used=R&magnitude_max=12&observed_after=2024-01-01",
+                headers=headers,
+            )
+            data = response.get_json()
+
+            assert response.status_code == 200
+            assert [dataset["title"] for dataset in data["datasets"]] == ["R bright"]
+
+            response = client.get("/api/datasets?observed_before=yesterday", headers=headers)
+            assert response.status_code == 400
+
+    @patch("app.modules.api.services.ApiKey.query")
+    def test_crossmatch_streams_matches(self, mock_query, client, app, user):
+        """Test de cruce de un CSV de posiciones con las observaciones"""
+        import io
+
+        from app.modules.dataset.crossmatch import observation_index
+        from app.modules.dataset.models import DataSet, DSMetaData, Observation, PublicationType
+
+        with app.app_context():
+            mock_key = Mock()
+            mock_key.has_scope.return_value = True
+            mock_query.filter_by.return_value.first.return_value = mock_key
+
+            observation = Observation(
+                object_name="M42", ra="05:35:17.3", dec="-05:23:28", observation_date=datetime(2024, 1, 1).date()
+            )
+            metadata = DSMetaData(
+                title="Orion", description="Cone", publication_type=PublicationType.DATA_PAPER, observation=observation
+            )
+            db.session.add(DataSet(user_id=user.id, ds_meta_data=metadata))
+            db.session.commit()
+            observation_index.clear()
+
+            headers = {"X-API-Key": "test-key"}
+            sources = "id,ra,dec\nnear,83.8221,-5.3911\nfar,10,10\n"
+            response = client.post(
+                "/api/crossmatch?radius=2",
+                headers=headers,
+                data={"file": (io.BytesIO(sources.encode()), "sources.csv")},
+                content_type="multipart/form-data",
+            )
+            lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+            assert response.status_code == 200
+            assert [(line["source_id"], line["object_name"]) for line in lines] == [("near", "M42")]
+            assert lines[0]["separation_arcsec"] < 2
+
+            response = client.post("/api/crossmatch", headers=headers, json=[[83.8221, -5.3911], [83.9, -5.3911]])
+            assert [json.loads(line)["source_id"] for line in response.get_data(as_text=True).splitlines()] == [0]
+
+            response = client.post("/api/crossmatch?radius=1e6", headers=headers, json=[[1, 2]])
+            assert response.status_code == 400
+
     def test_api_blueprint_registered(self, app):
         """Test que el blueprint API está registrado"""
         assert "api" in [bp.name for bp in app.blueprints.values()]
@@ -2,12 +2,15 @@ import pytest
 
 from app import create_app, db
 from app.modules.auth.models import User
+from app.modules.dataset.tracking import tracking_buffer
 
 
 @pytest.fixture(scope="session")
 def test_app():
     """Create and configure a new app instance for each test session."""
     test_app = create_app("testing")
+    # Download and view tracking is written through, so routes can be checked right after a request
+    tracking_buffer.flush_interval = 0
 
     with test_app.app_context():
         # Imprimir los blueprints registrados
@@ -18,6 +21,7 @@ def test_app():
 @pytest.fixture(scope="function")
 def test_isolated_client(test_app):
     # Estado limpio de BD antes del test
+    tracking_buffer.clear()
     db.session.remove()
     db.drop_all()
     db.create_all()
@@ -38,6 +42,7 @@ def test_isolated_client(test_app):
 @pytest.fixture(scope="function")
 def test_isolated_client(test_app):
     # Estado limpio de BD antes del test
+    tracking_buffer.clear()
     db.session.remove()
     db.drop_all()
     db.create_all()
@@ -64,6 +69,7 @@ def test_client(test_app):
 
             db.drop_all()
             db.create_all()
+            tracking_buffer.clear()
             """
             The test suite always includes the following user in order to avoid repetition
             of its creation
@@ -83,6 +89,8 @@ def test_client(test_app):
 
 @pytest.fixture(scope="function")
 def clean_database():
+    # Ids are reused once the tables are recreated, so forget the events tracked before
+    tracking_buffer.clear()
     db.session.remove()
     db.drop_all()
     db.create_all()
@@ -0,0 +1,307 @@
+"""
+ZIP archives of dataset files, streamed to the client while they are written.
+
+ZipFile writes into an in-memory sink that cannot seek, so every entry
+carries its sizes and CRC in a data descriptor after the file data instead
+of in a header patched afterwards. Files are copied CHUNK_SIZE bytes at a
+time and the sink is drained after every chunk: memory stays at about one
+chunk per download whatever the size of the dataset. Entries are stored
+uncompressed, as before.
+
+DatasetArchiveCache keeps the archives of recently downloaded datasets on
+disk, so they are not zipped again on every download.
+"""
+
+import contextlib
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+import zipfile
+
+from flask import Response, send_file
+
+logger = logging.getLogger(__name__)
+
+ZIP_MIMETYPE = "application/zip"
+
+CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", str(256 * 1024)))
+
+# Bumped whenever the archive layout changes, so archives cached before are not served
+ARCHIVE_FORMAT = "1"
+
+# Partial archives left behind by a killed worker are removed after this long
+STALE_PARTIAL_SECONDS = 3600
+
+
+class _ChunkSink:
+    """Write-only file object that keeps what ZipFile writes until it is drained."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(entries, chunk_size: int = CHUNK_SIZE, missing: list = None):
+    """
+    Yield the bytes of a ZIP archive of (path, arcname) entries. Paths that
+    do not exist are left out, and their arcname appended to missing when
+    it is given.
+    """
+    sink = _ChunkSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as archive:
+        for path, arcname in entries:
+            try:
+                # file_size is known beforehand, so ZIP64 is used for entries that need it
+                info = zipfile.ZipInfo.from_file(path, arcname, strict_timestamps=False)
+                source = open(path, "rb")
+            except FileNotFoundError:
+                if missing is not None:
+                    missing.append(arcname)
+                continue
+            with source, archive.open(info, "w") as target:
+                while chunk := source.read(chunk_size):
+                    target.write(chunk)
+                    yield sink.drain()
+            if data := sink.drain():
+                yield data
+    if data := sink.drain():
+        yield data
+
+
+def _streamed_zip(chunks, download_name: str) -> Response:
+    response = Response(chunks, mimetype=ZIP_MIMETYPE)
+    response.headers.set("Content-Disposition", "attachment", filename=download_name)
+    # A buffering proxy (nginx by default) would spool the whole archive to its own temp files
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def zip_response(entries, download_name: str) -> Response:
+    """Attachment response streaming iter_zip(entries) as download_name (an ASCII file name)."""
+    return _streamed_zip(iter_zip(list(entries)), download_name)
+
+
+def dataset_archive_entries(dataset) -> list:
+    """(path, arcname) of every hubfile of dataset, in its uploads folder."""
+    directory = os.path.join(
+        os.getenv("WORKING_DIR", ""), "uploads", f"user_{dataset.user_id}", f"dataset_{dataset.id}"
+    )
+    return [(os.path.join(directory, hubfile.name), hubfile.name) for hubfile in dataset.hubfiles]
+
+
+class DatasetArchiveCache:
+    """
+    Prebuilt dataset archives on disk, addressed by their content.
+
+    The key of an archive is a hash of the sorted (checksum, name) pairs of
+    its hubfiles, so adding, removing or replacing a file gives the dataset
+    a new key and the old archive is simply never asked for again; datasets
+    with the same files share one archive. Archives are built lazily, while
+    the first download streams (the bytes sent are also written to a
+    partial file that is renamed into place once complete), or on publish
+    when ARCHIVE_CACHE_ON_PUBLISH is set.
+
+    ARCHIVE_CACHE_MAX_BYTES bounds the disk used: once over it, the least
+    recently served archives are deleted. Recency is the access time,
+    set explicitly on every hit so it also works on noatime mounts, and it
+    lives on disk, so every worker shares the same cache. Datasets larger
+    than the whole budget are streamed without being cached;
+    ARCHIVE_CACHE_MAX_BYTES=0 disables the cache.
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None, build_on_publish: bool = None):
+        if directory is None:
+            directory = os.getenv("ARCHIVE_CACHE_DIR") or os.path.join(
+                os.getenv("WORKING_DIR", ""), "uploads", "archives"
+            )
+        if max_bytes is None:
+            max_bytes = int(os.getenv("ARCHIVE_CACHE_MAX_BYTES", str(2 * 1024**3)))
+        if build_on_publish is None:
+            build_on_publish = os.getenv("ARCHIVE_CACHE_ON_PUBLISH", "false").lower() in ("1", "true", "yes")
+        # Absolute, since send_file would resolve a relative path against the app package
+        self.directory = os.path.abspath(directory)
+        self.max_bytes = max_bytes
+        self.build_on_publish = build_on_publish
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def archive_key(hubfiles) -> str:
+        digest = hashlib.sha256(ARCHIVE_FORMAT.encode())
+        for checksum, name in sorted((hubfile.checksum, hubfile.name) for hubfile in hubfiles):
+            digest.update(f"\n{checksum}\0{name}".encode())
+        return digest.hexdigest()
+
+    def path_for(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.zip")
+
+    def cacheable(self, hubfiles) -> bool:
+        return 0 < self.max_bytes and sum(hubfile.size or 0 for hubfile in hubfiles) <= self.max_bytes
+
+    def get(self, key: str):
+        """Path of the cached archive for key, marked as just used; None when it is not cached."""
+        path = self.path_for(key)
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except FileNotFoundError:
+            return None
+        return path
+
+    # ------------------------------------------------------------------
+    # Building
+    # ------------------------------------------------------------------
+    def _building(self, key: str, entries):
+        """iter_zip(entries), also written to a partial file that becomes the archive of key when complete."""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            descriptor, partial_path = tempfile.mkstemp(dir=self.directory, prefix=f"{key}.", suffix=".partial")
+        except OSError as exc:
+            logger.warning(f"Could not cache archive {key}: {exc}")
+            yield from iter_zip(entries)
+            return
+
+        partial = os.fdopen(descriptor, "wb")
+        missing = []
+        try:
+            for chunk in iter_zip(entries, missing=missing):
+                if partial is not None:
+                    try:
+                        partial.write(chunk)
+                    except OSError as exc:
+                        # A full disk must not break the download itself
+                        logger.warning(f"Could not cache archive {key}: {exc}")
+                        self._discard(partial, partial_path)
+                        partial = None
+                yield chunk
+        except BaseException:
+            # Includes GeneratorExit, when the client goes away mid-download
+            if partial is not None:
+                self._discard(partial, partial_path)
+            raise
+
+        if partial is not None and missing:
+            # The key names the complete set of files, so an incomplete archive must not be stored under it
+            logger.warning(f"Not caching archive {key}: missing {', '.join(missing)}")
+            self._discard(partial, partial_path)
+            return
+
+        if partial is not None:
+            try:
+                partial.close()
+                os.replace(partial_path, self.path_for(key))
+            except OSError as exc:
+                logger.warning(f"Could not cache archive {key}: {exc}")
+                self._remove(partial_path)
+                return
+            self.evict(keep=key)
+
+    def build(self, hubfiles, entries):
+        """Cache the archive of hubfiles now, unless it is already cached; its path, or None if not cacheable."""
+        key = self.archive_key(hubfiles)
+        path = self.get(key)
+        if path is None and self.cacheable(hubfiles):
+            for _ in self._building(key, entries):
+                pass
+            path = self.get(key)
+        return path
+
+    def response(self, hubfiles, entries, download_name: str, offload=None) -> Response:
+        """
+        Attachment response with the archive of hubfiles: the cached file, or
+        a stream that caches it. A cached file is handed over to the web
+        server when offload (a DownloadOffload) is enabled; a missing one is
+        always streamed from here, so the first bytes do not wait for the
+        whole archive to be written.
+        """
+        entries = list(entries)
+        if self.max_bytes <= 0:
+            return zip_response(entries, download_name)
+
+        key = self.archive_key(hubfiles)
+        path = self.get(key)
+        if path is not None:
+            offloaded = offload.response(path, download_name, ZIP_MIMETYPE, etag=key) if offload is not None else None
+            if offloaded is not None:
+                return offloaded
+            # The key hashes the content, so it makes a strong ETag
+            return send_file(path, mimetype=ZIP_MIMETYPE, as_attachment=True, download_name=download_name, etag=key)
+        if self.cacheable(hubfiles):
+            return _streamed_zip(self._building(key, entries), download_name)
+        return zip_response(entries, download_name)
+
+    # ------------------------------------------------------------------
+    # Eviction
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def _discard(cls, partial, partial_path: str):
+        with contextlib.suppress(OSError):
+            partial.close()
+        cls._remove(partial_path)
+
+    def evict(self, keep: str = None):
+        """Delete least recently used archives (never keep) until the cache fits in max_bytes."""
+        with self._lock:
+            archives = []
+            now = time.time()
+            try:
+                listing = list(os.scandir(self.directory))
+            except FileNotFoundError:
+                return
+            for entry in listing:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith(".zip"):
+                    archives.append((stat.st_atime, entry.name, stat.st_size))
+                elif entry.name.endswith(".partial") and now - stat.st_mtime > STALE_PARTIAL_SECONDS:
+                    self._remove(entry.path)
+
+            total = sum(size for _, _, size in archives)
+            for _, name, size in sorted(archives):
+                if total <= self.max_bytes:
+                    break
+                if name == f"{keep}.zip":
+                    continue
+                self._remove(os.path.join(self.directory, name))
+                total -= size
+                logger.info(f"Evicted cached archive {name} ({size} bytes)")
+
+    def size(self) -> int:
+        """Bytes used by the cached archives."""
+        try:
+            return sum(entry.stat().st_size for entry in os.scandir(self.directory) if entry.name.endswith(".zip"))
+        except FileNotFoundError:
+            return 0
+
+    def clear(self):
+        try:
+            listing = list(os.scandir(self.directory))
+        except FileNotFoundError:
+            return
+        for entry in listing:
+            if entry.name.endswith((".zip", ".partial")):
+                self._remove(entry.path)
+
+
+dataset_archive_cache = DatasetArchiveCache()
@@ -0,0 +1,355 @@
+"""
+Synthetic catalogs and measurements for benchmarking the recommender.
+
+Used by the ``rosemary recommendations:benchmark`` command and by
+tests/test_benchmark_recommendations.py. Catalogs follow DataSetSeeder
+(DSMetrics -> DSMetaData -> Author -> DataSet -> DSDownloadRecord) but are
+bulk inserted with explicit ids, with tag, author and download popularity
+drawn from skewed (Zipf / Pareto) distributions.
+"""
+
+import itertools
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, func, insert
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import (
+    Author,
+    DataSet,
+    DSDownloadRecord,
+    DSMetaData,
+    DSMetrics,
+    PublicationType,
+    name_trigram,
+    refresh_name_trigrams,
+)
+from app.modules.dataset.models_recommendations import DataSetRecommendation, DataSetRecommendationState
+from app.modules.dataset.recommendation_index import recommendation_index
+from app.modules.dataset.services import DataSetService
+from app.modules.dataset.services_recommendations import DataSetRecommendationService
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+INSERT_CHUNK = 5000
+MAX_DOWNLOADS_PER_DATASET = 200
+
+
+@dataclass
+class SyntheticCatalog:
+    size: int
+    dataset_ids: range
+    ds_meta_data_ids: range
+    author_ids: range
+    download_record_ids: range
+    ds_metrics_id: int
+    generation_seconds: float = 0.0
+
+
+def _zipf_cum_weights(n: int, exponent: float = 1.1) -> list:
+    return list(itertools.accumulate(1.0 / (rank**exponent) for rank in range(1, n + 1)))
+
+
+def _next_id(model) -> int:
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _bulk_insert(model, rows: list):
+    for start in range(0, len(rows), INSERT_CHUNK):
+        db.session.execute(insert(model.__table__), rows[start : start + INSERT_CHUNK])
+
+
+def _benchmark_user_id() -> int:
+    user = User.query.order_by(User.id).first()
+    if user is None:
+        user = User(email="benchmark@example.com", password="benchmark1234")
+        db.session.add(user)
+        db.session.commit()
+    return user.id
+
+
+def generate_synthetic_catalog(
+    size: int, seed: int = 0, author_names: list = None, published: bool = False
+) -> SyntheticCatalog:
+    """
+    Insert `size` datasets whose tags, authors and download counts follow
+    skewed distributions: a few tags and authors are very popular, most
+    datasets have few downloads and a long tail has many. author_names
+    replaces the "Author <n>" pool; published gives every dataset a DOI,
+    so that explore sees it.
+    """
+    started = time.perf_counter()
+    rng = random.Random(seed)
+    user_id = _benchmark_user_id()
+
+    ds_metrics = DSMetrics(number_of_models="5", number_of_features="50")
+    db.session.add(ds_metrics)
+    db.session.flush()
+
+    vocabulary = [f"tag{i}" for i in range(max(50, size // 20))]
+    tag_weights = _zipf_cum_weights(len(vocabulary))
+    author_pool = author_names or [f"Author {i}" for i in range(max(20, size // 3))]
+    author_weights = _zipf_cum_weights(len(author_pool))
+    publication_types = list(PublicationType)
+    start_date = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    span_seconds = int((datetime.now(timezone.utc) - start_date).total_seconds())
+
+    first_meta_id = _next_id(DSMetaData)
+    first_dataset_id = _next_id(DataSet)
+    first_author_id = _next_id(Author)
+    first_download_id = _next_id(DSDownloadRecord)
+
+    meta_rows, dataset_rows, author_rows, download_rows = [], [], [], []
+    for i in range(size):
+        meta_id = first_meta_id + i
+        dataset_id = first_dataset_id + i
+        tags = dict.fromkeys(rng.choices(vocabulary, cum_weights=tag_weights, k=rng.randint(1, 4)))
+        meta_rows.append(
+            {
+                "id": meta_id,
+                "deposition_id": meta_id,
+                "title": f"Benchmark dataset {i + 1}",
+                "description": f"Synthetic dataset {i + 1} for recommendation benchmarks",
+                "publication_type": publication_types[i % len(publication_types)],
+                "tags": ", ".join(tags),
+                "ds_metrics_id": ds_metrics.id,
+                "dataset_doi": f"10.1234/benchmark.{meta_id}" if published else None,
+            }
+        )
+        for name in dict.fromkeys(rng.choices(author_pool, cum_weights=author_weights, k=rng.randint(1, 3))):
+            author_rows.append(
+                {
+                    "id": first_author_id + len(author_rows),
+                    "name": name,
+                    "affiliation": "Benchmark",
+                    "ds_meta_data_id": meta_id,
+                }
+            )
+
+        created_at = start_date + timedelta(seconds=rng.randint(0, span_seconds))
+        downloads = min(int(rng.paretovariate(1.2)) - 1, MAX_DOWNLOADS_PER_DATASET)
+        dataset_rows.append(
+            {
+                "id": dataset_id,
+                "user_id": user_id,
+                "ds_meta_data_id": meta_id,
+                "created_at": created_at,
+                "download_count": downloads,
+            }
+        )
+        for _ in range(downloads):
+            download_rows.append(
+                {
+                    "id": first_download_id + len(download_rows),
+                    "dataset_id": dataset_id,
+                    "download_date": created_at,
+                    "download_cookie": str(uuid.UUID(int=rng.getrandbits(128), version=4)),
+                }
+            )
+
+    _bulk_insert(DSMetaData, meta_rows)
+    _bulk_insert(Author, author_rows)
+    _bulk_insert(DataSet, dataset_rows)
+    _bulk_insert(DSDownloadRecord, download_rows)
+    # Bulk inserts skip the ORM events that maintain the name trigrams
+    for start in range(0, size, INSERT_CHUNK):
+        refresh_name_trigrams(
+            db.session.connection(), range(first_meta_id + start, first_meta_id + min(size, start + INSERT_CHUNK))
+        )
+    db.session.commit()
+
+    catalog = SyntheticCatalog(
+        size=size,
+        dataset_ids=range(first_dataset_id, first_dataset_id + size),
+        ds_meta_data_ids=range(first_meta_id, first_meta_id + size),
+        author_ids=range(first_author_id, first_author_id + len(author_rows)),
+        download_record_ids=range(first_download_id, first_download_id + len(download_rows)),
+        ds_metrics_id=ds_metrics.id,
+        generation_seconds=time.perf_counter() - started,
+    )
+    logger.info(
+        f"Synthetic catalog: {size} datasets, {len(author_rows)} authors, "
+        f"{len(download_rows)} downloads in {catalog.generation_seconds:.1f}s"
+    )
+    return catalog
+
+
+def delete_synthetic_catalog(catalog: SyntheticCatalog):
+    """Remove everything generate_synthetic_catalog inserted (children first)."""
+
+    def in_range(column, ids):
+        return column.between(ids.start, ids.stop - 1)
+
+    db.session.remove()
+    if len(catalog.dataset_ids):
+        for model, column in (
+            (DataSetRecommendation, DataSetRecommendation.dataset_id),
+            (DataSetRecommendation, DataSetRecommendation.recommended_dataset_id),
+            (DataSetRecommendationState, DataSetRecommendationState.dataset_id),
+        ):
+            db.session.query(model).filter(in_range(column, catalog.dataset_ids)).delete(synchronize_session=False)
+    if len(catalog.ds_meta_data_ids):
+        db.session.execute(
+            name_trigram.delete().where(in_range(name_trigram.c.ds_meta_data_id, catalog.ds_meta_data_ids))
+        )
+    for model, ids in (
+        (DSDownloadRecord, catalog.download_record_ids),
+        (DataSet, catalog.dataset_ids),
+        (Author, catalog.author_ids),
+        (DSMetaData, catalog.ds_meta_data_ids),
+    ):
+        if len(ids):
+            db.session.query(model).filter(in_range(model.id, ids)).delete(synchronize_session=False)
+    db.session.query(DSMetrics).filter(DSMetrics.id == catalog.ds_metrics_id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+@contextmanager
+def count_queries():
+    """Count the SQL statements executed on the app engine inside the block."""
+    counter = {"queries": 0}
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        counter["queries"] += 1
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _percentile(values: list, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def measure(fn, calls: list, setup=None) -> dict:
+    """
+    Run fn(*args) for every args tuple in `calls`.
+
+    Latencies are taken without tracing; a second pass under tracemalloc
+    records the query count and peak Python memory of each call. Every call
+    starts from an empty session, like a fresh request.
+    """
+
+    def run(args):
+        if setup:
+            setup()
+        db.session.expunge_all()
+        fn(*args)
+
+    latencies = []
+    for args in calls:
+        started = time.perf_counter()
+        run(args)
+        latencies.append((time.perf_counter() - started) * 1000)
+
+    queries = []
+    peaks = []
+    for args in calls:
+        tracemalloc.start()
+        try:
+            with count_queries() as counter:
+                run(args)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+        queries.append(counter["queries"])
+
+    return {
+        "calls": len(calls),
+        "latency_ms": {
+            "min": round(min(latencies), 3),
+            "p50": round(statistics.median(latencies), 3),
+            "p95": round(_percentile(latencies, 0.95), 3),
+            "max": round(max(latencies), 3),
+        },
+        "queries": {"mean": round(statistics.mean(queries), 2), "max": max(queries)},
+        "peak_memory_kb": round(max(peaks) / 1024, 1),
+    }
+
+
+def benchmark_catalog(catalog: SyntheticCatalog, sample: int = 50, limit: int = 10, seed: int = 0) -> dict:
+    """Measure every recommendation path against an already generated catalog."""
+    dataset_service = DataSetService()
+    recommendation_service = DataSetRecommendationService()
+    sample_ids = random.Random(seed).sample(list(catalog.dataset_ids), min(sample, catalog.size))
+
+    def rebuild_index():
+        recommendation_index.rebuild(
+            dataset_service.repository.get_recommendation_terms(),
+            fingerprint=dataset_service.repository.get_catalog_fingerprint(),
+        )
+
+    def mark_sample_stale():
+        recommendation_service.repository.mark_stale(sample_ids)
+
+    variants = {
+        "index_rebuild": measure(rebuild_index, [()]),
+        "get_recommendations": measure(
+            dataset_service.get_recommendations, [(dataset_id, limit) for dataset_id in sample_ids]
+        ),
+        "get_recommendations_for_many": measure(dataset_service.get_recommendations_for_many, [(sample_ids, limit)]),
+        "materialized_refresh": measure(
+            recommendation_service.get_for_datasets,
+            [(sample_ids, min(limit, recommendation_service.top_n))],
+            setup=mark_sample_stale,
+        ),
+        "materialized_read": measure(
+            recommendation_service.get_for_datasets, [(sample_ids, min(limit, recommendation_service.top_n))]
+        ),
+    }
+    return {
+        "size": catalog.size,
+        "sample": len(sample_ids),
+        "authors": len(catalog.author_ids),
+        "download_records": len(catalog.download_record_ids),
+        "generation_seconds": round(catalog.generation_seconds, 2),
+        "variants": variants,
+    }
+
+
+def run_recommendation_benchmark(
+    sizes=DEFAULT_SIZES, sample: int = 50, limit: int = 10, seed: int = 0, keep: bool = False
+) -> dict:
+    """Generate one catalog per size, benchmark it and (unless keep) delete it again."""
+    results = []
+    for size in sizes:
+        catalog = generate_synthetic_catalog(size, seed=seed)
+        try:
+            results.append(benchmark_catalog(catalog, sample=sample, limit=limit, seed=seed))
+        finally:
+            if not keep:
+                delete_synthetic_catalog(catalog)
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": db.engine.dialect.name,
+        "engine": type(recommendation_index).__name__,
+        "seed": seed,
+        "limit": limit,
+        "results": results,
+    }
+
+
+def write_report(report: dict, path: str):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
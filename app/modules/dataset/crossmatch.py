@@ -0,0 +1,368 @@
+"""
+Positional cross-match of source lists against every Observation.
+
+Positions are unit vectors on the sphere: the angular distance is then a
+monotonic function of the straight-line (chord) distance, so "within N
+arcseconds" is a ball query in 3-d, with no special cases at RA 0h or at
+the poles. Balls are answered by pure-Python KD-trees.
+"""
+
+import csv
+import io
+import json
+import logging
+import math
+import os
+import threading
+import time
+
+from app.modules.dataset.fingerprints import FingerprintChanges
+from app.modules.dataset.sky import parse_dec, parse_ra
+
+logger = logging.getLogger(__name__)
+
+# Largest match radius and source list accepted by the cross-match endpoint
+MAX_CROSSMATCH_RADIUS_ARCSEC = 3600.0
+MAX_CROSSMATCH_SOURCES = 100000
+
+# Positions added since the last tree build, scanned linearly until there are this many
+BUFFER_SIZE = 64
+
+
+def unit_vector(ra: float, dec: float) -> tuple:
+    ra, dec = math.radians(ra), math.radians(dec)
+    cos_dec = math.cos(dec)
+    return (cos_dec * math.cos(ra), cos_dec * math.sin(ra), math.sin(dec))
+
+
+def chord_length(degrees: float) -> float:
+    """Straight-line distance between two unit vectors `degrees` apart."""
+    return 2 * math.sin(math.radians(min(degrees, 180.0)) / 2)
+
+
+def chord_to_degrees(chord: float) -> float:
+    return math.degrees(2 * math.asin(min(1.0, chord / 2)))
+
+
+class KDTree:
+    """
+    Static KD-tree over 3-d points, stored implicitly: the node of a slice
+    [lo, hi) is its middle element and splits it on axis depth % 3, so the
+    tree is three flat lists and needs no node objects.
+    """
+
+    def __init__(self, items: list):
+        """items: (vector, key) pairs."""
+        items = list(items)
+        self._build(items, 0, len(items), 0)
+        self._points = [vector for vector, _ in items]
+        self._keys = [key for _, key in items]
+
+    @classmethod
+    def _build(cls, items: list, lo: int, hi: int, depth: int):
+        stack = [(lo, hi, depth)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if hi - lo <= 1:
+                continue
+            axis = depth % 3
+            items[lo:hi] = sorted(items[lo:hi], key=lambda item: item[0][axis])
+            mid = (lo + hi) // 2
+            stack.append((lo, mid, depth + 1))
+            stack.append((mid + 1, hi, depth + 1))
+
+    def __len__(self):
+        return len(self._keys)
+
+    def items(self) -> list:
+        return list(zip(self._points, self._keys))
+
+    def query_ball(self, point: tuple, radius: float) -> list:
+        """[(key, chord distance)] of the points within `radius` of point."""
+        points, keys = self._points, self._keys
+        px, py, pz = point
+        radius_sq = radius * radius
+        found = []
+        stack = [(0, len(points), 0)]
+        while stack:
+            lo, hi, depth = stack.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            x, y, z = points[mid]
+            distance_sq = (x - px) ** 2 + (y - py) ** 2 + (z - pz) ** 2
+            if distance_sq <= radius_sq:
+                found.append((keys[mid], math.sqrt(distance_sq)))
+            diff = point[depth % 3] - points[mid][depth % 3]
+            if diff <= radius:
+                stack.append((lo, mid, depth + 1))
+            if diff >= -radius:
+                stack.append((mid + 1, hi, depth + 1))
+        return found
+
+
+class ObservationPositionIndex:
+    """
+    Every observation position, as KD-trees over unit vectors.
+
+    New positions go to a small buffer; a full buffer becomes a tree, and
+    trees of similar size are merged (the logarithmic method), so adding an
+    observation costs amortized O(log n) rebuilding work instead of a full
+    rebuild while queries look at O(log n) trees. Removed or moved
+    observations leave dead entries behind, skipped on lookup and dropped
+    once they outnumber the live ones. Like the other in-process indexes,
+    DataSetService keeps it up to date and it is rebuilt from the database
+    when the observation fingerprint changes or OBSERVATION_INDEX_TTL expires.
+    """
+
+    def __init__(self, ttl_seconds: int = None):
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv("OBSERVATION_INDEX_TTL", "300"))
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._trees = []
+        self._buffer = []
+        self._entries = {}
+        self._current = {}
+        self._by_dataset = {}
+        self._next_entry = 0
+        self._changes = FingerprintChanges()
+        self._fingerprint = None
+        self._built_at = None
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def clear(self):
+        with self._lock:
+            self._trees = []
+            self._buffer = []
+            self._entries.clear()
+            self._current.clear()
+            self._by_dataset.clear()
+            self._changes.clear()
+            self._fingerprint = None
+            self._built_at = None
+
+    def add(self, observation_id: int, dataset_id: int, object_name: str, ra: float, dec: float):
+        with self._lock:
+            self.remove(observation_id)
+            if ra is None or dec is None:
+                return
+            entry = self._next_entry
+            self._next_entry += 1
+            self._entries[entry] = (observation_id, dataset_id, object_name, ra, dec)
+            self._current[observation_id] = entry
+            self._by_dataset.setdefault(dataset_id, set()).add(observation_id)
+            self._changes.added(observation_id)
+
+            self._buffer = self._buffer + [(unit_vector(ra, dec), entry)]
+            if len(self._buffer) >= BUFFER_SIZE:
+                self._push_tree(self._buffer)
+                self._buffer = []
+
+    def add_dataset(self, dataset):
+        observation = dataset.ds_meta_data.observation if dataset.ds_meta_data else None
+        with self._lock:
+            for observation_id in list(self._by_dataset.get(dataset.id, ())):
+                if observation is None or observation_id != observation.id:
+                    self.remove(observation_id)
+            if observation is not None:
+                self.add(observation.id, dataset.id, observation.object_name, observation.ra_deg, observation.dec_deg)
+
+    def remove(self, observation_id: int):
+        with self._lock:
+            entry = self._current.pop(observation_id, None)
+            if entry is None:
+                return
+            self._changes.removed(observation_id)
+            _, dataset_id, _, _, _ = self._entries.pop(entry)
+            observations = self._by_dataset.get(dataset_id)
+            if observations is not None:
+                observations.discard(observation_id)
+                if not observations:
+                    del self._by_dataset[dataset_id]
+            self._compact_if_needed()
+
+    def remove_dataset(self, dataset_id: int):
+        with self._lock:
+            for observation_id in list(self._by_dataset.get(dataset_id, ())):
+                self.remove(observation_id)
+
+    def _push_tree(self, items: list):
+        """Add a tree of items, merging it with every existing tree no larger than the result."""
+        trees = list(self._trees)
+        while trees and len(trees[-1]) <= len(items):
+            items = trees.pop().items() + items
+        trees.append(KDTree(items))
+        self._trees = trees
+
+    def _compact_if_needed(self):
+        stored = sum(len(tree) for tree in self._trees) + len(self._buffer)
+        if stored > 2 * BUFFER_SIZE and stored > 2 * len(self._entries):
+            live = [item for tree in self._trees for item in tree.items() if item[1] in self._entries]
+            live += [item for item in self._buffer if item[1] in self._entries]
+            self._trees = [KDTree(live)] if live else []
+            self._buffer = []
+
+    def rebuild(self, rows, fingerprint=None):
+        """
+        Rebuild from (observation_id, dataset_id, object_name, ra_deg, dec_deg)
+        rows, as returned by ObservationRepository.get_positions().
+        """
+        with self._lock:
+            self.clear()
+            items = []
+            for observation_id, dataset_id, object_name, ra, dec in rows:
+                entry = self._next_entry
+                self._next_entry += 1
+                self._entries[entry] = (observation_id, dataset_id, object_name, ra, dec)
+                self._current[observation_id] = entry
+                self._by_dataset.setdefault(dataset_id, set()).add(observation_id)
+                items.append((unit_vector(ra, dec), entry))
+            self._trees = [KDTree(items)] if items else []
+            self._changes.clear()
+            self._fingerprint = fingerprint
+            self._built_at = time.monotonic()
+
+        logger.info(f"Observation position index rebuilt with {len(items)} observations")
+
+    def sync_fingerprint(self, repository):
+        """
+        Record the observation fingerprint after incremental updates, or mark the
+        index stale when it changed by more than those updates (see fingerprints).
+        """
+        if self._built_at is None:
+            self._changes.clear()
+            return
+        fingerprint = repository.get_fingerprint()
+        with self._lock:
+            if self._changes.follows(self._fingerprint, fingerprint):
+                self._fingerprint = fingerprint
+            else:
+                # Another worker changed the observations as well: rebuild on the next ensure_fresh
+                self._built_at = None
+
+    def ensure_fresh(self, repository):
+        """Rebuild from the database if observations changed behind our back."""
+        fingerprint = repository.get_fingerprint()
+        expired = self._built_at is None or time.monotonic() - self._built_at > self.ttl_seconds
+        if expired or fingerprint != self._fingerprint:
+            self.rebuild(repository.get_positions(), fingerprint=fingerprint)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def match(self, ra: float, dec: float, radius: float) -> list:
+        """
+        [{"observation_id", "dataset_id", "object_name", "ra", "dec",
+        "separation"}] within radius degrees of (ra, dec), nearest first.
+        """
+        with self._lock:
+            trees, buffer, entries = self._trees, self._buffer, self._entries
+
+        point = unit_vector(ra, dec)
+        chord = chord_length(radius)
+        found = [hit for tree in trees for hit in tree.query_ball(point, chord)]
+        for vector, entry in buffer:
+            distance = math.dist(vector, point)
+            if distance <= chord:
+                found.append((entry, distance))
+
+        matches = []
+        for entry, distance in sorted(found, key=lambda hit: hit[1]):
+            stored = entries.get(entry)
+            if stored is None:
+                continue
+            observation_id, dataset_id, object_name, match_ra, match_dec = stored
+            matches.append(
+                {
+                    "observation_id": observation_id,
+                    "dataset_id": dataset_id,
+                    "object_name": object_name,
+                    "ra": match_ra,
+                    "dec": match_dec,
+                    "separation": chord_to_degrees(distance),
+                }
+            )
+        return matches
+
+    def crossmatch(self, sources, radius: float):
+        """For every (source_id, ra, dec), yield one dict per observation within radius degrees."""
+        for source_id, ra, dec in sources:
+            for match in self.match(ra, dec, radius):
+                yield {"source_id": source_id, "source_ra": ra, "source_dec": dec, **match}
+
+    def __len__(self):
+        return len(self._entries)
+
+
+observation_index = ObservationPositionIndex()
+
+
+def _source_coordinate(value, name: str, parser) -> float:
+    try:
+        coordinate = float(value)
+    except (TypeError, ValueError):
+        coordinate = parser(str(value)) if value is not None else None
+    if coordinate is None:
+        raise ValueError(f"invalid {name} {value!r}")
+    return coordinate
+
+
+def _source(source_id, ra, dec) -> tuple:
+    ra = _source_coordinate(ra, "ra", parse_ra)
+    dec = _source_coordinate(dec, "dec", parse_dec)
+    if not 0 <= ra < 360 or not -90 <= dec <= 90:
+        raise ValueError(f"coordinates out of range ({ra}, {dec})")
+    return source_id, ra, dec
+
+
+def parse_sources(content: str, fmt: str = None) -> list:
+    """
+    [(source_id, ra, dec)] in degrees from a CSV with ra and dec columns (an
+    id column is optional) or a JSON list of {"ra", "dec", "id"} objects or
+    [ra, dec] pairs. Coordinates are degrees or sexagesimal. Sources without
+    an id are numbered from 0. Raises ValueError on malformed input.
+    """
+    if fmt is None:
+        fmt = "json" if content.lstrip()[:1] in ("[", "{") else "csv"
+
+    sources = []
+    if fmt == "json":
+        try:
+            rows = json.loads(content)
+        except json.JSONDecodeError as exc:
+            raise ValueError(f"Invalid JSON: {exc}")
+        if isinstance(rows, dict):
+            rows = rows.get("sources")
+        if not isinstance(rows, list):
+            raise ValueError("Expected a JSON list of sources")
+        for index, row in enumerate(rows):
+            try:
+                if isinstance(row, dict):
+                    sources.append(_source(row.get("id", index), row.get("ra"), row.get("dec")))
+                elif isinstance(row, (list, tuple)) and len(row) == 2:
+                    sources.append(_source(index, row[0], row[1]))
+                else:
+                    raise ValueError("expected {ra, dec} or [ra, dec]")
+            except ValueError as exc:
+                raise ValueError(f"Source {index}: {exc}")
+            if len(sources) > MAX_CROSSMATCH_SOURCES:
+                raise ValueError(f"At most {MAX_CROSSMATCH_SOURCES} sources per request")
+    elif fmt == "csv":
+        reader = csv.DictReader(io.StringIO(content))
+        columns = {name.strip().lower(): name for name in reader.fieldnames or []}
+        if "ra" not in columns or "dec" not in columns:
+            raise ValueError("The CSV header must have ra and dec columns")
+        for index, row in enumerate(reader):
+            source_id = row[columns["id"]] if "id" in columns else index
+            try:
+                sources.append(_source(source_id, row[columns["ra"]], row[columns["dec"]]))
+            except ValueError as exc:
+                raise ValueError(f"Line {reader.line_num}: {exc}")
+            if len(sources) > MAX_CROSSMATCH_SOURCES:
+                raise ValueError(f"At most {MAX_CROSSMATCH_SOURCES} sources per request")
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+    return sources
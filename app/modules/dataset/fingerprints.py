@@ -0,0 +1,57 @@
+"""
+(count, max id) fingerprints of the rows behind the in-process indexes.
+
+An index is rebuilt from the database when the fingerprint of its rows
+changes. Its own incremental updates change that fingerprint too, so after
+one it records the new fingerprint instead, but only when it is exactly the
+previous one plus the rows the index itself added and removed: any other
+difference is a change made by another worker or a seeder, which the index
+has not seen, so it is rebuilt instead.
+"""
+
+
+def fingerprint_follows(previous, current, added=(), removed=()) -> bool:
+    """Whether current is the previous fingerprint once the added ids were inserted and the removed ids deleted."""
+    if previous is None or current is None:
+        return False
+    (count, max_id), (new_count, new_max) = previous, current
+    if new_count != count + len(added) - len(removed):
+        return False
+    highest_added = max(added, default=None)
+    if max_id is not None and max_id not in removed:
+        return new_max == max(max_id, highest_added or max_id)
+    if highest_added is not None and (max_id is None or highest_added > max_id):
+        return new_max == highest_added
+    # The previous maximum was deleted: the new one is unknown, but it cannot be higher
+    return new_max is None or (max_id is not None and new_max < max_id)
+
+
+class FingerprintChanges:
+    """
+    Ids an index added to and removed from its rows since it last recorded
+    its fingerprint. A re-added id (an edit) cancels out its removal.
+    """
+
+    def __init__(self):
+        self._changes = {}
+
+    def added(self, row_id: int):
+        self._change(row_id, 1)
+
+    def removed(self, row_id: int):
+        self._change(row_id, -1)
+
+    def _change(self, row_id: int, delta: int):
+        total = self._changes.pop(row_id, 0) + delta
+        if total:
+            self._changes[row_id] = total
+
+    def clear(self):
+        self._changes.clear()
+
+    def follows(self, previous, current) -> bool:
+        """fingerprint_follows() for the changes recorded so far, which are forgotten."""
+        added = [row_id for row_id, total in self._changes.items() if total > 0]
+        removed = [row_id for row_id, total in self._changes.items() if total < 0]
+        self._changes.clear()
+        return fingerprint_follows(previous, current, added, removed)
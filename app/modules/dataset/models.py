@@ -3,8 +3,14 @@ from enum import Enum
 
 from flask import request
 from sqlalchemy import Enum as SQLAlchemyEnum
+from sqlalchemy import Index, event, inspect, literal, select
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Session, validates
 
 from app import db
+from app.modules.dataset.recommendation_index import normalize_tags
+from app.modules.dataset.sky import parse_dec, parse_ra, zone_of
+from app.modules.dataset.trigrams import normalize_name, trigrams
 
 
 class PublicationType(Enum):
@@ -26,6 +32,13 @@ class Author(db.Model):
     orcid = db.Column(db.String(120))
     ds_meta_data_id = db.Column(db.Integer, db.ForeignKey("ds_meta_data.id"))
 
+    # Full-text search in explore (MariaDB only; SQLite uses an FTS5 table)
+    __table_args__ = (
+        Index("ft_author_name_affiliation_orcid", "name", "affiliation", "orcid", mysql_prefix="FULLTEXT").ddl_if(
+            dialect=("mysql", "mariadb")
+        ),
+    )
+
     def to_dict(self):
         return {"name": self.name, "affiliation": self.affiliation, "orcid": self.orcid}
 
@@ -40,14 +53,43 @@ class Observation(db.Model):  # es nueva
     filter_used = db.Column(db.String(16), nullable=True)
     notes = db.Column(db.Text, nullable=True)
 
+    # Parsed from ra/dec whenever they are set (NULL when unparseable), for cone searches
+    ra_deg = db.Column(db.Float, nullable=True)
+    dec_deg = db.Column(db.Float, nullable=True)
+    dec_zone = db.Column(db.Integer, nullable=True)
+
     ds_meta_data_id = db.Column(db.Integer, db.ForeignKey("ds_meta_data.id"))
 
+    # Observation filters of explore: equality columns (object, filter) lead, then one range column
+    __table_args__ = (
+        Index("ix_observation_dec_zone_ra_deg", "dec_zone", "ra_deg"),
+        Index(
+            "ix_observation_object_filter_date_magnitude", "object_name", "filter_used", "observation_date", "magnitude"
+        ),
+        Index("ix_observation_filter_date_magnitude", "filter_used", "observation_date", "magnitude"),
+        Index("ix_observation_date_magnitude", "observation_date", "magnitude"),
+        Index("ix_observation_magnitude", "magnitude"),
+    )
+
+    @validates("ra")
+    def _parse_ra(self, key, value):
+        self.ra_deg = parse_ra(value)
+        return value
+
+    @validates("dec")
+    def _parse_dec(self, key, value):
+        self.dec_deg = parse_dec(value)
+        self.dec_zone = zone_of(self.dec_deg)
+        return value
+
     def to_dict(self):
         return {
             "id": self.id,
             "object_name": self.object_name,
             "ra": self.ra,
             "dec": self.dec,
+            "ra_deg": self.ra_deg,
+            "dec_deg": self.dec_deg,
             "magnitude": self.magnitude,
             "observation_date": self.observation_date.isoformat() if self.observation_date else None,
             "filter_used": self.filter_used,
@@ -96,8 +138,56 @@ class DSMetaData(db.Model):
         cascade="all, delete",
     )
 
+    __table_args__ = (
+        Index("ft_ds_meta_data_title_description_tags", "title", "description", "tags", mysql_prefix="FULLTEXT").ddl_if(
+            dialect=("mysql", "mariadb")
+        ),
+    )
+
+
+dataset_tag = db.Table(
+    "dataset_tag",
+    db.Column("dataset_id", db.Integer, db.ForeignKey("data_set.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("tag_id", db.Integer, db.ForeignKey("tag.id", ondelete="CASCADE"), primary_key=True),
+    # The primary key serves dataset -> tags; this one serves tag filters and facet counts
+    Index("ix_dataset_tag_tag_id_dataset_id", "tag_id", "dataset_id"),
+)
+
+
+# Trigrams of the author names and observed object of each metadata, for fuzzy matching in explore
+# (see app.modules.dataset.trigrams). The primary key leads with (kind, trigram): lookups read postings.
+name_trigram = db.Table(
+    "name_trigram",
+    db.Column("kind", db.String(16), primary_key=True),
+    db.Column("trigram", db.String(3), primary_key=True),
+    db.Column("ds_meta_data_id", db.Integer, db.ForeignKey("ds_meta_data.id", ondelete="CASCADE"), primary_key=True),
+    db.Column("term", db.String(255), primary_key=True),
+    Index("ix_name_trigram_ds_meta_data_id", "ds_meta_data_id"),
+)
+
+NAME_KIND_AUTHOR = "author"
+NAME_KIND_OBJECT = "object"
+
+
+class Tag(db.Model):
+    """Normalized (stripped, lower-cased) tag; DSMetaData.tags keeps the text as entered."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Binary collation on MariaDB: the default one would make "café" and "cafe" collide on the unique index
+    name = db.Column(
+        db.String(120).with_variant(mysql.VARCHAR(120, collation="utf8mb4_bin"), "mysql", "mariadb"),
+        nullable=False,
+        unique=True,
+    )
+
+    def __repr__(self):
+        return f"Tag<{self.name}>"
+
 
 class DataSet(db.Model):
+    # Keyset pagination of explore results seeks on (created_at, id)
+    __table_args__ = (Index("ix_data_set_created_at_id", "created_at", "id"),)
+
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=False)
 
@@ -107,6 +197,9 @@ class DataSet(db.Model):
 
     ds_meta_data = db.relationship("DSMetaData", backref=db.backref("data_set", uselist=False))
 
+    # Filled from ds_meta_data.tags on flush (see _sync_dataset_tags)
+    normalized_tags = db.relationship("Tag", secondary=dataset_tag)
+
     # RELACIÓN: archivos asociados al dataset (one-to-many con Hubfile)
     hubfiles = db.relationship(
         "Hubfile",
@@ -181,6 +274,101 @@ class DataSet(db.Model):
         return f"DataSet<{self.id}>"
 
 
+def _tags_changed(obj) -> bool:
+    state = inspect(obj)
+    if state.pending:
+        return True
+    if isinstance(obj, DSMetaData):
+        return state.attrs.tags.history.has_changes()
+    return state.attrs.ds_meta_data.history.has_changes()
+
+
+@event.listens_for(Session, "before_flush")
+def _sync_dataset_tags(session, flush_context, instances):
+    """
+    Keep DataSet.normalized_tags in step with DSMetaData.tags for every
+    dataset created, or whose tag string changed, through the ORM (forms,
+    imports, seeders), so callers never have to maintain both.
+    """
+    datasets = set()
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, (DataSet, DSMetaData)) and _tags_changed(obj):
+            dataset = obj if isinstance(obj, DataSet) else obj.data_set
+            if dataset is not None and dataset.ds_meta_data is not None:
+                datasets.add(dataset)
+    if not datasets:
+        return
+
+    wanted = {dataset: sorted(filter(None, normalize_tags(dataset.ds_meta_data.tags))) for dataset in datasets}
+    names = {name for tag_names in wanted.values() for name in tag_names}
+    with session.no_autoflush:
+        tags = {tag.name: tag for tag in session.query(Tag).filter(Tag.name.in_(names))} if names else {}
+        for name in names - tags.keys():
+            tags[name] = Tag(name=name)
+            session.add(tags[name])
+        for dataset, tag_names in wanted.items():
+            dataset.normalized_tags = [tags[name] for name in tag_names]
+
+
+def refresh_name_trigrams(connection, ds_meta_data_ids):
+    """Recompute the name_trigram rows of the given metadata from their authors and observation."""
+    ds_meta_data_ids = list(ds_meta_data_ids)
+    if not ds_meta_data_ids:
+        return
+    connection.execute(name_trigram.delete().where(name_trigram.c.ds_meta_data_id.in_(ds_meta_data_ids)))
+
+    names = connection.execute(
+        select(Author.ds_meta_data_id, literal(NAME_KIND_AUTHOR), Author.name)
+        .where(Author.ds_meta_data_id.in_(ds_meta_data_ids))
+        .union_all(
+            select(Observation.ds_meta_data_id, literal(NAME_KIND_OBJECT), Observation.object_name).where(
+                Observation.ds_meta_data_id.in_(ds_meta_data_ids)
+            )
+        )
+    )
+    rows = set()
+    for ds_meta_data_id, kind, name in names:
+        term = normalize_name(name)
+        rows.update((kind, trigram, ds_meta_data_id, term) for trigram in trigrams(term))
+    if rows:
+        connection.execute(
+            name_trigram.insert(),
+            [
+                {"kind": kind, "trigram": trigram, "ds_meta_data_id": ds_meta_data_id, "term": term}
+                for kind, trigram, ds_meta_data_id, term in rows
+            ],
+        )
+
+
+def _name_changes(obj) -> set:
+    """Metadata ids whose name trigrams an ORM change to an Author, Observation or DSMetaData affects."""
+    state = inspect(obj)
+    created_or_deleted = obj in state.session.new or obj in state.session.deleted
+    if isinstance(obj, DSMetaData):
+        return {obj.id} if created_or_deleted else set()
+
+    moved = state.attrs.ds_meta_data_id.history
+    renamed = state.attrs.name.history if isinstance(obj, Author) else state.attrs.object_name.history
+    if not (created_or_deleted or moved.has_changes() or renamed.has_changes()):
+        return set()
+    return {obj.ds_meta_data_id, *moved.deleted} - {None}
+
+
+@event.listens_for(Session, "after_flush")
+def _sync_name_trigrams(session, flush_context):
+    """
+    Keep name_trigram in step with author names and observed objects for
+    every change made through the ORM; bulk inserts (seeders, benchmarks)
+    call refresh_name_trigrams() themselves.
+    """
+    ds_meta_data_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (Author, Observation, DSMetaData)):
+            ds_meta_data_ids |= _name_changes(obj)
+    if ds_meta_data_ids:
+        refresh_name_trigrams(session.connection(), ds_meta_data_ids)
+
+
 class DSDownloadRecord(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("user.id"), nullable=True)
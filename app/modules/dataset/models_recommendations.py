@@ -0,0 +1,58 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Index, UniqueConstraint
+
+from app import db
+
+
+class DataSetRecommendation(db.Model):
+    """One precomputed neighbour of a dataset, as scored by DataSetService.get_recommendations."""
+
+    __tablename__ = "dataset_recommendation"
+
+    id = db.Column(db.Integer, primary_key=True)
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id", ondelete="CASCADE"), nullable=False)
+    recommended_dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id", ondelete="CASCADE"), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)
+    downloads = db.Column(db.Integer, nullable=False, default=0)
+    coincidences = db.Column(db.Integer, nullable=False, default=0)
+
+    recommended_dataset = db.relationship("DataSet", foreign_keys=[recommended_dataset_id], lazy="joined")
+
+    __table_args__ = (
+        UniqueConstraint("dataset_id", "rank", name="uq_dataset_recommendation_dataset_id_rank"),
+        Index("ix_dataset_recommendation_recommended_dataset_id", "recommended_dataset_id"),
+    )
+
+    def to_recommendation(self):
+        """Same shape as the dicts returned by DataSetService.get_recommendations."""
+        return {
+            "dataset": self.recommended_dataset,
+            "score": self.score,
+            "downloads": self.downloads,
+            "coincidences": self.coincidences,
+        }
+
+    def __repr__(self):
+        return f"<DataSetRecommendation ds={self.dataset_id} rec={self.recommended_dataset_id} rank={self.rank}>"
+
+
+class DataSetRecommendationState(db.Model):
+    """
+    Refresh bookkeeping for the precomputed recommendations of a dataset.
+
+    The download tier thresholds used when scoring are kept so that a new
+    download only invalidates the datasets whose tiers it actually shifts.
+    """
+
+    __tablename__ = "dataset_recommendation_state"
+
+    dataset_id = db.Column(db.Integer, db.ForeignKey("data_set.id", ondelete="CASCADE"), primary_key=True)
+    is_stale = db.Column(db.Boolean, nullable=False, default=False)
+    download_tier1_max = db.Column(db.Integer, nullable=True)
+    download_tier2_max = db.Column(db.Integer, nullable=True)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    def __repr__(self):
+        return f"<DataSetRecommendationState ds={self.dataset_id} stale={self.is_stale}>"
@@ -0,0 +1,198 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+
+from app.modules.dataset.fingerprints import FingerprintChanges
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_tags(tag_string) -> set:
+    """Split a comma-separated DSMetaData.tags string into normalized tags."""
+    if not tag_string:
+        return set()
+    return {tag.strip().lower() for tag in tag_string.split(",")}
+
+
+def normalize_authors(authors) -> set:
+    """Normalize a list of Author objects (or plain names) for matching."""
+    names = set()
+    for author in authors or []:
+        name = author if isinstance(author, str) else author.name
+        names.add(name.strip().lower())
+    return names
+
+
+class DataSetRecommendationIndex:
+    """
+    Inverted index from normalized tag and author name to dataset ids.
+
+    Recommendation candidates are the datasets sharing at least one tag or
+    author with the current one, so looking them up here avoids loading the
+    whole catalog. The index lives in process memory: DataSetService keeps it
+    up to date on create/update/delete and it is rebuilt from the database
+    whenever the catalog fingerprint (count, max id) changes or the TTL
+    expires, which covers seeders and changes made by other workers.
+    """
+
+    def __init__(self, ttl_seconds: int = None):
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv("RECOMMENDATION_INDEX_TTL", "300"))
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._tag_index = defaultdict(set)
+        self._author_index = defaultdict(set)
+        self._terms = {}
+        self._changes = FingerprintChanges()
+        self._fingerprint = None
+        self._built_at = None
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def clear(self):
+        with self._lock:
+            self._tag_index.clear()
+            self._author_index.clear()
+            self._terms.clear()
+            self._changes.clear()
+            self._fingerprint = None
+            self._built_at = None
+
+    def add(self, dataset_id: int, tags: set, authors: set):
+        with self._lock:
+            self.remove(dataset_id)
+            self._terms[dataset_id] = (frozenset(tags), frozenset(authors))
+            self._changes.added(dataset_id)
+            for tag in tags:
+                self._tag_index[tag].add(dataset_id)
+            for author in authors:
+                self._author_index[author].add(dataset_id)
+
+    def add_dataset(self, dataset):
+        self.add(
+            dataset.id,
+            normalize_tags(dataset.ds_meta_data.tags),
+            normalize_authors(dataset.ds_meta_data.authors),
+        )
+
+    def remove(self, dataset_id: int):
+        with self._lock:
+            terms = self._terms.pop(dataset_id, None)
+            if not terms:
+                return
+            self._changes.removed(dataset_id)
+            tags, authors = terms
+            for tag in tags:
+                self._discard(self._tag_index, tag, dataset_id)
+            for author in authors:
+                self._discard(self._author_index, author, dataset_id)
+
+    @staticmethod
+    def _discard(index, key, dataset_id):
+        ids = index.get(key)
+        if ids is None:
+            return
+        ids.discard(dataset_id)
+        if not ids:
+            del index[key]
+
+    def rebuild(self, rows, fingerprint=None):
+        """
+        Rebuild the index from (dataset_id, tags, author_name) rows, as returned
+        by DataSetRepository.get_recommendation_terms().
+        """
+        tags_by_dataset = {}
+        authors_by_dataset = defaultdict(set)
+        for dataset_id, tags, author_name in rows:
+            if dataset_id not in tags_by_dataset:
+                tags_by_dataset[dataset_id] = normalize_tags(tags)
+            if author_name:
+                authors_by_dataset[dataset_id].add(author_name.strip().lower())
+
+        with self._lock:
+            self.clear()
+            for dataset_id, tags in tags_by_dataset.items():
+                self.add(dataset_id, tags, authors_by_dataset[dataset_id])
+            self._changes.clear()
+            self._fingerprint = fingerprint
+            self._built_at = time.monotonic()
+
+        logger.info(f"Recommendation index rebuilt with {len(tags_by_dataset)} datasets")
+
+    def sync_fingerprint(self, repository):
+        """
+        Record the catalog fingerprint after incremental updates, or mark the
+        index stale when it changed by more than those updates (see fingerprints).
+        """
+        if self._built_at is None:
+            self._changes.clear()
+            return
+        fingerprint = repository.get_catalog_fingerprint()
+        with self._lock:
+            if self._changes.follows(self._fingerprint, fingerprint):
+                self._fingerprint = fingerprint
+            else:
+                # Another worker changed the catalog as well: rebuild on the next ensure_fresh
+                self._built_at = None
+
+    def ensure_fresh(self, repository):
+        """Rebuild from the database if the catalog changed behind our back."""
+        fingerprint = repository.get_catalog_fingerprint()
+        expired = self._built_at is None or time.monotonic() - self._built_at > self.ttl_seconds
+        if expired or fingerprint != self._fingerprint:
+            self.rebuild(repository.get_recommendation_terms(), fingerprint=fingerprint)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def get_terms(self, dataset_id: int):
+        with self._lock:
+            return self._terms.get(dataset_id)
+
+    def get_candidates(self, tags: set, authors: set, exclude_id: int = None) -> dict:
+        """
+        Return {dataset_id: coincidences} for every dataset sharing at least one
+        tag or author, where coincidences = shared tags + shared authors.
+        """
+        return self.get_exact_candidates(tags, authors, exclude_id=exclude_id)
+
+    def get_exact_candidates(self, tags: set, authors: set, exclude_id: int = None) -> dict:
+        """Like get_candidates, but never approximate (see MinHashLSHIndex)."""
+        coincidences = defaultdict(int)
+        with self._lock:
+            for tag in tags:
+                for dataset_id in self._tag_index.get(tag, ()):
+                    coincidences[dataset_id] += 1
+            for author in authors:
+                for dataset_id in self._author_index.get(author, ()):
+                    coincidences[dataset_id] += 1
+        coincidences.pop(exclude_id, None)
+        return dict(coincidences)
+
+    def dataset_ids(self) -> list:
+        with self._lock:
+            return list(self._terms)
+
+    def __len__(self):
+        return len(self._terms)
+
+
+def create_recommendation_index() -> DataSetRecommendationIndex:
+    """
+    Build the candidate index selected by RECOMMENDATION_ENGINE: "exact"
+    (default, inverted index) or "approximate" (MinHash + LSH).
+    """
+    engine = os.getenv("RECOMMENDATION_ENGINE", "exact").strip().lower()
+    if engine == "approximate":
+        from app.modules.dataset.recommendation_lsh import MinHashLSHIndex
+
+        return MinHashLSHIndex()
+    if engine != "exact":
+        logger.warning(f"Unknown RECOMMENDATION_ENGINE '{engine}', using the exact engine")
+    return DataSetRecommendationIndex()
+
+
+recommendation_index = create_recommendation_index()
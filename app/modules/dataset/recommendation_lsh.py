@@ -0,0 +1,123 @@
+import os
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+from app.modules.dataset.recommendation_index import DataSetRecommendationIndex
+
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+
+def _term_hashes(tags: set, authors: set) -> np.ndarray:
+    """Stable 31-bit hashes of the prefixed terms (a tag and an author with the same text stay distinct)."""
+    terms = [f"t:{tag}" for tag in tags] + [f"a:{author}" for author in authors]
+    return np.fromiter((zlib.crc32(term.encode("utf-8")) for term in terms), dtype=np.uint64, count=len(terms))
+
+
+class MinHashLSHIndex(DataSetRecommendationIndex):
+    """
+    Approximate variant of DataSetRecommendationIndex.
+
+    Every dataset gets a MinHash signature of its normalized tags and authors,
+    split into bands that are hashed into LSH buckets. get_candidates only
+    looks at the datasets sharing a bucket with the query, so its cost depends
+    on the bucket sizes instead of on how popular each tag is; datasets with a
+    low Jaccard similarity may be missed. Coincidences of the returned
+    candidates are still counted exactly.
+
+    The exact posting lists of the parent class are kept, so that
+    get_exact_candidates (used to invalidate precomputed recommendations)
+    stays exact.
+    """
+
+    def __init__(self, ttl_seconds: int = None, num_perm: int = None, bands: int = None, seed: int = 1):
+        super().__init__(ttl_seconds=ttl_seconds)
+        self.num_perm = num_perm or int(os.getenv("RECOMMENDATION_LSH_PERMUTATIONS", "128"))
+        self.bands = bands or int(os.getenv("RECOMMENDATION_LSH_BANDS", "64"))
+        if self.num_perm % self.bands:
+            raise ValueError(f"LSH bands ({self.bands}) must divide the number of permutations ({self.num_perm})")
+        self.rows = self.num_perm // self.bands
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, size=self.num_perm, dtype=np.uint64)
+        # Random odd multipliers fold the rows of a band into one 64-bit bucket
+        # key; a per-band salt keeps equal rows in different bands apart.
+        self._band_mix = rng.integers(1, 1 << 63, size=self.rows, dtype=np.uint64) | np.uint64(1)
+        self._band_salt = rng.integers(0, 1 << 63, size=self.bands, dtype=np.uint64)
+        self._signatures = {}
+        self._buckets = defaultdict(set)
+
+    def signature(self, tags: set, authors: set):
+        """MinHash signature of a term set, or None when it is empty."""
+        hashes = _term_hashes(tags, authors)
+        if not len(hashes):
+            return None
+        hashes %= _MERSENNE_PRIME
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % _MERSENNE_PRIME
+        return permuted.min(axis=1)
+
+    def _band_keys(self, signature):
+        return ((signature.reshape(self.bands, self.rows) @ self._band_mix) ^ self._band_salt).tolist()
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def clear(self):
+        with self._lock:
+            super().clear()
+            self._signatures.clear()
+            self._buckets.clear()
+
+    def add(self, dataset_id: int, tags: set, authors: set):
+        with self._lock:
+            super().add(dataset_id, tags, authors)
+            signature = self.signature(tags, authors)
+            if signature is None:
+                return
+            self._signatures[dataset_id] = signature
+            for key in self._band_keys(signature):
+                self._buckets[key].add(dataset_id)
+
+    def remove(self, dataset_id: int):
+        with self._lock:
+            signature = self._signatures.pop(dataset_id, None)
+            if signature is not None:
+                for key in self._band_keys(signature):
+                    self._discard(self._buckets, key, dataset_id)
+            super().remove(dataset_id)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def get_candidates(self, tags: set, authors: set, exclude_id: int = None) -> dict:
+        """
+        Return {dataset_id: coincidences} for the datasets sharing an LSH
+        bucket (and at least one tag or author) with the given terms.
+        """
+        signature = self.signature(tags, authors)
+        if signature is None:
+            return {}
+
+        coincidences = {}
+        with self._lock:
+            candidate_ids = set()
+            for key in self._band_keys(signature):
+                candidate_ids.update(self._buckets.get(key, ()))
+            candidate_ids.discard(exclude_id)
+
+            for dataset_id in candidate_ids:
+                candidate_tags, candidate_authors = self._terms[dataset_id]
+                shared = len(tags & candidate_tags) + len(authors & candidate_authors)
+                if shared:
+                    coincidences[dataset_id] = shared
+        return coincidences
+
+
+def recall_at_k(exact: list, approximate: list) -> float:
+    """Share of the exact top-k recommendations also returned by the approximate engine."""
+    if not exact:
+        return 1.0
+    approximate_ids = {rec["dataset"].id for rec in approximate}
+    return sum(1 for rec in exact if rec["dataset"].id in approximate_ids) / len(exact)
@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1)
+_EPOCH_UTC = _EPOCH.replace(tzinfo=timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _to_microseconds(moment: datetime) -> int:
+    """Exact integer position of a datetime on the time line (naive values kept naive)."""
+    epoch = _EPOCH if moment.tzinfo is None else _EPOCH_UTC
+    return (moment - epoch) // _MICROSECOND
+
+
+def tier_thresholds(values: np.ndarray):
+    """
+    Upper bounds of the lower and middle tiers of a 3-way partition.
+
+    Same elements as sorted(values)[n // 3] and sorted(values)[2n // 3]
+    (for n <= 2 those indices fall back to the first and last element),
+    selected with np.partition instead of a full sort.
+    """
+    n = len(values)
+    kth = [n // 3, (2 * n) // 3]
+    partitioned = np.partition(values, kth)
+    return partitioned[kth[0]], partitioned[kth[1]]
+
+
+def _tier_scores(values: np.ndarray, tier1_max, tier2_max) -> np.ndarray:
+    """1, 2 or 3 points depending on the tier each value falls into."""
+    return 1.0 + (values > tier1_max) + (values > tier2_max)
+
+
+def _round_scores(scores: np.ndarray) -> np.ndarray:
+    """
+    round(score, 2) with Python semantics: np.round rounds the scaled value
+    and can disagree with round() on ties, so only the few distinct raw
+    scores are rounded in Python and scattered back.
+    """
+    unique, inverse = np.unique(scores, return_inverse=True)
+    return np.array([round(float(score), 2) for score in unique])[inverse]
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k best scores, descending, ties kept in input order (the
+    order a stable sort would produce) without sorting every candidate.
+    """
+    n = len(scores)
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if k < n:
+        threshold = scores[np.argpartition(-scores, k - 1)[:k]].min()
+        above = np.flatnonzero(scores > threshold)
+        ties = np.flatnonzero(scores == threshold)[: k - len(above)]
+        selected = np.concatenate((above, ties))
+    else:
+        selected = np.arange(n)
+    return selected[np.lexsort((selected, -scores[selected]))]
+
+
+def score_candidates(candidates: list, limit: int):
+    """
+    Vectorized recommendation scoring.
+
+    candidates are dicts with "dataset", "coincidences", "downloads" and
+    "created_at". Downloads and recency add 1-3 points each according to
+    their tier among the candidates, shared tags/authors add up to 4 points
+    relative to the best candidate. Returns (top recommendations,
+    (download_tier1_max, download_tier2_max)), ranking exactly like a stable
+    sort of the rounded scores.
+    """
+    if not candidates:
+        return [], None
+
+    downloads = np.fromiter((c["downloads"] for c in candidates), dtype=np.int64, count=len(candidates))
+    created_at = np.fromiter(
+        (_to_microseconds(c["created_at"]) for c in candidates), dtype=np.int64, count=len(candidates)
+    )
+    coincidences = np.fromiter((c["coincidences"] for c in candidates), dtype=np.float64, count=len(candidates))
+
+    download_tier1_max, download_tier2_max = tier_thresholds(downloads)
+    date_tier1_max, date_tier2_max = tier_thresholds(created_at)
+
+    scores = (
+        _tier_scores(downloads, download_tier1_max, download_tier2_max)
+        + _tier_scores(created_at, date_tier1_max, date_tier2_max)
+        + (coincidences / coincidences.max()) * 4.0
+    )
+    rounded = _round_scores(scores)
+
+    recommendations = [
+        {
+            "dataset": candidates[i]["dataset"],
+            "score": float(rounded[i]),
+            "downloads": candidates[i]["downloads"],
+            "coincidences": candidates[i]["coincidences"],
+        }
+        for i in _top_k(rounded, limit)
+    ]
+    return recommendations, (int(download_tier1_max), int(download_tier2_max))
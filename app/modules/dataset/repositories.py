@@ -4,13 +4,32 @@ from typing import Optional
 
 from flask_login import current_user
 from sqlalchemy import desc, func
-
-from app.modules.dataset.models import Author, DataSet, DOIMapping, DSDownloadRecord, DSMetaData, DSViewRecord
+from sqlalchemy.orm import joinedload, selectinload
+
+from app.modules.dataset.models import (
+    Author,
+    DataSet,
+    DOIMapping,
+    DSDownloadRecord,
+    DSMetaData,
+    DSViewRecord,
+    Observation,
+    Tag,
+    dataset_tag,
+)
 from core.repositories.BaseRepository import BaseRepository
 
 logger = logging.getLogger(__name__)
 
 
+def dataset_loading_options() -> list:
+    """Loader options bringing in everything DataSet.to_dict() reads, in a fixed number of queries."""
+    return [
+        selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors),
+        selectinload(DataSet.hubfiles),
+    ]
+
+
 class AuthorRepository(BaseRepository):
     def __init__(self):
         super().__init__(Author)
@@ -28,6 +47,26 @@ class DSDownloadRecordRepository(BaseRepository):
         """Count total downloads for a specific dataset"""
         return self.model.query.filter_by(dataset_id=dataset_id).count()
 
+    def count_downloads_for_datasets(self, dataset_ids) -> dict:
+        """Count downloads for several datasets with a single grouped query.
+
+        Returns a {dataset_id: count} dict that includes every requested id,
+        so datasets without downloads map to 0.
+        """
+        dataset_ids = list(dataset_ids)
+        if not dataset_ids:
+            return {}
+
+        rows = (
+            self.session.query(self.model.dataset_id, func.count(self.model.id))
+            .filter(self.model.dataset_id.in_(dataset_ids))
+            .group_by(self.model.dataset_id)
+            .all()
+        )
+        counts = dict.fromkeys(dataset_ids, 0)
+        counts.update({dataset_id: count for dataset_id, count in rows})
+        return counts
+
 
 class DSMetaDataRepository(BaseRepository):
     def __init__(self):
@@ -61,6 +100,29 @@ class DSViewRecordRepository(BaseRepository):
         )
 
 
+class ObservationRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(Observation)
+
+    def _positions(self, *columns):
+        return (
+            self.session.query(*columns)
+            .join(DSMetaData, self.model.ds_meta_data_id == DSMetaData.id)
+            .join(DataSet, DataSet.ds_meta_data_id == DSMetaData.id)
+            .filter(self.model.ra_deg.isnot(None), self.model.dec_deg.isnot(None))
+        )
+
+    def get_fingerprint(self):
+        """Cheap (count, max id) pair of the positioned observations, used to detect changes."""
+        return self._positions(func.count(self.model.id), func.max(self.model.id)).one()
+
+    def get_positions(self):
+        """(observation_id, dataset_id, object_name, ra_deg, dec_deg) of every observation with coordinates."""
+        return self._positions(
+            self.model.id, DataSet.id, self.model.object_name, self.model.ra_deg, self.model.dec_deg
+        ).all()
+
+
 class DataSetRepository(BaseRepository):
     def __init__(self):
         super().__init__(DataSet)
@@ -116,6 +178,63 @@ class DataSetRepository(BaseRepository):
     def count_unsynchronized_datasets(self):
         return self.model.query.join(DSMetaData).filter(DSMetaData.dataset_doi.is_(None)).count()
 
+    def get_catalog_fingerprint(self):
+        """Cheap (count, max id) pair used to detect catalog changes."""
+        count, max_id = self.session.query(func.count(self.model.id), func.max(self.model.id)).one()
+        return count, max_id
+
+    def get_facet_rows(self):
+        """(dataset_id, created_at, publication_type, tags, author_name) rows for every dataset, in one query."""
+        return (
+            self.session.query(
+                self.model.id, self.model.created_at, DSMetaData.publication_type, DSMetaData.tags, Author.name
+            )
+            .join(DSMetaData, self.model.ds_meta_data_id == DSMetaData.id)
+            .outerjoin(Author, Author.ds_meta_data_id == DSMetaData.id)
+            .all()
+        )
+
+    def get_published_fingerprint(self):
+        """(count, max id) of the datasets with a DOI; synchronizing one changes it."""
+        return (
+            self.session.query(func.count(self.model.id), func.max(self.model.id))
+            .join(DSMetaData, self.model.ds_meta_data_id == DSMetaData.id)
+            .filter(DSMetaData.dataset_doi.isnot(None))
+            .one()
+        )
+
+    def get_autocomplete_rows(self):
+        """(dataset_id, download_count, title, object_name, author_name) rows for every published dataset."""
+        return (
+            self.session.query(
+                self.model.id, self.model.download_count, DSMetaData.title, Observation.object_name, Author.name
+            )
+            .join(DSMetaData, self.model.ds_meta_data_id == DSMetaData.id)
+            .outerjoin(Observation, Observation.ds_meta_data_id == DSMetaData.id)
+            .outerjoin(Author, Author.ds_meta_data_id == DSMetaData.id)
+            .filter(DSMetaData.dataset_doi.isnot(None))
+            .all()
+        )
+
+    def get_recommendation_terms(self):
+        """(dataset_id, tags, author_name) rows for every dataset, in one query."""
+        return (
+            self.session.query(self.model.id, DSMetaData.tags, Author.name)
+            .join(DSMetaData, self.model.ds_meta_data_id == DSMetaData.id)
+            .outerjoin(Author, Author.ds_meta_data_id == DSMetaData.id)
+            .all()
+        )
+
+    def get_by_ids(self, dataset_ids):
+        if not dataset_ids:
+            return []
+        # Joined rather than selectin: candidate sets can exceed the 500-id chunks of a selectin load
+        return (
+            self.model.query.options(joinedload(self.model.ds_meta_data).joinedload(DSMetaData.authors))
+            .filter(self.model.id.in_(list(dataset_ids)))
+            .all()
+        )
+
     def latest_synchronized(self):
         return (
             self.model.query.join(DSMetaData)
@@ -132,3 +251,19 @@ class DOIMappingRepository(BaseRepository):
 
     def get_new_doi(self, old_doi: str) -> str:
         return self.model.query.filter_by(dataset_doi_old=old_doi).first()
+
+
+class TagRepository(BaseRepository):
+    def __init__(self):
+        super().__init__(Tag)
+
+    def get_names_in_use(self) -> list:
+        """Sorted names of the tags attached to at least one dataset."""
+        rows = (
+            self.session.query(self.model.name)
+            .join(dataset_tag, dataset_tag.c.tag_id == self.model.id)
+            .distinct()
+            .order_by(self.model.name)
+            .all()
+        )
+        return [name for (name,) in rows]
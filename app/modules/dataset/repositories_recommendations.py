@@ -0,0 +1,142 @@
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List
+
+from sqlalchemy import and_, delete, insert, or_
+from sqlalchemy.orm import joinedload
+
+from app import db
+from app.modules.dataset.models import DataSet
+from app.modules.dataset.models_recommendations import DataSetRecommendation, DataSetRecommendationState
+from core.repositories.BaseRepository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class DataSetRecommendationRepository(BaseRepository[DataSetRecommendation]):
+    def __init__(self):
+        super().__init__(DataSetRecommendation)
+        self.session = db.session
+
+    def get_fresh_states(self, dataset_ids) -> Dict[int, DataSetRecommendationState]:
+        """States of the given datasets whose precomputed rows can be served as-is."""
+        dataset_ids = list(dataset_ids)
+        if not dataset_ids:
+            return {}
+        states = (
+            self.session.query(DataSetRecommendationState)
+            .filter(
+                DataSetRecommendationState.dataset_id.in_(dataset_ids),
+                DataSetRecommendationState.is_stale.is_(False),
+            )
+            .all()
+        )
+        return {state.dataset_id: state for state in states}
+
+    def list_for_datasets(self, dataset_ids, limit: int) -> Dict[int, List[DataSetRecommendation]]:
+        """Precomputed rows for several datasets in one query, best first (with the recommended metadata)."""
+        dataset_ids = list(dataset_ids)
+        if not dataset_ids:
+            return {}
+        rows = (
+            self.model.query.options(joinedload(self.model.recommended_dataset).joinedload(DataSet.ds_meta_data))
+            .filter(self.model.dataset_id.in_(dataset_ids), self.model.rank < limit)
+            .order_by(self.model.dataset_id, self.model.rank)
+            .all()
+        )
+        result = {dataset_id: [] for dataset_id in dataset_ids}
+        for row in rows:
+            result[row.dataset_id].append(row)
+        return result
+
+    def replace_for_dataset(self, dataset_id: int, recommendations, download_tiers, commit: bool = True):
+        """Swap the precomputed rows of a dataset and mark it fresh."""
+        self.replace_for_datasets({dataset_id: (recommendations, download_tiers)}, commit=commit)
+
+    def replace_for_datasets(self, computed: dict, commit: bool = True):
+        """
+        Swap the precomputed rows of several datasets and mark them fresh;
+        computed is {dataset_id: (recommendations, download_tiers)}. Runs a
+        fixed number of statements (two DELETEs, two multi-row INSERTs)
+        whatever the number of datasets.
+        """
+        dataset_ids = list(computed)
+        if not dataset_ids:
+            return
+        now = datetime.now(timezone.utc)
+        rows = []
+        states = []
+        for dataset_id, (recommendations, download_tiers) in computed.items():
+            rows.extend(
+                {
+                    "dataset_id": dataset_id,
+                    "recommended_dataset_id": rec["dataset"].id,
+                    "rank": rank,
+                    "score": rec["score"],
+                    "downloads": rec["downloads"],
+                    "coincidences": rec["coincidences"],
+                }
+                for rank, rec in enumerate(recommendations)
+            )
+            tier1_max, tier2_max = download_tiers if download_tiers else (None, None)
+            states.append(
+                {
+                    "dataset_id": dataset_id,
+                    "is_stale": False,
+                    "download_tier1_max": tier1_max,
+                    "download_tier2_max": tier2_max,
+                    "refreshed_at": now,
+                }
+            )
+
+        self.session.execute(delete(self.model).where(self.model.dataset_id.in_(dataset_ids)))
+        self.session.execute(
+            delete(DataSetRecommendationState).where(DataSetRecommendationState.dataset_id.in_(dataset_ids))
+        )
+        if rows:
+            self.session.execute(insert(self.model), rows)
+        self.session.execute(insert(DataSetRecommendationState), states)
+
+        if commit:
+            self.session.commit()
+
+    def mark_stale(self, dataset_ids, commit: bool = True) -> int:
+        dataset_ids = list(dataset_ids)
+        if not dataset_ids:
+            return 0
+        updated = (
+            self.session.query(DataSetRecommendationState)
+            .filter(DataSetRecommendationState.dataset_id.in_(dataset_ids))
+            .update({DataSetRecommendationState.is_stale: True}, synchronize_session=False)
+        )
+        if commit:
+            self.session.commit()
+        return updated
+
+    def mark_stale_for_download_shift(self, dataset_ids, old_count: int, new_count: int, commit: bool = True) -> int:
+        """
+        Mark stale the datasets (among dataset_ids) whose download tier
+        thresholds lie in [old_count, new_count): only for those can a
+        neighbour going from old_count to new_count downloads change a tier.
+        """
+        dataset_ids = list(dataset_ids)
+        if not dataset_ids or new_count <= old_count:
+            return 0
+
+        def crosses(column):
+            return and_(column.isnot(None), column >= old_count, column < new_count)
+
+        updated = (
+            self.session.query(DataSetRecommendationState)
+            .filter(
+                DataSetRecommendationState.dataset_id.in_(dataset_ids),
+                or_(
+                    crosses(DataSetRecommendationState.download_tier1_max),
+                    crosses(DataSetRecommendationState.download_tier2_max),
+                ),
+            )
+            .update({DataSetRecommendationState.is_stale: True}, synchronize_session=False)
+        )
+        if commit:
+            self.session.commit()
+        return updated
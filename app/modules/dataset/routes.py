@@ -2,10 +2,7 @@ import json
 import logging
 import os
 import shutil
-import tempfile
 import uuid
-from datetime import datetime, timezone
-from zipfile import ZipFile
 
 from flask import (
     abort,
@@ -15,23 +12,24 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_from_directory,
     url_for,
 )
 from flask_login import current_user, login_required
 
 from app.modules.dataset import dataset_bp
+from app.modules.dataset.archives import dataset_archive_cache, dataset_archive_entries
 from app.modules.dataset.forms import DataSetForm, EditDataSetForm
-from app.modules.dataset.models import DSDownloadRecord
 from app.modules.dataset.services import (
     AuthorService,
     DataSetService,
     DOIMappingService,
-    DSDownloadRecordService,
     DSMetaDataService,
     DSViewRecordService,
 )
+from app.modules.dataset.services_recommendations import recommendation_service
+from app.modules.dataset.tracking import DATASET_DOWNLOAD, tracking_buffer
 from app.modules.fakenodo.factory import get_zenodo_service
+from app.modules.hubfile.offload import download_offload
 from app.modules.hubfile.services import HubfileService
 from app.modules.jsonChecker import validate_json_file
 
@@ -44,6 +42,7 @@ dsmetadata_service = DSMetaDataService()
 zenodo_service = get_zenodo_service()
 doi_mapping_service = DOIMappingService()
 ds_view_record_service = DSViewRecordService()
+tracking_buffer.add_listener(dataset_service.on_tracking_flushed)
 
 
 @dataset_bp.route("/dataset/upload", methods=["GET", "POST"])
@@ -262,57 +261,26 @@ def delete():
 def download_dataset(dataset_id):
     dataset = dataset_service.get_or_404(dataset_id)
 
-    # Increment download count
-    dataset.download_count += 1
-    dataset_service.update(dataset)
-
-    temp_dir = tempfile.mkdtemp()
-    zip_path = os.path.join(temp_dir, f"dataset_{dataset_id}.zip")
-
-    with ZipFile(zip_path, "w") as zipf:
-        # Iterar solo sobre los hubfiles del dataset
-        for hubfile in dataset.hubfiles:
-            file_path = f"uploads/user_{dataset.user_id}/dataset_{dataset.id}/"
-            full_path = os.path.join(file_path, hubfile.name)
-
-            if os.path.exists(full_path):
-                zipf.write(full_path, arcname=hubfile.name)
+    # Served from the archive cache (or by the web server, see DOWNLOAD_OFFLOAD), or
+    # streamed straight from the hubfiles while it is cached
+    resp = dataset_archive_cache.response(
+        dataset.hubfiles, dataset_archive_entries(dataset), f"dataset_{dataset_id}.zip", offload=download_offload
+    )
 
     user_cookie = request.cookies.get("download_cookie")
     if not user_cookie:
         user_cookie = str(uuid.uuid4())
-        resp = make_response(
-            send_from_directory(
-                temp_dir,
-                f"dataset_{dataset_id}.zip",
-                as_attachment=True,
-                mimetype="application/zip",
-            )
-        )
         resp.set_cookie("download_cookie", user_cookie)
-    else:
-        resp = send_from_directory(
-            temp_dir,
-            f"dataset_{dataset_id}.zip",
-            as_attachment=True,
-            mimetype="application/zip",
-        )
 
-    # Check if the download record already exists for this cookie
-    existing_record = DSDownloadRecord.query.filter_by(
+    # Increment download count and record the download (once per cookie); both are
+    # written by tracking_buffer in the background, which then calls on_tracking_flushed
+    tracking_buffer.count_download(dataset_id)
+    tracking_buffer.record(
+        DATASET_DOWNLOAD,
+        dataset_id,
+        user_cookie,
         user_id=current_user.id if current_user.is_authenticated else None,
-        dataset_id=dataset_id,
-        download_cookie=user_cookie,
-    ).first()
-
-    if not existing_record:
-        # Record the download in your database
-        DSDownloadRecordService().create(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            dataset_id=dataset_id,
-            download_date=datetime.now(timezone.utc),
-            download_cookie=user_cookie,
-        )
+    )
 
     return resp
 
@@ -337,7 +305,7 @@ def subdomain_index(doi):
     dataset = ds_meta_data.data_set
 
     # Get recommendations
-    recommendations = dataset_service.get_recommendations(dataset.id, limit=5)
+    recommendations = recommendation_service.get_for_dataset(dataset.id, limit=5)
 
     # Save the cookie to the user's browser
     user_cookie = ds_view_record_service.create_cookie(dataset=dataset)
@@ -372,7 +340,7 @@ def get_unsynchronized_dataset(dataset_id):
         abort(404)
 
     # Get recommendations
-    recommendations = dataset_service.get_recommendations(dataset.id, limit=5)
+    recommendations = recommendation_service.get_for_dataset(dataset.id, limit=5)
 
     # Crear servicio de hubfile (igual que en la ruta del DOI)
     hubfile_service = HubfileService()
@@ -451,7 +419,7 @@ def delete_dataset(dataset_id):
         return redirect(url_for("dataset.list_dataset"))
 
     try:
-        dataset_service.delete(dataset_id)
+        dataset_service.delete_datset(dataset_id)
         flash("Dataset deleted successfully!", "success")
         return redirect(url_for("dataset.list_dataset"))
     except Exception as exc:
@@ -0,0 +1,74 @@
+from flask import request
+from sqlalchemy import inspect
+
+from app.modules.dataset.models import DataSet
+from app.modules.dataset.repositories import dataset_loading_options
+from app.modules.dataset.services import DataSetService, SizeService
+
+
+def _needs_loading(dataset: DataSet) -> bool:
+    unloaded = inspect(dataset).unloaded
+    if "ds_meta_data" in unloaded or "hubfiles" in unloaded:
+        return True
+    return dataset.ds_meta_data is not None and "authors" in inspect(dataset.ds_meta_data).unloaded
+
+
+class DataSetBatchSerializer:
+    """
+    DataSet.to_dict() for many datasets at once.
+
+    Relationships still unloaded are fetched for the whole batch with
+    dataset_loading_options(), and the per-call helpers of to_dict()
+    (DataSetService for the DOI url, a SizeService per file, request.host_url)
+    are set up once per batch, so the output is identical but the number of
+    queries does not depend on how many datasets are serialized.
+    """
+
+    def __init__(self):
+        self.dataset_service = DataSetService()
+        self.size_service = SizeService()
+
+    def load(self, datasets: list):
+        """Eager-load, in one round of queries, what to_dict() needs of datasets loaded without it."""
+        pending = [dataset.id for dataset in datasets if _needs_loading(dataset)]
+        if pending:
+            DataSet.query.filter(DataSet.id.in_(pending)).options(*dataset_loading_options()).all()
+
+    def serialize(self, datasets: list) -> list:
+        self.load(datasets)
+        host_url = request.host_url.rstrip("/")
+        return [self._dataset_dict(dataset, host_url) for dataset in datasets]
+
+    def _file_dict(self, hubfile, host_url: str) -> dict:
+        return {
+            "id": hubfile.id,
+            "name": hubfile.name,
+            "checksum": hubfile.checksum,
+            "size_in_bytes": hubfile.size,
+            "size_in_human_format": self.size_service.get_human_readable_size(hubfile.size),
+            "url": f"{host_url}/file/download/{hubfile.id}",
+        }
+
+    def _dataset_dict(self, dataset: DataSet, host_url: str) -> dict:
+        meta = dataset.ds_meta_data
+        hubfiles = list(dataset.hubfiles)
+        total_size = sum(hubfile.size for hubfile in hubfiles)
+        return {
+            "title": meta.title,
+            "id": dataset.id,
+            "created_at": dataset.created_at,
+            "created_at_timestamp": int(dataset.created_at.timestamp()),
+            "description": meta.description,
+            "authors": [author.to_dict() for author in meta.authors],
+            "publication_type": dataset.get_cleaned_publication_type(),
+            "publication_doi": meta.publication_doi,
+            "dataset_doi": meta.dataset_doi,
+            "tags": meta.tags.split(",") if meta.tags else [],
+            "url": self.dataset_service.get_uvlhub_doi(dataset),
+            "download": f"{host_url}/dataset/download/{dataset.id}",
+            "zenodo": dataset.get_zenodo_url(),
+            "files": [self._file_dict(hubfile, host_url) for hubfile in hubfiles],
+            "files_count": len(hubfiles),
+            "total_size_in_bytes": total_size,
+            "total_size_in_human_format": self.size_service.get_human_readable_size(total_size),
+        }
@@ -1,14 +1,26 @@
 import hashlib
 import logging
 import os
+import random
 import shutil
 import uuid
 from typing import Optional
 
 from flask import request
+from flask_login import current_user
 
 from app.modules.auth.services import AuthenticationService
+from app.modules.dataset.archives import dataset_archive_cache, dataset_archive_entries
+from app.modules.dataset.crossmatch import observation_index
 from app.modules.dataset.models import DataSet, DSMetaData, DSViewRecord, Observation
+from app.modules.dataset.recommendation_index import (
+    DataSetRecommendationIndex,
+    normalize_authors,
+    normalize_tags,
+    recommendation_index,
+)
+from app.modules.dataset.recommendation_lsh import MinHashLSHIndex, recall_at_k
+from app.modules.dataset.recommendation_scoring import score_candidates
 from app.modules.dataset.repositories import (
     AuthorRepository,
     DataSetRepository,
@@ -16,7 +28,14 @@ from app.modules.dataset.repositories import (
     DSDownloadRecordRepository,
     DSMetaDataRepository,
     DSViewRecordRepository,
+    ObservationRepository,
 )
+from app.modules.dataset.repositories_recommendations import DataSetRecommendationRepository
+from app.modules.dataset.tracking import DATASET_DOWNLOAD, DATASET_VIEW, tracking_buffer
+from app.modules.explore.autocomplete import autocomplete_index
+from app.modules.explore.cache import explore_result_cache
+from app.modules.explore.facets import explore_facets
+from app.modules.explore.search_backends import create_search_backend
 from app.modules.hubfile.repositories import (
     HubfileDownloadRecordRepository,
     HubfileRepository,
@@ -46,6 +65,142 @@ class DataSetService(BaseService):
         self.hubfilerepository = HubfileRepository()
         self.dsviewrecord_repostory = DSViewRecordRepository()
         self.hubfileviewrecord_repository = HubfileViewRecordRepository()
+        self.recommendation_index = recommendation_index
+        self.recommendation_repository = DataSetRecommendationRepository()
+        self.search_backend = create_search_backend()
+        self.explore_facets = explore_facets
+        self.explore_result_cache = explore_result_cache
+        self.autocomplete_index = autocomplete_index
+        self.observation_index = observation_index
+        self.observation_repository = ObservationRepository()
+        self.archive_cache = dataset_archive_cache
+
+    def _neighbours_of(self, *terms) -> set:
+        """Datasets sharing a tag or author with any of the given (tags, authors) pairs."""
+        neighbours = set()
+        for term_pair in terms:
+            if term_pair:
+                neighbours.update(self.recommendation_index.get_exact_candidates(*term_pair))
+        return neighbours
+
+    def _on_dataset_saved(self, dataset: DataSet):
+        """Keep in-process indexes and precomputed recommendations in sync after a create or edit."""
+        try:
+            old_terms = self.recommendation_index.get_terms(dataset.id)
+            # Incremental on purpose: a create changes the fingerprint, ensure_fresh would rebuild everything
+            self.recommendation_index.add_dataset(dataset)
+            self.recommendation_index.sync_fingerprint(self.repository)
+
+            new_terms = self.recommendation_index.get_terms(dataset.id)
+            affected = self._neighbours_of(old_terms, new_terms) | {dataset.id}
+            self.recommendation_repository.mark_stale(affected)
+        except Exception as exc:
+            logger.warning(f"Could not update indexes for dataset {dataset.id}: {exc}")
+            self.repository.session.rollback()
+
+        try:
+            self.explore_facets.add_dataset(dataset)
+            self.explore_facets.sync_fingerprint(self.repository)
+        except Exception as exc:
+            logger.warning(f"Could not update explore facets for dataset {dataset.id}: {exc}")
+            self.repository.session.rollback()
+
+        try:
+            self.search_backend.index_dataset(dataset)
+        except Exception as exc:
+            logger.warning(f"Could not update {self.search_backend.name} search index for dataset {dataset.id}: {exc}")
+
+        try:
+            # Incremental on purpose: ensure_fresh would see the new observation and rebuild everything
+            self.observation_index.add_dataset(dataset)
+            self.observation_index.sync_fingerprint(self.observation_repository)
+        except Exception as exc:
+            logger.warning(f"Could not update observation positions for dataset {dataset.id}: {exc}")
+            self.repository.session.rollback()
+
+        self._update_autocomplete(dataset)
+        self.explore_result_cache.invalidate()
+
+    def _update_autocomplete(self, dataset: DataSet):
+        try:
+            # Incremental on purpose: publishing changes the fingerprint, ensure_fresh would rebuild everything
+            self.autocomplete_index.add_dataset(dataset)
+            self.autocomplete_index.sync_fingerprint(self.repository)
+        except Exception as exc:
+            logger.warning(f"Could not update autocomplete suggestions for dataset {dataset.id}: {exc}")
+            self.repository.session.rollback()
+
+    def _prebuild_archive(self, dataset: DataSet):
+        """Cache the ZIP of a dataset that was just published, if ARCHIVE_CACHE_ON_PUBLISH is set."""
+        if not self.archive_cache.build_on_publish:
+            return
+        try:
+            self.archive_cache.build(dataset.hubfiles, dataset_archive_entries(dataset))
+        except Exception as exc:
+            logger.warning(f"Could not build the archive of dataset {dataset.id}: {exc}")
+
+    def _on_dataset_deleted(self, dataset_id: int):
+        """Drop a deleted dataset from in-process indexes and invalidate its neighbours."""
+        try:
+            old_terms = self.recommendation_index.get_terms(dataset_id)
+            self.recommendation_index.remove(dataset_id)
+            self.recommendation_index.sync_fingerprint(self.repository)
+
+            self.recommendation_repository.mark_stale(self._neighbours_of(old_terms))
+        except Exception as exc:
+            logger.warning(f"Could not update indexes for deleted dataset {dataset_id}: {exc}")
+            self.repository.session.rollback()
+
+        try:
+            self.explore_facets.remove(dataset_id)
+            self.explore_facets.sync_fingerprint(self.repository)
+        except Exception as exc:
+            logger.warning(f"Could not update explore facets for deleted dataset {dataset_id}: {exc}")
+            self.repository.session.rollback()
+
+        try:
+            self.search_backend.remove_dataset(dataset_id)
+        except Exception as exc:
+            logger.warning(f"Could not remove dataset {dataset_id} from {self.search_backend.name} search index: {exc}")
+
+        try:
+            self.observation_index.remove_dataset(dataset_id)
+            self.observation_index.sync_fingerprint(self.observation_repository)
+        except Exception as exc:
+            logger.warning(f"Could not remove observation positions of deleted dataset {dataset_id}: {exc}")
+            self.repository.session.rollback()
+
+        try:
+            self.autocomplete_index.remove(dataset_id)
+            self.autocomplete_index.sync_fingerprint(self.repository)
+        except Exception as exc:
+            logger.warning(f"Could not remove autocomplete suggestions of deleted dataset {dataset_id}: {exc}")
+            self.repository.session.rollback()
+
+        self.explore_result_cache.invalidate()
+
+    def on_dataset_downloaded(self, dataset_id: int, new_downloads: int = 1):
+        """
+        Invalidate precomputed recommendations whose download tiers shift
+        because this dataset just gained new_downloads download records.
+        """
+        try:
+            self.recommendation_index.ensure_fresh(self.repository)
+            neighbours = self._neighbours_of(self.recommendation_index.get_terms(dataset_id))
+            neighbours.discard(dataset_id)
+
+            new_count = self.dsdownloadrecord_repository.count_downloads_for_dataset(dataset_id)
+            self.recommendation_repository.mark_stale_for_download_shift(
+                neighbours, new_count - new_downloads, new_count
+            )
+        except Exception as exc:
+            logger.warning(f"Could not refresh recommendation tiers after download of {dataset_id}: {exc}")
+            self.repository.session.rollback()
+
+    def on_tracking_flushed(self, inserted: dict):
+        """tracking_buffer listener: download records were written for the datasets in inserted."""
+        for dataset_id, new_downloads in inserted.get(DATASET_DOWNLOAD, {}).items():
+            self.on_dataset_downloaded(dataset_id, new_downloads)
 
     def move_hubfiles(self, dataset: DataSet):
         """
@@ -149,6 +304,10 @@ class DataSetService(BaseService):
     def total_dataset_views(self) -> int:
         return self.dsviewrecord_repostory.total_dataset_views()
 
+    def get_download_counts(self, dataset_ids) -> dict:
+        """Return {dataset_id: number of download records} using one query."""
+        return self.dsdownloadrecord_repository.count_downloads_for_datasets(dataset_ids)
+
     def create_from_form(self, form, current_user) -> DataSet:
         main_author = {
             "name": f"{
@@ -250,10 +409,18 @@ class DataSetService(BaseService):
             self.repository.session.rollback()
             raise exc
 
+        self._on_dataset_saved(dataset)
         return dataset
 
     def update_dsmetadata(self, id, **kwargs):
-        return self.dsmetadata_repository.update(id, **kwargs)
+        ds_meta_data = self.dsmetadata_repository.update(id, **kwargs)
+        # Synchronizing sets the DOI, which is what makes a dataset explorable
+        if ds_meta_data is not None and ds_meta_data.data_set is not None:
+            self._update_autocomplete(ds_meta_data.data_set)
+            if ds_meta_data.dataset_doi:
+                self._prebuild_archive(ds_meta_data.data_set)
+        self.explore_result_cache.invalidate()
+        return ds_meta_data
 
     def get_uvlhub_doi(self, dataset: DataSet) -> str:
         domain = os.getenv("DOMAIN", "localhost")
@@ -270,68 +437,205 @@ class DataSetService(BaseService):
 
         Only datasets with at least one tag or author match are recommended.
         """
+        recommendations, _ = self.compute_recommendations(dataset_id, limit)
+        return recommendations
+
+    def get_recommendations_for_many(self, dataset_ids, limit: int = 10) -> dict:
+        """
+        Same scoring as get_recommendations for several datasets at once.
+
+        Returns {dataset_id: recommendations}; unknown datasets map to [].
+        """
+        dataset_ids = list(dict.fromkeys(dataset_ids))
+        computed = self.compute_recommendations_for_many(dataset_ids, limit)
+        return {dataset_id: computed.get(dataset_id, ([], None))[0] for dataset_id in dataset_ids}
+
+    def compute_recommendations_for_many(self, dataset_ids, limit: int) -> dict:
+        """
+        Batch counterpart of compute_recommendations.
+
+        Tags and authors come from the recommendation index, and the union of
+        all candidates is loaded with a single dataset query and a single
+        grouped download count query, so the cost no longer grows with one
+        catalog read per requested dataset.
+
+        Returns {dataset_id: (recommendations, download_tiers)}; datasets that
+        do not exist are left out.
+        """
+        dataset_ids = list(dict.fromkeys(dataset_ids))
+        if not dataset_ids:
+            return {}
+
+        self.recommendation_index.ensure_fresh(self.repository)
+
+        coincidences_by_target = {}
+        for dataset_id in dataset_ids:
+            terms = self.recommendation_index.get_terms(dataset_id)
+            if terms is None:
+                logger.warning(f"Dataset {dataset_id} not found")
+                continue
+            coincidences_by_target[dataset_id] = self.recommendation_index.get_candidates(*terms, exclude_id=dataset_id)
+
+        candidate_ids = set()
+        for coincidences_by_id in coincidences_by_target.values():
+            candidate_ids.update(coincidences_by_id)
+
+        if not candidate_ids:
+            return {dataset_id: ([], None) for dataset_id in coincidences_by_target}
+
+        download_counts = self.get_download_counts(candidate_ids)
+        # Keep the repository order so ties rank exactly as in compute_recommendations
+        datasets = self.repository.get_by_ids(candidate_ids)
+
+        results = {}
+        for dataset_id, coincidences_by_id in coincidences_by_target.items():
+            candidates = [
+                {
+                    "dataset": dataset,
+                    "coincidences": coincidences_by_id[dataset.id],
+                    "downloads": download_counts.get(dataset.id, 0),
+                    "created_at": dataset.created_at,
+                }
+                for dataset in datasets
+                if dataset.id in coincidences_by_id
+            ]
+            results[dataset_id] = self._score_candidates(candidates, limit) if candidates else ([], None)
+
+        logger.info(f"Scored recommendations for {len(results)} datasets over {len(datasets)} candidates")
+        return results
+
+    def recommendation_recall_report(self, k: int = 10, sample_size: int = 200, seed: int = 0) -> dict:
+        """
+        Compare the approximate (MinHash/LSH) engine against the exact one.
+
+        For a random sample of datasets, both engines produce candidates that
+        are scored with the same download counts, and the report gives the
+        recall@k of the approximate top-k plus candidate set sizes.
+        """
+        rows = self.repository.get_recommendation_terms()
+        exact = DataSetRecommendationIndex()
+        approximate = MinHashLSHIndex()
+        exact.rebuild(rows)
+        approximate.rebuild(rows)
+
+        dataset_ids = sorted(exact.dataset_ids())
+        sample = random.Random(seed).sample(dataset_ids, min(sample_size, len(dataset_ids)))
+
+        candidates_by_target = {}
+        for dataset_id in sample:
+            terms = exact.get_terms(dataset_id)
+            candidates_by_target[dataset_id] = (
+                exact.get_candidates(*terms, exclude_id=dataset_id),
+                approximate.get_candidates(*terms, exclude_id=dataset_id),
+            )
+
+        # Approximate candidates always share a term, so they are a subset of the exact ones
+        candidate_ids = set()
+        for exact_candidates, _ in candidates_by_target.values():
+            candidate_ids.update(exact_candidates)
+        datasets = sorted(self.repository.get_by_ids(candidate_ids), key=lambda dataset: dataset.id)
+        download_counts = self.get_download_counts(candidate_ids)
+
+        def top_k(coincidences_by_id):
+            candidates = [
+                {
+                    "dataset": dataset,
+                    "coincidences": coincidences_by_id[dataset.id],
+                    "downloads": download_counts.get(dataset.id, 0),
+                    "created_at": dataset.created_at,
+                }
+                for dataset in datasets
+                if dataset.id in coincidences_by_id
+            ]
+            return score_candidates(candidates, k)[0]
+
+        recalls = []
+        candidate_recalls = []
+        exact_sizes = []
+        approximate_sizes = []
+        for exact_candidates, approximate_candidates in candidates_by_target.values():
+            if not exact_candidates:
+                continue
+            recalls.append(recall_at_k(top_k(exact_candidates), top_k(approximate_candidates)))
+            candidate_recalls.append(len(approximate_candidates) / len(exact_candidates))
+            exact_sizes.append(len(exact_candidates))
+            approximate_sizes.append(len(approximate_candidates))
+
+        evaluated = len(recalls)
+        return {
+            "k": k,
+            "catalog_size": len(dataset_ids),
+            "sampled": len(sample),
+            "evaluated": evaluated,
+            "permutations": approximate.num_perm,
+            "bands": approximate.bands,
+            "mean_recall_at_k": round(sum(recalls) / evaluated, 4) if evaluated else None,
+            "min_recall_at_k": round(min(recalls), 4) if evaluated else None,
+            "candidate_recall": round(sum(candidate_recalls) / evaluated, 4) if evaluated else None,
+            "mean_exact_candidates": round(sum(exact_sizes) / evaluated, 2) if evaluated else None,
+            "mean_approximate_candidates": round(sum(approximate_sizes) / evaluated, 2) if evaluated else None,
+        }
+
+    def compute_recommendations(self, dataset_id: int, limit: int):
+        """
+        Live scoring behind get_recommendations, also used to materialize the
+        dataset_recommendation table.
+
+        Returns (recommendations, download_tiers) where download_tiers is the
+        (tier1_max, tier2_max) pair the download score was partitioned with, or
+        None when there are no candidates.
+        """
         logger.info(f"=== get_recommendations called for dataset_id={dataset_id}, limit={limit} ===")
 
         # Get the current dataset
         current_dataset = self.repository.get_by_id(dataset_id)
         if not current_dataset:
             logger.warning(f"Dataset {dataset_id} not found")
-            return []
+            return [], None
 
         logger.info(f"Current dataset: {current_dataset.ds_meta_data.title}")
 
         # Get current dataset's tags and authors
-        current_tags = set()
-        if current_dataset.ds_meta_data.tags:
-            current_tags = {tag.strip().lower() for tag in current_dataset.ds_meta_data.tags.split(",")}
-
-        current_authors = {author.name.strip().lower() for author in current_dataset.ds_meta_data.authors}
+        current_tags = normalize_tags(current_dataset.ds_meta_data.tags)
+        current_authors = normalize_authors(current_dataset.ds_meta_data.authors)
 
         logger.info(f"Current tags: {current_tags}")
         logger.info(f"Current authors: {current_authors}")
 
-        # Get all other datasets
-        all_datasets = DataSet.query.filter(DataSet.id != dataset_id).all()
-
-        logger.info(f"Found {len(all_datasets)} other datasets to compare")
-
-        if not all_datasets:
-            logger.warning("No other datasets found")
-            return []
-
-        # First pass: Filter datasets with at least one tag or author match
-        candidates = []
-        for dataset in all_datasets:
-            dataset_tags = set()
-            if dataset.ds_meta_data.tags:
-                dataset_tags = {tag.strip().lower() for tag in dataset.ds_meta_data.tags.split(",")}
+        # Candidate generation: only datasets sharing a tag or an author
+        self.recommendation_index.ensure_fresh(self.repository)
+        coincidences_by_id = self.recommendation_index.get_candidates(
+            current_tags, current_authors, exclude_id=dataset_id
+        )
 
-            dataset_authors = {author.name.strip().lower() for author in dataset.ds_meta_data.authors}
+        logger.info(f"Found {len(coincidences_by_id)} datasets sharing tags/authors")
 
-            # Check for any coincidence
-            tag_matches = current_tags & dataset_tags
-            author_matches = current_authors & dataset_authors
+        if not coincidences_by_id:
+            logger.warning("No candidates with matching tags/authors")
+            return [], None
 
-            if tag_matches or author_matches:
-                # Count total coincidences
-                total_coincidences = len(tag_matches) + len(author_matches)
+        # Download counts for every candidate in one grouped query
+        download_counts = self.get_download_counts(coincidences_by_id.keys())
 
-                # Get download count
-                download_count = self.dsdownloadrecord_repository.count_downloads_for_dataset(dataset.id)
+        candidates = []
+        for dataset in self.repository.get_by_ids(coincidences_by_id.keys()):
+            if dataset.id not in coincidences_by_id:
+                continue
+            download_count = download_counts.get(dataset.id, 0)
 
-                logger.info(
-                    f"  Candidate: {dataset.ds_meta_data.title} - "
-                    f"tags:{tag_matches}, authors:{author_matches}, downloads:{download_count}"
-                )
+            logger.debug(
+                f"  Candidate: {dataset.ds_meta_data.title} - "
+                f"coincidences:{coincidences_by_id[dataset.id]}, downloads:{download_count}"
+            )
 
-                candidates.append(
-                    {
-                        "dataset": dataset,
-                        "coincidences": total_coincidences,
-                        "downloads": download_count,
-                        "created_at": dataset.created_at,
-                    }
-                )
+            candidates.append(
+                {
+                    "dataset": dataset,
+                    "coincidences": coincidences_by_id[dataset.id],
+                    "downloads": download_count,
+                    "created_at": dataset.created_at,
+                }
+            )
 
         logger.info(
             f"Found {
@@ -340,78 +644,24 @@ class DataSetService(BaseService):
 
         if not candidates:
             logger.warning("No candidates with matching tags/authors")
-            return []
-
-        # Extract downloads and dates for partitioning
-        downloads_list = sorted([c["downloads"] for c in candidates])
-        dates_list = sorted([c["created_at"] for c in candidates])
-
-        # Create 3-tier partitions for downloads
-        n_downloads = len(downloads_list)
-        if n_downloads >= 3:
-            download_tier1_max = downloads_list[n_downloads // 3]
-            download_tier2_max = downloads_list[(2 * n_downloads) // 3]
-        elif n_downloads == 2:
-            download_tier1_max = downloads_list[0]
-            download_tier2_max = downloads_list[1]
-        else:
-            download_tier1_max = download_tier2_max = downloads_list[0]
-
-        # Create 3-tier partitions for recency (newer = higher tier)
-        n_dates = len(dates_list)
-        if n_dates >= 3:
-            date_tier1_max = dates_list[n_dates // 3]
-            date_tier2_max = dates_list[(2 * n_dates) // 3]
-        elif n_dates == 2:
-            date_tier1_max = dates_list[0]
-            date_tier2_max = dates_list[1]
-        else:
-            date_tier1_max = date_tier2_max = dates_list[0]
-
-        # Score each candidate
-        recommendations = []
-        max_coincidences = max(c["coincidences"] for c in candidates)
-
-        for candidate in candidates:
-            score = 0.0
-
-            # Downloads score (3 pts max)
-            if candidate["downloads"] <= download_tier1_max:
-                score += 1.0
-            elif candidate["downloads"] <= download_tier2_max:
-                score += 2.0
-            else:
-                score += 3.0
-
-            # Recency score (3 pts max) - newer is better
-            if candidate["created_at"] <= date_tier1_max:
-                score += 1.0
-            elif candidate["created_at"] <= date_tier2_max:
-                score += 2.0
-            else:
-                score += 3.0
-
-            # Coincidences score (4 pts max)
-            coincidence_score = (candidate["coincidences"] / max_coincidences) * 4.0
-            score += coincidence_score
-
-            recommendations.append(
-                {
-                    "dataset": candidate["dataset"],
-                    "score": round(score, 2),
-                    "downloads": candidate["downloads"],
-                    "coincidences": candidate["coincidences"],
-                }
-            )
+            return [], None
+
+        return self._score_candidates(candidates, limit)
 
-        # Sort by score (descending) and limit results
-        recommendations.sort(key=lambda x: x["score"], reverse=True)
+    @staticmethod
+    def _score_candidates(candidates: list, limit: int):
+        """
+        Rank candidate dicts (dataset, coincidences, downloads, created_at).
 
-        logger.info(f"Returning {len(recommendations[:limit])} recommendations (sorted by score)")
-        for i, rec in enumerate(recommendations[:limit], 1):
-            logger.info(f"  {i}. {rec['dataset'].ds_meta_data.title} - Score: {rec['score']}")
+        Downloads and recency are each split into three tiers over the
+        candidate set; shared tags/authors add up to 4 points relative to the
+        best candidate. Returns (top recommendations, download_tiers).
+        """
+        recommendations, download_tiers = score_candidates(candidates, limit)
 
-        return recommendations[:limit]
+        logger.debug(f"Returning {len(recommendations)} recommendations (sorted by score)")
+
+        return recommendations, download_tiers
 
     def get_or_404(self, dataseet_id):
         return self.repository.get_or_404(dataseet_id)
@@ -438,6 +688,7 @@ class DataSetService(BaseService):
                 self.repository.session.add(observation)
 
             self.repository.session.commit()
+            self._on_dataset_saved(dataset)
             return dataset
         except Exception as exc:
             logger.info(f"Exception updating dataset from form...: {exc}")
@@ -447,7 +698,8 @@ class DataSetService(BaseService):
     def delete_datset(self, dataset_id: int):
         try:
             dataset = self.get_or_404(dataset_id)
-            self.repository.delete(dataset)
+            self.repository.delete(dataset.id)
+            self._on_dataset_deleted(dataset_id)
             return True
         except Exception as exc:
             logger.info(f"Exception deleting dataset...: {exc}")
@@ -498,10 +750,13 @@ class DSViewRecordService(BaseService):
         if not user_cookie:
             user_cookie = str(uuid.uuid4())
 
-        existing_record = self.the_record_exists(dataset=dataset, user_cookie=user_cookie)
-
-        if not existing_record:
-            self.create_new_record(dataset=dataset, user_cookie=user_cookie)
+        # Written by tracking_buffer in the background, once per cookie
+        tracking_buffer.record(
+            DATASET_VIEW,
+            dataset.id,
+            user_cookie,
+            user_id=current_user.id if current_user.is_authenticated else None,
+        )
 
         return user_cookie
 
@@ -0,0 +1,81 @@
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from app.modules.dataset.repositories_recommendations import DataSetRecommendationRepository
+from app.modules.dataset.services import DataSetService
+from core.services.BaseService import BaseService
+
+logger = logging.getLogger(__name__)
+
+
+class DataSetRecommendationService(BaseService):
+    """
+    Serves recommendations from the materialized dataset_recommendation table.
+
+    Rows hold the top-N neighbours of each dataset. A dataset is refreshed on
+    read when it has never been materialized, when DataSetService marked it
+    stale (tags/authors of a neighbour changed, or a download shifted its
+    download tiers) or when its rows are older than RECOMMENDATIONS_MAX_AGE.
+    """
+
+    def __init__(self):
+        super().__init__(DataSetRecommendationRepository())
+        self.dataset_service = DataSetService()
+        self.top_n = int(os.getenv("RECOMMENDATIONS_TOP_N", "10"))
+        self.max_age = timedelta(seconds=int(os.getenv("RECOMMENDATIONS_MAX_AGE", "86400")))
+
+    def _is_fresh(self, state) -> bool:
+        refreshed_at = state.refreshed_at
+        if refreshed_at.tzinfo is None:
+            refreshed_at = refreshed_at.replace(tzinfo=timezone.utc)
+        return datetime.now(timezone.utc) - refreshed_at <= self.max_age
+
+    def refresh(self, dataset_id: int, commit: bool = True) -> List[dict]:
+        """Recompute and persist the top-N recommendations of one dataset."""
+        if not self.dataset_service.get_by_id(dataset_id):
+            return []
+        recommendations, download_tiers = self.dataset_service.compute_recommendations(dataset_id, self.top_n)
+        self.repository.replace_for_dataset(dataset_id, recommendations, download_tiers, commit=commit)
+        return recommendations
+
+    def get_for_dataset(self, dataset_id: int, limit: int = 5) -> List[dict]:
+        return self.get_for_datasets([dataset_id], limit=limit).get(dataset_id, [])
+
+    def get_for_datasets(self, dataset_ids, limit: int = 3, commit: bool = True) -> Dict[int, List[dict]]:
+        """
+        Return {dataset_id: recommendations} read from precomputed rows,
+        refreshing only the datasets that are missing or stale. Refreshes are
+        scored together in one pass of DataSetService.compute_recommendations_for_many
+        and written with one set of bulk statements, so the number of queries
+        does not depend on how many datasets were stale. With commit=False the
+        caller commits the refresh, e.g. once it no longer needs the objects it
+        loaded (a commit expires them).
+        """
+        dataset_ids = list(dict.fromkeys(dataset_ids))
+        if limit > self.top_n:
+            return self.dataset_service.get_recommendations_for_many(dataset_ids, limit=limit)
+
+        fresh_states = self.repository.get_fresh_states(dataset_ids)
+        to_refresh = [
+            dataset_id
+            for dataset_id in dataset_ids
+            if dataset_id not in fresh_states or not self._is_fresh(fresh_states[dataset_id])
+        ]
+
+        if to_refresh:
+            logger.info(f"Refreshing precomputed recommendations for datasets {to_refresh}")
+            try:
+                computed = self.dataset_service.compute_recommendations_for_many(to_refresh, self.top_n)
+                self.repository.replace_for_datasets(computed, commit=commit)
+            except Exception as exc:
+                logger.error(f"Error refreshing recommendations: {exc}", exc_info=True)
+                self.repository.session.rollback()
+
+        rows = self.repository.list_for_datasets(dataset_ids, limit)
+        return {dataset_id: [row.to_recommendation() for row in rows[dataset_id]] for dataset_id in dataset_ids}
+
+
+# Shared by every caller: building one per request would also build a DataSetService and its search backend
+recommendation_service = DataSetRecommendationService()
@@ -0,0 +1,134 @@
+"""
+Sky coordinates of observations.
+
+Observation.ra / Observation.dec are stored as sexagesimal strings; the
+parsed values in degrees (Observation.ra_deg / dec_deg) and the declination
+zone (Observation.dec_zone) are what positional queries use. The sky is cut
+into horizontal zones of ZONE_HEIGHT degrees, and (dec_zone, ra_deg) is
+indexed, so a cone search reads one short index range per zone it crosses
+instead of every observation (the "zones" algorithm of Gray et al., 2006).
+"""
+
+import math
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+# Height of a declination zone; changing it requires backfilling Observation.dec_zone
+ZONE_HEIGHT = 0.5
+ZONE_COUNT = int(180 / ZONE_HEIGHT)
+
+# Largest cone radius accepted by the search endpoints, in degrees
+MAX_CONE_RADIUS = 10.0
+
+_SEXAGESIMAL = re.compile(r"^\s*([+-]?)(\d{1,3})[:\s]+(\d{1,2})[:\s]+(\d{1,2}(?:\.\d*)?)\s*$")
+
+
+def _sexagesimal(value) -> Optional[float]:
+    match = _SEXAGESIMAL.match(value or "")
+    if not match:
+        return None
+    sign, units, minutes, seconds = match.groups()
+    if int(minutes) >= 60 or float(seconds) >= 60:
+        return None
+    magnitude = int(units) + int(minutes) / 60 + float(seconds) / 3600
+    return -magnitude if sign == "-" else magnitude
+
+
+def parse_ra(value) -> Optional[float]:
+    """Right ascension in degrees [0, 360) from hh:mm:ss(.sss), or None when invalid."""
+    hours = _sexagesimal(value)
+    if hours is None or not 0 <= hours < 24:
+        return None
+    return hours * 15.0
+
+
+def parse_dec(value) -> Optional[float]:
+    """Declination in degrees [-90, 90] from [+/-]dd:mm:ss(.sss), or None when invalid."""
+    degrees = _sexagesimal(value)
+    if degrees is None or not -90 <= degrees <= 90:
+        return None
+    return degrees
+
+
+def zone_of(dec: Optional[float]) -> Optional[int]:
+    if dec is None:
+        return None
+    return min(int(math.floor((dec + 90.0) / ZONE_HEIGHT)), ZONE_COUNT - 1)
+
+
+def angular_separation(ra1: float, dec1: float, ra2: float, dec2: float) -> float:
+    """Great-circle distance in degrees (haversine, stable for small angles)."""
+    ra1, dec1, ra2, dec2 = map(math.radians, (ra1, dec1, ra2, dec2))
+    a = math.sin((dec2 - dec1) / 2) ** 2 + math.cos(dec1) * math.cos(dec2) * math.sin((ra2 - ra1) / 2) ** 2
+    return math.degrees(2 * math.asin(min(1.0, math.sqrt(a))))
+
+
+def ra_half_width(dec: float, radius: float) -> float:
+    """Half-width in right ascension of the bounding box of a cone; 180 when it covers a pole."""
+    if abs(dec) + radius >= 90.0:
+        return 180.0
+    r, d = math.radians(radius), math.radians(dec)
+    return math.degrees(math.atan(math.sin(r) / math.sqrt(abs(math.cos(d - r) * math.cos(d + r)))))
+
+
+@dataclass
+class ConeWindow:
+    """Index ranges covering a cone: the zones it crosses and its RA intervals (split at 0/360)."""
+
+    zones: list
+    dec_min: float
+    dec_max: float
+    ra_ranges: list
+
+
+def cone_window(ra: float, dec: float, radius: float) -> ConeWindow:
+    dec_min, dec_max = max(-90.0, dec - radius), min(90.0, dec + radius)
+    zones = list(range(zone_of(dec_min), zone_of(dec_max) + 1))
+
+    half_width = ra_half_width(dec, radius)
+    if half_width >= 180.0:
+        ra_ranges = [(0.0, 360.0)]
+    else:
+        low, high = ra - half_width, ra + half_width
+        if low < 0:
+            ra_ranges = [(0.0, high), (low + 360.0, 360.0)]
+        elif high >= 360.0:
+            ra_ranges = [(low, 360.0), (0.0, high - 360.0)]
+        else:
+            ra_ranges = [(low, high)]
+    return ConeWindow(zones=zones, dec_min=dec_min, dec_max=dec_max, ra_ranges=ra_ranges)
+
+
+def _coordinate(value, name: str, parser) -> float:
+    if value is None or str(value).strip() == "":
+        raise ValueError(f"Missing {name}")
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        parsed = parser(str(value))
+    if parsed is None:
+        raise ValueError(f"Invalid {name}: {value!r}")
+    return parsed
+
+
+def parse_cone_arguments(args) -> tuple:
+    """
+    (ra, dec, radius) in degrees from request arguments. ra and dec are
+    decimal degrees or sexagesimal (hh:mm:ss / dd:mm:ss), radius is in
+    degrees. Raises ValueError when any of them is missing or out of range.
+    """
+    ra = _coordinate(args.get("ra"), "ra", parse_ra)
+    dec = _coordinate(args.get("dec"), "dec", parse_dec)
+    try:
+        radius = float(args.get("radius", ""))
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid radius: {args.get('radius')!r}")
+
+    if not 0 <= ra < 360:
+        raise ValueError("ra must be within [0, 360) degrees")
+    if not -90 <= dec <= 90:
+        raise ValueError("dec must be within [-90, 90] degrees")
+    if not 0 < radius <= MAX_CONE_RADIUS:
+        raise ValueError(f"radius must be within (0, {MAX_CONE_RADIUS:g}] degrees")
+    return ra, dec, radius
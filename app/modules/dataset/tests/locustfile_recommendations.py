@@ -70,7 +70,7 @@ class RecommendationBehavior(TaskSet):
         ) as response:
             if response.status_code == 200:
                 try:
-                    data = response.json()
+                    data = response.json().get("datasets", [])
                     # Check if results have recommendations
                     if isinstance(data, list) and len(data) > 0:
                         has_recommendations = any("recommendations" in item for item in data)
@@ -0,0 +1,61 @@
+import json
+import os
+
+import pytest
+
+from app.modules.dataset.benchmarks import (
+    benchmark_catalog,
+    delete_synthetic_catalog,
+    generate_synthetic_catalog,
+    write_report,
+)
+from app.modules.dataset.models import DataSet, DSDownloadRecord
+
+# Opt into bigger catalogs with e.g. RECOMMENDATIONS_BENCHMARK_SIZES=1000,10000,100000
+BENCHMARK_SIZES = [int(size) for size in os.getenv("RECOMMENDATIONS_BENCHMARK_SIZES", "1000").split(",")]
+
+
+@pytest.fixture(scope="module", params=BENCHMARK_SIZES, ids=lambda size: f"{size}-datasets")
+def synthetic_catalog(request, test_client):
+    catalog = generate_synthetic_catalog(request.param, seed=0)
+    yield catalog
+    delete_synthetic_catalog(catalog)
+
+
+def test_synthetic_catalog_is_skewed(synthetic_catalog):
+    assert DataSet.query.filter(DataSet.id.in_(list(synthetic_catalog.dataset_ids))).count() == synthetic_catalog.size
+
+    downloads = sorted(
+        (
+            dataset.download_count
+            for dataset in DataSet.query.filter(DataSet.id.in_(list(synthetic_catalog.dataset_ids)))
+        ),
+        reverse=True,
+    )
+    assert (
+        sum(downloads)
+        == DSDownloadRecord.query.filter(DSDownloadRecord.dataset_id.in_(list(synthetic_catalog.dataset_ids))).count()
+    )
+    # The most downloaded 10% of the catalog concentrates a large share of the downloads
+    assert sum(downloads[: len(downloads) // 10]) > 0.3 * sum(downloads)
+
+
+def test_recommendation_benchmark(synthetic_catalog, tmp_path):
+    result = benchmark_catalog(synthetic_catalog, sample=20, limit=10)
+
+    variants = result["variants"]
+    assert set(variants) == {
+        "index_rebuild",
+        "get_recommendations",
+        "get_recommendations_for_many",
+        "materialized_refresh",
+        "materialized_read",
+    }
+    # Batch scoring must not issue queries per dataset
+    assert variants["get_recommendations_for_many"]["queries"]["max"] <= 5
+    assert variants["materialized_read"]["queries"]["max"] <= variants["materialized_refresh"]["queries"]["max"]
+
+    report_path = os.getenv("RECOMMENDATIONS_BENCHMARK_REPORT") or str(tmp_path / "recommendations.json")
+    write_report({"results": [result]}, report_path)
+    with open(report_path) as f:
+        assert json.load(f)["results"][0]["size"] == synthetic_catalog.size
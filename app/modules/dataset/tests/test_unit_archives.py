@@ -0,0 +1,144 @@
+import io
+import os
+import time
+import zipfile
+from types import SimpleNamespace
+
+from flask import Flask
+
+from app.modules.dataset.archives import DatasetArchiveCache, iter_zip, zip_response
+
+
+class TestStreamedZip:
+
+    @staticmethod
+    def _files(tmp_path):
+        small = tmp_path / "small.uvl"
+        small.write_text("features\n    Root\n")
+        large = tmp_path / "large.csv"
+        large.write_bytes(os.urandom(1024 * 1024))
+        empty = tmp_path / "empty.txt"
+        empty.write_bytes(b"")
+        return small, large, empty
+
+    def test_archive_holds_every_existing_file(self, tmp_path):
+        small, large, empty = self._files(tmp_path)
+        entries = [(str(small), "small.uvl"), (str(tmp_path / "missing.uvl"), "missing.uvl"), (str(large), "large.csv")]
+        entries.append((str(empty), "empty.txt"))
+
+        archive = zipfile.ZipFile(io.BytesIO(b"".join(iter_zip(entries))))
+
+        assert archive.namelist() == ["small.uvl", "large.csv", "empty.txt"]
+        assert archive.testzip() is None
+        assert archive.read("large.csv") == large.read_bytes()
+        assert archive.read("small.uvl") == small.read_bytes()
+
+    def test_memory_is_bounded_by_the_chunk_size(self, tmp_path):
+        _, large, _ = self._files(tmp_path)
+        chunks = list(iter_zip([(str(large), "large.csv")], chunk_size=64 * 1024))
+
+        assert len(chunks) > 16
+        assert max(len(chunk) for chunk in chunks) < 65 * 1024
+
+    def test_response_is_a_streamed_attachment(self, tmp_path):
+        small, _, _ = self._files(tmp_path)
+        before = set(os.listdir(tmp_path))
+
+        with Flask(__name__).test_request_context():
+            response = zip_response([(str(small), "small.uvl")], "dataset_1.zip")
+            body = b"".join(response.response)
+
+        assert response.is_streamed
+        assert response.mimetype == "application/zip"
+        assert response.headers["Content-Disposition"] == "attachment; filename=dataset_1.zip"
+        assert zipfile.ZipFile(io.BytesIO(body)).namelist() == ["small.uvl"]
+        assert set(os.listdir(tmp_path)) == before
+
+
+class TestDatasetArchiveCache:
+
+    @staticmethod
+    def _dataset(tmp_path, files):
+        """Hubfiles (name, checksum, size) and zip entries for {name: content}."""
+        hubfiles, entries = [], []
+        for name, content in files.items():
+            path = tmp_path / name
+            path.write_bytes(content)
+            hubfiles.append(SimpleNamespace(name=name, checksum=f"md5-{content.hex()}", size=len(content)))
+            entries.append((str(path), name))
+        return hubfiles, entries
+
+    @staticmethod
+    def _download(cache, hubfiles, entries):
+        with Flask(__name__).test_request_context():
+            response = cache.response(hubfiles, entries, "dataset_1.zip")
+            response.direct_passthrough = False
+            return response, response.get_data()
+
+    def test_first_download_builds_the_archive_the_next_one_serves_it(self, tmp_path):
+        hubfiles, entries = self._dataset(tmp_path, {"a.uvl": b"root a", "b.uvl": b"root b"})
+        cache = DatasetArchiveCache(directory=str(tmp_path / "archives"), max_bytes=10**6)
+        key = cache.archive_key(hubfiles)
+
+        streamed, streamed_body = self._download(cache, hubfiles, entries)
+        assert "ETag" not in streamed.headers
+        assert os.listdir(cache.directory) == [f"{key}.zip"]
+
+        cached, cached_body = self._download(cache, hubfiles, entries)
+        assert cached.headers["ETag"] == f'"{key}"'
+        assert "filename=dataset_1.zip" in cached.headers["Content-Disposition"]
+        assert cached_body == streamed_body
+        assert zipfile.ZipFile(io.BytesIO(cached_body)).read("b.uvl") == b"root b"
+
+    def test_key_follows_the_hubfile_set(self, tmp_path):
+        hubfiles, _ = self._dataset(tmp_path, {"a.uvl": b"root a", "b.uvl": b"root b"})
+        key = DatasetArchiveCache.archive_key
+
+        assert key(hubfiles) == key(list(reversed(hubfiles)))
+        assert key(hubfiles) != key(hubfiles[:1])
+        changed = [hubfiles[0], SimpleNamespace(name="b.uvl", checksum="md5-other", size=6)]
+        assert key(hubfiles) != key(changed)
+
+    def test_least_recently_used_archives_are_evicted(self, tmp_path):
+        cache = DatasetArchiveCache(directory=str(tmp_path / "archives"), max_bytes=2500)
+        datasets = [self._dataset(tmp_path, {f"{n}.bin": bytes([n]) * 1000}) for n in range(3)]
+
+        for hubfiles, entries in datasets[:2]:
+            cache.build(hubfiles, entries)
+        # Dataset 0 was served again, so dataset 1 is the least recently used
+        older = time.time() - 60
+        os.utime(cache.path_for(cache.archive_key(datasets[1][0])), (older, older))
+        assert cache.get(cache.archive_key(datasets[0][0])) is not None
+        cache.build(*datasets[2])
+
+        cached = [cache.get(cache.archive_key(hubfiles)) is not None for hubfiles, _ in datasets]
+        assert cached == [True, False, True]
+        assert cache.size() <= 2500
+
+    def test_nothing_is_left_behind_by_an_interrupted_or_oversized_download(self, tmp_path):
+        hubfiles, entries = self._dataset(tmp_path, {"large.bin": os.urandom(1024 * 1024)})
+        cache = DatasetArchiveCache(directory=str(tmp_path / "archives"), max_bytes=10 * 1024 * 1024)
+
+        with Flask(__name__).test_request_context():
+            chunks = iter(cache.response(hubfiles, entries, "dataset_1.zip").response)
+            next(chunks)
+            chunks.close()
+        assert os.listdir(cache.directory) == []
+
+        small_cache = DatasetArchiveCache(directory=str(tmp_path / "small"), max_bytes=1024)
+        response, body = self._download(small_cache, hubfiles, entries)
+        assert zipfile.ZipFile(io.BytesIO(body)).namelist() == ["large.bin"]
+        assert small_cache.build(hubfiles, entries) is None
+        assert not os.path.exists(small_cache.directory)
+
+    def test_archive_with_missing_files_is_served_but_not_cached(self, tmp_path):
+        hubfiles, entries = self._dataset(tmp_path, {"a.uvl": b"root a", "b.uvl": b"root b"})
+        os.remove(entries[1][0])
+        cache = DatasetArchiveCache(directory=str(tmp_path / "archives"), max_bytes=10**6)
+
+        response, body = self._download(cache, hubfiles, entries)
+
+        assert zipfile.ZipFile(io.BytesIO(body)).namelist() == ["a.uvl"]
+        assert cache.get(cache.archive_key(hubfiles)) is None
+        assert os.listdir(cache.directory) == []
+        assert cache.build(hubfiles, entries) is None
@@ -0,0 +1,88 @@
+import math
+import random
+
+import pytest
+
+from app.modules.dataset.crossmatch import (
+    BUFFER_SIZE,
+    KDTree,
+    ObservationPositionIndex,
+    chord_length,
+    chord_to_degrees,
+    parse_sources,
+    unit_vector,
+)
+from app.modules.dataset.sky import angular_separation
+
+
+def _random_position(rng):
+    return rng.uniform(0, 360), math.degrees(math.asin(rng.uniform(-1, 1)))
+
+
+def _brute_force(positions: dict, ra, dec, radius) -> list:
+    return sorted(key for key, (a, d) in positions.items() if angular_separation(ra, dec, a, d) <= radius)
+
+
+class TestCrossmatchIndex:
+
+    def test_chord_round_trip(self):
+        for degrees in (1 / 3600, 0.5, 30.0, 179.0):
+            assert chord_to_degrees(chord_length(degrees)) == pytest.approx(degrees)
+        assert math.dist(unit_vector(0, 0), unit_vector(90, 0)) == pytest.approx(chord_length(90))
+
+    def test_kdtree_matches_brute_force(self):
+        rng = random.Random(0)
+        points = [unit_vector(*_random_position(rng)) for _ in range(500)]
+        tree = KDTree([(point, index) for index, point in enumerate(points)])
+
+        for _ in range(100):
+            query = unit_vector(*_random_position(rng))
+            expected = sorted(index for index, point in enumerate(points) if math.dist(point, query) <= 0.2)
+            assert sorted(key for key, _ in tree.query_ball(query, 0.2)) == expected
+
+    def test_incremental_updates_match_brute_force(self):
+        rng = random.Random(1)
+        positions = {observation_id: _random_position(rng) for observation_id in range(300)}
+        index = ObservationPositionIndex()
+        index.rebuild([(key, key, f"obs {key}", *position) for key, position in positions.items()])
+
+        for key in range(300, 300 + 3 * BUFFER_SIZE + 5):
+            positions[key] = _random_position(rng)
+            index.add(key, key, f"obs {key}", *positions[key])
+        for key in range(0, 300, 3):
+            index.remove(key)
+            del positions[key]
+        for key in range(1, 100, 3):
+            positions[key] = _random_position(rng)
+            index.add(key, key, f"obs {key}", *positions[key])
+
+        assert len(index._trees) > 1
+        assert len(index) == len(positions)
+        for _ in range(100):
+            ra, dec = _random_position(rng)
+            matches = index.match(ra, dec, 10.0)
+            assert sorted(match["observation_id"] for match in matches) == _brute_force(positions, ra, dec, 10.0)
+            assert [match["separation"] for match in matches] == sorted(match["separation"] for match in matches)
+
+    def test_crossmatch_across_ra_zero_and_dataset_removal(self):
+        index = ObservationPositionIndex()
+        index.rebuild([(1, 10, "left", 359.9999, 0.0), (2, 20, "right", 0.0001, 0.0)])
+
+        matches = list(index.crossmatch([("src", 0.0, 0.0)], 1 / 3600))
+        assert sorted(match["object_name"] for match in matches) == ["left", "right"]
+        assert all(match["source_id"] == "src" for match in matches)
+
+        index.remove_dataset(10)
+        assert [match["object_name"] for match in index.match(0.0, 0.0, 1 / 3600)] == ["right"]
+
+    def test_parse_sources(self):
+        assert parse_sources("id,RA,Dec\na,10.5,-3\nb,00:42:44.3,+41:16:07.5\n") == [
+            ("a", 10.5, -3.0),
+            ("b", pytest.approx(10.684583, abs=1e-6), pytest.approx(41.26875)),
+        ]
+        assert parse_sources('[{"ra": 1, "dec": 2, "id": "x"}, [3, 4]]') == [("x", 1.0, 2.0), (1, 3.0, 4.0)]
+        assert parse_sources('{"sources": [[3, 4]]}') == [(0, 3.0, 4.0)]
+
+        for content in ("ra,dec\n400,1\n", "name,value\n1,2\n", "[1, 2]", "{", '[{"ra": "north", "dec": 0}]'):
+            with pytest.raises(ValueError):
+                parse_sources(content)
@@ -1,10 +1,18 @@
-from datetime import datetime, timezone
+import random
+from datetime import datetime, timedelta, timezone
 from unittest.mock import Mock, patch
 
+import numpy as np
 import pytest
 
 from app import create_app
+from app.modules.dataset.fingerprints import fingerprint_follows
+from app.modules.dataset.models import DataSet
+from app.modules.dataset.recommendation_index import DataSetRecommendationIndex, create_recommendation_index
+from app.modules.dataset.recommendation_lsh import MinHashLSHIndex, recall_at_k
+from app.modules.dataset.recommendation_scoring import score_candidates, tier_thresholds
 from app.modules.dataset.services import DataSetService
+from app.modules.dataset.services_recommendations import DataSetRecommendationService
 
 
 class TestRecommendationSystemUnit:
@@ -30,6 +38,20 @@ class TestRecommendationSystemUnit:
     def mock_dataset_service(self, app_context):
         """Create a mock DataSetService for testing"""
         service = DataSetService()
+        service.recommendation_index = DataSetRecommendationIndex()
+
+        # Feed the inverted index and candidate lookups from the (mocked) DataSet.query instead of the database
+        def ensure_fresh(repository):
+            service.recommendation_index.clear()
+            for dataset in DataSet.query.filter().all():
+                service.recommendation_index.add_dataset(dataset)
+
+        def get_by_ids(dataset_ids):
+            wanted = set(dataset_ids)
+            return [dataset for dataset in DataSet.query.filter().all() if dataset.id in wanted]
+
+        service.recommendation_index.ensure_fresh = ensure_fresh
+        service.repository.get_by_ids = get_by_ids
         return service
 
     @pytest.fixture
@@ -124,9 +146,9 @@ class TestRecommendationSystemUnit:
             mock_query.filter.return_value.all.return_value = candidates
 
             with patch.object(
-                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_dataset"
+                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_datasets"
             ) as mock_downloads:
-                mock_downloads.return_value = 10
+                mock_downloads.side_effect = lambda ids: {i: 10 for i in ids}
 
                 result = mock_dataset_service.get_recommendations(1, limit=10)
 
@@ -191,9 +213,9 @@ class TestRecommendationSystemUnit:
             mock_query.filter.return_value.all.return_value = candidates
 
             with patch.object(
-                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_dataset"
+                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_datasets"
             ) as mock_downloads:
-                mock_downloads.return_value = 10
+                mock_downloads.side_effect = lambda ids: {i: 10 for i in ids}
 
                 result = mock_dataset_service.get_recommendations(1, limit=10)
 
@@ -306,9 +328,9 @@ class TestRecommendationSystemUnit:
             mock_query.filter.return_value.all.return_value = candidates
 
             with patch.object(
-                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_dataset"
+                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_datasets"
             ) as mock_downloads:
-                mock_downloads.return_value = 10
+                mock_downloads.side_effect = lambda ids: {i: 10 for i in ids}
 
                 # Test limit of 5
                 result = mock_dataset_service.get_recommendations(1, limit=5)
@@ -318,6 +340,72 @@ class TestRecommendationSystemUnit:
                 result = mock_dataset_service.get_recommendations(1, limit=3)
                 assert len(result) == 3
 
+    @staticmethod
+    def _dataset(dataset_id, tags, created_at):
+        dataset = Mock()
+        dataset.id = dataset_id
+        dataset.created_at = created_at
+        dataset.ds_meta_data = Mock()
+        dataset.ds_meta_data.title = f"Dataset {dataset_id}"
+        dataset.ds_meta_data.tags = tags
+        dataset.ds_meta_data.authors = []
+        return dataset
+
+    def test_recommendations_for_many_match_single_calls(self, mock_dataset_service):
+        """Batch scoring must rank every dataset exactly like get_recommendations"""
+        catalog = [
+            self._dataset(1, "python, ml", datetime(2024, 1, 1, tzinfo=timezone.utc)),
+            self._dataset(2, "python", datetime(2024, 3, 1, tzinfo=timezone.utc)),
+            self._dataset(3, "ml, rust", datetime(2023, 6, 1, tzinfo=timezone.utc)),
+            self._dataset(4, "python, ml", datetime(2024, 9, 1, tzinfo=timezone.utc)),
+            self._dataset(5, "java", datetime(2024, 2, 1, tzinfo=timezone.utc)),
+        ]
+        downloads = {1: 4, 2: 10, 3: 0, 4: 7, 5: 2}
+        by_id = {dataset.id: dataset for dataset in catalog}
+
+        with (
+            patch.object(mock_dataset_service.repository, "get_by_id", side_effect=by_id.get),
+            patch("app.modules.dataset.models.DataSet.query") as mock_query,
+            patch.object(
+                mock_dataset_service.dsdownloadrecord_repository,
+                "count_downloads_for_datasets",
+                side_effect=lambda ids: {i: downloads[i] for i in ids},
+            ),
+        ):
+            mock_query.filter.return_value.all.return_value = catalog
+
+            batch = mock_dataset_service.get_recommendations_for_many([1, 2, 3, 5, 999], limit=3)
+            single = {i: mock_dataset_service.get_recommendations(i, limit=3) for i in [1, 2, 3, 5, 999]}
+
+        def ranking(recommendations):
+            return [(rec["dataset"].id, rec["score"]) for rec in recommendations]
+
+        assert list(batch) == [1, 2, 3, 5, 999]
+        assert {i: ranking(recs) for i, recs in batch.items()} == {i: ranking(recs) for i, recs in single.items()}
+        assert batch[5] == [] and batch[999] == []
+
+    def test_recommendations_for_many_loads_catalog_once(self, mock_dataset_service):
+        """Candidates and download counts are fetched once for the whole batch"""
+        catalog = [self._dataset(i, "python", datetime(2024, 1, i, tzinfo=timezone.utc)) for i in range(1, 8)]
+
+        with (
+            patch("app.modules.dataset.models.DataSet.query") as mock_query,
+            patch.object(mock_dataset_service.repository, "get_by_ids", return_value=catalog) as mock_get_by_ids,
+            patch.object(
+                mock_dataset_service.dsdownloadrecord_repository,
+                "count_downloads_for_datasets",
+                side_effect=lambda ids: {i: 1 for i in ids},
+            ) as mock_downloads,
+        ):
+            mock_query.filter.return_value.all.return_value = catalog
+
+            result = mock_dataset_service.get_recommendations_for_many(range(1, 8), limit=3)
+
+        assert mock_get_by_ids.call_count == 1
+        assert mock_downloads.call_count == 1
+        assert all(len(recs) == 3 for recs in result.values())
+        assert all(rec["dataset"].id != dataset_id for dataset_id, recs in result.items() for rec in recs)
+
     def test_recommendation_sorting_by_score(self):
         """Test that recommendations are sorted by score (descending)"""
         recommendations = [
@@ -450,9 +538,9 @@ class TestRecommendationSystemUnit:
             mock_query.filter.return_value.all.return_value = [candidate]
 
             with patch.object(
-                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_dataset"
+                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_datasets"
             ) as mock_downloads:
-                mock_downloads.return_value = 5
+                mock_downloads.side_effect = lambda ids: {i: 5 for i in ids}
 
                 result = mock_dataset_service.get_recommendations(1, limit=10)
                 assert len(result) == 1
@@ -490,10 +578,10 @@ class TestRecommendationSystemUnit:
             mock_query.filter.return_value.all.return_value = [candidate1, candidate2]
 
             with patch.object(
-                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_dataset"
+                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_datasets"
             ) as mock_downloads:
                 # First candidate has 10 downloads, second has 5
-                mock_downloads.side_effect = [10, 5]
+                mock_downloads.return_value = {2: 10, 3: 5}
 
                 result = mock_dataset_service.get_recommendations(1, limit=10)
                 assert len(result) == 2
@@ -528,11 +616,11 @@ class TestRecommendationSystemUnit:
             mock_query.filter.return_value.all.return_value = candidates
 
             with patch.object(
-                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_dataset"
+                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_datasets"
             ) as mock_downloads:
                 # Downloads: 100, 50, 20 -> tier1_max=100, tier2_max=66
                 # Dataset with 50 downloads should be in tier2
-                mock_downloads.side_effect = [100, 50, 20]
+                mock_downloads.return_value = {2: 100, 3: 50, 4: 20}
 
                 result = mock_dataset_service.get_recommendations(1, limit=10)
                 assert len(result) == 3
@@ -566,10 +654,10 @@ class TestRecommendationSystemUnit:
             mock_query.filter.return_value.all.return_value = candidates
 
             with patch.object(
-                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_dataset"
+                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_datasets"
             ) as mock_downloads:
                 # Downloads: 100, 70, 10 -> lowest should be tier3
-                mock_downloads.side_effect = [100, 70, 10]
+                mock_downloads.return_value = {2: 100, 3: 70, 4: 10}
 
                 result = mock_dataset_service.get_recommendations(1, limit=10)
                 assert len(result) == 3
@@ -613,9 +701,9 @@ class TestRecommendationSystemUnit:
             mock_query.filter.return_value.all.return_value = [candidate1, candidate2, candidate3]
 
             with patch.object(
-                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_dataset"
+                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_datasets"
             ) as mock_downloads:
-                mock_downloads.return_value = 10
+                mock_downloads.side_effect = lambda ids: {i: 10 for i in ids}
 
                 result = mock_dataset_service.get_recommendations(1, limit=10)
                 assert len(result) == 3
@@ -645,10 +733,325 @@ class TestRecommendationSystemUnit:
             mock_query.filter.return_value.all.return_value = [candidate]
 
             with patch.object(
-                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_dataset"
+                mock_dataset_service.dsdownloadrecord_repository, "count_downloads_for_datasets"
             ) as mock_downloads:
-                mock_downloads.return_value = 10
+                mock_downloads.side_effect = lambda ids: {i: 10 for i in ids}
 
                 result = mock_dataset_service.get_recommendations(1, limit=10)
                 assert len(result) == 1
                 # Old dataset should have tier3 recency score
+
+
+class TestRecommendationIndexUnit:
+    """
+    Unit tests for the tag/author inverted index used for candidate generation.
+    """
+
+    def test_candidates_count_shared_tags_and_authors(self):
+        index = DataSetRecommendationIndex()
+        index.add(1, {"python", "ml"}, {"john doe"})
+        index.add(2, {"python", "ml"}, {"jane smith"})
+        index.add(3, {"rust"}, {"john doe"})
+        index.add(4, {"rust"}, {"alice"})
+
+        candidates = index.get_candidates({"python", "ml"}, {"john doe"}, exclude_id=1)
+
+        assert candidates == {2: 2, 3: 1}
+
+    def test_candidates_exclude_current_dataset(self):
+        index = DataSetRecommendationIndex()
+        index.add(1, {"python"}, set())
+
+        assert index.get_candidates({"python"}, set(), exclude_id=1) == {}
+
+    def test_re_adding_dataset_replaces_its_terms(self):
+        index = DataSetRecommendationIndex()
+        index.add(1, {"python"}, {"john doe"})
+        index.add(1, {"rust"}, {"john doe"})
+
+        assert index.get_candidates({"python"}, set()) == {}
+        assert index.get_candidates({"rust"}, set()) == {1: 1}
+
+    def test_remove_drops_dataset_from_every_posting_list(self):
+        index = DataSetRecommendationIndex()
+        index.add(1, {"python"}, {"john doe"})
+        index.remove(1)
+
+        assert index.get_candidates({"python"}, {"john doe"}) == {}
+        assert len(index) == 0
+
+    def test_rebuild_from_rows_normalizes_terms(self):
+        index = DataSetRecommendationIndex()
+        index.rebuild(
+            [
+                (1, " Python , ML", "John Doe "),
+                (1, " Python , ML", "Jane Smith"),
+                (2, "python", None),
+            ]
+        )
+
+        assert index.get_terms(1) == (frozenset({"python", "ml"}), frozenset({"john doe", "jane smith"}))
+        assert index.get_candidates({"python"}, set(), exclude_id=1) == {2: 1}
+
+    def test_ensure_fresh_rebuilds_when_fingerprint_changes(self):
+        index = DataSetRecommendationIndex(ttl_seconds=3600)
+        repository = Mock()
+        repository.get_catalog_fingerprint.return_value = (1, 1)
+        repository.get_recommendation_terms.return_value = [(1, "python", None)]
+
+        index.ensure_fresh(repository)
+        index.ensure_fresh(repository)
+        assert repository.get_recommendation_terms.call_count == 1
+
+        repository.get_catalog_fingerprint.return_value = (2, 2)
+        repository.get_recommendation_terms.return_value = [(1, "python", None), (2, "python", None)]
+        index.ensure_fresh(repository)
+
+        assert repository.get_recommendation_terms.call_count == 2
+        assert index.get_candidates({"python"}, set(), exclude_id=1) == {2: 1}
+
+    def test_incremental_updates_advance_the_fingerprint_only_by_themselves(self):
+        index = DataSetRecommendationIndex(ttl_seconds=3600)
+        repository = Mock()
+        repository.get_catalog_fingerprint.return_value = (1, 1)
+        repository.get_recommendation_terms.return_value = [(1, "python", None)]
+        index.ensure_fresh(repository)
+
+        index.add(2, {"python"}, set())
+        repository.get_catalog_fingerprint.return_value = (2, 2)
+        index.sync_fingerprint(repository)
+        # An edit leaves the fingerprint as it was
+        index.add(2, {"python", "ml"}, set())
+        index.sync_fingerprint(repository)
+        index.ensure_fresh(repository)
+        assert repository.get_recommendation_terms.call_count == 1
+
+        # Another worker created dataset 3 while this one created dataset 4
+        index.add(4, {"python"}, set())
+        repository.get_catalog_fingerprint.return_value = (4, 4)
+        repository.get_recommendation_terms.return_value = [(n, "python", None) for n in range(1, 5)]
+        index.sync_fingerprint(repository)
+        index.ensure_fresh(repository)
+
+        assert repository.get_recommendation_terms.call_count == 2
+        assert index.get_candidates({"python"}, set(), exclude_id=1) == {2: 1, 3: 1, 4: 1}
+
+    @pytest.mark.parametrize(
+        "current,added,removed,follows",
+        [
+            ((6, 7), [7], [], True),
+            ((6, 8), [7], [], False),
+            ((7, 8), [8], [], False),
+            ((5, 5), [], [], False),
+            ((5, 6), [], [], True),
+            ((4, 6), [], [3], True),
+            ((4, 5), [], [6], True),
+            ((4, 6), [], [6], False),
+            ((5, 7), [7], [6], True),
+            ((5, 4), [4], [6], True),
+        ],
+    )
+    def test_fingerprint_follows_only_the_given_changes(self, current, added, removed, follows):
+        assert fingerprint_follows((5, 6), current, added, removed) is follows
+
+
+class TestMinHashLSHIndexUnit:
+    """
+    Unit tests for the approximate (MinHash + LSH) candidate index.
+    """
+
+    def test_identical_terms_are_always_candidates(self):
+        index = MinHashLSHIndex(num_perm=64, bands=16)
+        index.add(1, {"python", "ml"}, {"jane doe"})
+        index.add(2, {"python", "ml"}, {"jane doe"})
+        index.add(3, {"rust"}, {"bob"})
+
+        assert index.get_candidates({"python", "ml"}, {"jane doe"}, exclude_id=1) == {2: 3}
+
+    def test_candidates_are_a_subset_of_exact_ones_with_exact_coincidences(self):
+        index = MinHashLSHIndex(num_perm=64, bands=32)
+        for dataset_id in range(1, 200):
+            index.add(dataset_id, {f"tag{dataset_id % 7}", f"tag{dataset_id % 11}"}, {f"author{dataset_id % 5}"})
+
+        exact = index.get_exact_candidates({"tag1", "tag3"}, {"author2"}, exclude_id=1)
+        approximate = index.get_candidates({"tag1", "tag3"}, {"author2"}, exclude_id=1)
+
+        assert approximate
+        assert all(exact[dataset_id] == coincidences for dataset_id, coincidences in approximate.items())
+
+    def test_remove_drops_dataset_from_buckets(self):
+        index = MinHashLSHIndex(num_perm=32, bands=16)
+        index.add(1, {"python"}, set())
+        index.add(2, {"python"}, set())
+
+        index.remove(2)
+
+        assert index.get_candidates({"python"}, set(), exclude_id=1) == {}
+        assert not any(2 in ids for ids in index._buckets.values())
+
+    def test_bands_must_divide_permutations(self):
+        with pytest.raises(ValueError):
+            MinHashLSHIndex(num_perm=100, bands=30)
+
+    def test_engine_switch(self, monkeypatch):
+        monkeypatch.setenv("RECOMMENDATION_ENGINE", "approximate")
+        assert isinstance(create_recommendation_index(), MinHashLSHIndex)
+
+        monkeypatch.setenv("RECOMMENDATION_ENGINE", "exact")
+        index = create_recommendation_index()
+        assert isinstance(index, DataSetRecommendationIndex) and not isinstance(index, MinHashLSHIndex)
+
+    def test_recall_at_k(self):
+        exact = [{"dataset": Mock(id=i)} for i in (1, 2, 3, 4)]
+        approximate = [{"dataset": Mock(id=i)} for i in (2, 4, 9)]
+
+        assert recall_at_k(exact, approximate) == 0.5
+        assert recall_at_k([], approximate) == 1.0
+
+
+def _reference_scores(candidates, limit):
+    """Pure-Python scoring kept as the reference the vectorized engine must reproduce."""
+    downloads_list = sorted(c["downloads"] for c in candidates)
+    dates_list = sorted(c["created_at"] for c in candidates)
+    n = len(candidates)
+    d1, d2 = downloads_list[n // 3], downloads_list[(2 * n) // 3]
+    t1, t2 = dates_list[n // 3], dates_list[(2 * n) // 3]
+    max_coincidences = max(c["coincidences"] for c in candidates)
+
+    recommendations = []
+    for c in candidates:
+        score = 0.0
+        score += 1.0 if c["downloads"] <= d1 else 2.0 if c["downloads"] <= d2 else 3.0
+        score += 1.0 if c["created_at"] <= t1 else 2.0 if c["created_at"] <= t2 else 3.0
+        score += (c["coincidences"] / max_coincidences) * 4.0
+        recommendations.append({"dataset": c["dataset"], "score": round(score, 2)})
+    recommendations.sort(key=lambda x: x["score"], reverse=True)
+    return [(rec["dataset"], rec["score"]) for rec in recommendations[:limit]], (d1, d2)
+
+
+class TestRecommendationScoringUnit:
+    """
+    Unit tests for the vectorized (NumPy) scoring engine.
+    """
+
+    @staticmethod
+    def _candidates(n, seed):
+        rng = random.Random(seed)
+        start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        return [
+            {
+                "dataset": i,
+                "coincidences": rng.randint(1, 6),
+                "downloads": int(rng.paretovariate(1.2)) - 1,
+                "created_at": start + timedelta(days=rng.randint(0, 60)),
+            }
+            for i in range(n)
+        ]
+
+    def test_tier_thresholds_match_sorted_positions(self):
+        for values in ([7], [3, 1], [5, 1, 9], [4, 4, 1, 8, 2, 2, 9]):
+            ordered = sorted(values)
+            n = len(values)
+            assert tier_thresholds(np.array(values)) == (ordered[n // 3], ordered[(2 * n) // 3])
+
+    @pytest.mark.parametrize("n,limit", [(1, 10), (2, 10), (3, 1), (50, 10), (5000, 10), (300, 300)])
+    def test_ranking_matches_reference(self, n, limit):
+        candidates = self._candidates(n, seed=n + limit)
+
+        recommendations, download_tiers = score_candidates(candidates, limit)
+
+        expected, expected_tiers = _reference_scores(candidates, limit)
+        assert [(rec["dataset"], rec["score"]) for rec in recommendations] == expected
+        assert download_tiers == expected_tiers
+
+    def test_ties_keep_candidate_order(self):
+        created_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        candidates = [{"dataset": i, "coincidences": 1, "downloads": 0, "created_at": created_at} for i in range(20)]
+
+        recommendations, _ = score_candidates(candidates, 5)
+
+        assert [rec["dataset"] for rec in recommendations] == [0, 1, 2, 3, 4]
+
+    def test_empty_candidates(self):
+        assert score_candidates([], 5) == ([], None)
+
+
+class TestMaterializedRecommendationsUnit:
+    """
+    Unit tests for the materialized recommendations service (dataset_recommendation table).
+    """
+
+    @pytest.fixture
+    def app_context(self):
+        app = create_app()
+        app.config["TESTING"] = True
+        with app.app_context():
+            yield app
+
+    @pytest.fixture
+    def recommendation_service(self, app_context):
+        service = DataSetRecommendationService()
+        service.repository = Mock()
+        service.dataset_service = Mock()
+        service.top_n = 10
+        return service
+
+    @staticmethod
+    def _row(dataset_id, score):
+        row = Mock()
+        row.to_recommendation.return_value = {
+            "dataset": Mock(id=dataset_id),
+            "score": score,
+            "downloads": 0,
+            "coincidences": 1,
+        }
+        return row
+
+    def test_fresh_datasets_are_served_without_rescoring(self, recommendation_service):
+        state = Mock(refreshed_at=datetime.now(timezone.utc))
+        recommendation_service.repository.get_fresh_states.return_value = {1: state}
+        recommendation_service.repository.list_for_datasets.return_value = {1: [self._row(2, 7.5)]}
+
+        result = recommendation_service.get_for_datasets([1], limit=3)
+
+        recommendation_service.dataset_service.compute_recommendations_for_many.assert_not_called()
+        assert [rec["score"] for rec in result[1]] == [7.5]
+
+    def test_missing_and_expired_datasets_are_refreshed(self, recommendation_service):
+        fresh = Mock(refreshed_at=datetime.now(timezone.utc))
+        expired = Mock(refreshed_at=datetime(2000, 1, 1, tzinfo=timezone.utc))
+        recommendation_service.repository.get_fresh_states.return_value = {1: fresh, 2: expired}
+        recommendation_service.repository.list_for_datasets.return_value = {1: [], 2: [], 3: []}
+        recommendation_service.dataset_service.compute_recommendations_for_many.return_value = {
+            2: ([], None),
+            3: ([], None),
+        }
+
+        recommendation_service.get_for_datasets([1, 2, 3], limit=3)
+
+        recommendation_service.dataset_service.compute_recommendations_for_many.assert_called_once_with([2, 3], 10)
+        recommendation_service.repository.replace_for_datasets.assert_called_once_with(
+            {2: ([], None), 3: ([], None)}, commit=True
+        )
+
+    def test_limit_above_top_n_falls_back_to_live_scoring(self, recommendation_service):
+        recommendation_service.dataset_service.get_recommendations_for_many.return_value = {1: []}
+
+        recommendation_service.get_for_datasets([1], limit=50)
+
+        recommendation_service.dataset_service.get_recommendations_for_many.assert_called_once_with([1], limit=50)
+        recommendation_service.repository.get_fresh_states.assert_not_called()
+
+    def test_download_invalidates_only_neighbours(self, app_context):
+        service = DataSetService()
+        service.recommendation_index = DataSetRecommendationIndex()
+        service.recommendation_index.ensure_fresh = Mock()
+        service.recommendation_index.add(1, {"python"}, set())
+        service.recommendation_index.add(2, {"python"}, set())
+        service.recommendation_index.add(3, {"rust"}, set())
+        service.recommendation_repository = Mock()
+
+        with patch.object(service.dsdownloadrecord_repository, "count_downloads_for_dataset", return_value=4):
+            service.on_dataset_downloaded(1)
+
+        service.recommendation_repository.mark_stale_for_download_shift.assert_called_once_with({2}, 3, 4)
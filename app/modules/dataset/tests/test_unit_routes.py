@@ -881,6 +881,7 @@ class TestDownloadDatasetRoute:
             response.headers["Content-Type"] == "application/zip"
         ), f"Response should be zip file but was {response.headers['Content-Type']}"
         assert "attachment" in response.headers["Content-Disposition"], "Response should be an attachment"
+        assert f"filename=dataset_{dataset_id}.zip" in response.headers["Content-Disposition"]
 
         with test_client.application.app_context():
             # Need to session refresh to get updated value
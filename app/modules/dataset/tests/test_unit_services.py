@@ -8,7 +8,15 @@ import pytest
 
 from app import db
 from app.modules.auth.models import User
-from app.modules.dataset.models import Author, DataSet, DSMetaData, DSViewRecord, Observation, PublicationType
+from app.modules.dataset.models import (
+    Author,
+    DataSet,
+    DSDownloadRecord,
+    DSMetaData,
+    DSViewRecord,
+    Observation,
+    PublicationType,
+)
 from app.modules.dataset.services import (
     AuthorService,
     DataSetService,
@@ -315,6 +323,25 @@ class TestDataSetService:
 
             assert isinstance(recommendations, list), "Recommendations should be a list"
 
+    def test_get_download_counts(self, test_client):
+        """
+        Tests that download counts for several datasets come back in one dict, with 0 for no downloads.
+        """
+        with test_client.application.app_context():
+            dataset_id = test_client.test_dataset_id
+            for i in range(3):
+                db.session.add(DSDownloadRecord(dataset_id=dataset_id, download_cookie=f"bulk-count-cookie-{i}"))
+            db.session.commit()
+
+            service = DataSetService()
+            counts = service.get_download_counts([dataset_id, 999999])
+            expected = service.dsdownloadrecord_repository.count_downloads_for_dataset(dataset_id)
+
+            assert counts[dataset_id] == expected, "Bulk count should match the per-dataset count"
+            assert counts[dataset_id] >= 3, "All download records should be counted"
+            assert counts[999999] == 0, "Datasets without downloads should map to 0"
+            assert service.get_download_counts([]) == {}
+
     def test_get_or_404_existing_dataset(self, test_client):
         """
         Tests getting an existing dataset.
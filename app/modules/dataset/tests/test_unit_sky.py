@@ -0,0 +1,65 @@
+import random
+
+import pytest
+
+from app.modules.dataset.models import Observation
+from app.modules.dataset.sky import (
+    angular_separation,
+    cone_window,
+    parse_cone_arguments,
+    parse_dec,
+    parse_ra,
+    zone_of,
+)
+
+
+class TestSkyCoordinates:
+
+    def test_parse_sexagesimal_coordinates(self):
+        assert parse_ra("00:42:44.330") == pytest.approx(10.684708, abs=1e-6)
+        assert parse_dec("+41:16:07.50") == pytest.approx(41.268750, abs=1e-6)
+        assert parse_dec("-05:23:28") == pytest.approx(-5.391111, abs=1e-6)
+        assert parse_ra("24:00:00") is None
+        assert parse_dec("+91:00:00") is None
+        assert parse_ra("not a coordinate") is None and parse_ra(None) is None
+
+    def test_observation_keeps_numeric_coordinates_in_sync(self):
+        observation = Observation(object_name="M42", ra="05:35:17.3", dec="-05:23:28")
+        assert observation.ra_deg == pytest.approx(83.822083, abs=1e-6)
+        assert observation.dec_zone == zone_of(observation.dec_deg)
+
+        observation.dec = "+89:59:59"
+        assert observation.dec_zone == zone_of(89.999)
+        observation.ra = "invalid"
+        assert observation.ra_deg is None
+
+    def test_cone_window_contains_every_point_of_the_cone(self):
+        rng = random.Random(0)
+        for _ in range(500):
+            ra, dec, radius = rng.uniform(0, 360), rng.uniform(-90, 90), rng.uniform(0.01, 10)
+            window = cone_window(ra, dec, radius)
+            point_ra, point_dec = rng.uniform(0, 360), rng.uniform(-90, 90)
+            if angular_separation(ra, dec, point_ra, point_dec) > radius:
+                continue
+            assert zone_of(point_dec) in window.zones
+            assert any(low <= point_ra <= high for low, high in window.ra_ranges)
+
+    def test_cone_window_wraps_around_ra_zero(self):
+        window = cone_window(359.5, 0.0, 1.0)
+        assert window.ra_ranges == [(pytest.approx(358.5), 360.0), (0.0, pytest.approx(0.5))]
+        assert cone_window(10.0, 89.5, 1.0).ra_ranges == [(0.0, 360.0)]
+
+    def test_parse_cone_arguments(self):
+        assert parse_cone_arguments({"ra": "83.82", "dec": "-5.39", "radius": "0.5"}) == (83.82, -5.39, 0.5)
+        ra, dec, _ = parse_cone_arguments({"ra": "05:35:17.3", "dec": "-05:23:28", "radius": "1"})
+        assert ra == pytest.approx(83.822083, abs=1e-6) and dec == pytest.approx(-5.391111, abs=1e-6)
+
+        for args in (
+            {"dec": "0", "radius": "1"},
+            {"ra": "400", "dec": "0", "radius": "1"},
+            {"ra": "10", "dec": "0", "radius": "0"},
+            {"ra": "10", "dec": "0", "radius": "45"},
+            {"ra": "10", "dec": "north", "radius": "1"},
+        ):
+            with pytest.raises(ValueError):
+                parse_cone_arguments(args)
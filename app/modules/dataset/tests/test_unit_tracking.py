@@ -0,0 +1,151 @@
+import time
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.benchmarks import count_queries
+from app.modules.dataset.models import DataSet, DSDownloadRecord, DSMetaData, DSViewRecord, PublicationType
+from app.modules.dataset.tracking import DATASET_DOWNLOAD, DATASET_VIEW, TrackingBuffer
+
+
+class TestTrackingBuffer:
+    """Write-behind download and view records."""
+
+    @pytest.fixture
+    def dataset_ids(self, test_client, clean_database):
+        user = User(email="tracking@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        datasets = [
+            DataSet(
+                user_id=user.id,
+                ds_meta_data=DSMetaData(
+                    title=f"Tracked {n}", description="Photometry", publication_type=PublicationType.NONE
+                ),
+            )
+            for n in range(2)
+        ]
+        db.session.add_all(datasets)
+        db.session.commit()
+        return [dataset.id for dataset in datasets]
+
+    def test_events_are_buffered_and_deduplicated_by_cookie(self, dataset_ids):
+        buffer = TrackingBuffer(max_events=1000, flush_interval=3600)
+        first, second = dataset_ids
+
+        with count_queries() as counter:
+            assert buffer.record(DATASET_DOWNLOAD, first, "cookie-a")
+            assert not buffer.record(DATASET_DOWNLOAD, first, "cookie-a")
+            assert buffer.record(DATASET_DOWNLOAD, first, "cookie-b")
+            assert buffer.record(DATASET_DOWNLOAD, second, "cookie-a")
+            assert buffer.record(DATASET_VIEW, first, "cookie-a")
+            for _ in range(3):
+                buffer.count_download(first)
+        assert counter["queries"] == 0
+        assert DSDownloadRecord.query.count() == 0
+
+        inserted = buffer.flush()
+
+        assert inserted[DATASET_DOWNLOAD] == {first: 2, second: 1}
+        assert DSDownloadRecord.query.filter_by(dataset_id=first).count() == 2
+        assert DSViewRecord.query.filter_by(dataset_id=first, view_cookie="cookie-a").count() == 1
+        assert db.session.get(DataSet, first).download_count == 3
+        assert buffer.flush() == {}
+
+    def test_flush_costs_the_same_for_any_batch_size(self, dataset_ids):
+        def flush_queries(events):
+            buffer = TrackingBuffer(max_events=10000, flush_interval=3600)
+            for n in range(events):
+                buffer.record(DATASET_DOWNLOAD, dataset_ids[n % 2], f"cookie-{events}-{n}")
+                buffer.count_download(dataset_ids[n % 2])
+            with count_queries() as counter:
+                buffer.flush()
+            return counter["queries"]
+
+        assert flush_queries(500) == flush_queries(5)
+        assert DSDownloadRecord.query.count() == 505
+
+    def test_records_stored_by_another_worker_are_not_duplicated(self, dataset_ids):
+        db.session.add(DSDownloadRecord(dataset_id=dataset_ids[0], download_cookie="cookie-a"))
+        db.session.commit()
+        buffer = TrackingBuffer(max_events=1000, flush_interval=3600)
+        received = []
+        buffer.add_listener(received.append)
+
+        buffer.record(DATASET_DOWNLOAD, dataset_ids[0], "cookie-a")
+        buffer.record(DATASET_DOWNLOAD, dataset_ids[0], "cookie-a", user_id=None)
+        buffer.record(DATASET_DOWNLOAD, dataset_ids[1], "cookie-a")
+        buffer.flush()
+
+        assert DSDownloadRecord.query.filter_by(download_cookie="cookie-a").count() == 2
+        assert received == [{DATASET_DOWNLOAD: {dataset_ids[1]: 1}}]
+
+    def test_size_threshold_flushes_in_the_background(self, test_client, dataset_ids):
+        buffer = TrackingBuffer(max_events=3, flush_interval=3600)
+        for n in range(3):
+            buffer.record(DATASET_DOWNLOAD, dataset_ids[0], f"cookie-{n}")
+
+        deadline = time.monotonic() + 10
+        while buffer.flushes == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+        assert buffer.flushes == 1
+        db.session.expire_all()
+        assert DSDownloadRecord.query.filter_by(dataset_id=dataset_ids[0]).count() == 3
+
+    def test_events_of_failed_flushes_are_kept_then_can_be_recorded_again(self, dataset_ids):
+        buffer = TrackingBuffer(max_events=1000, flush_interval=3600)
+        failure = OperationalError("INSERT", {}, Exception("gone away"))
+        buffer.record(DATASET_DOWNLOAD, dataset_ids[0], "cookie-a")
+
+        with patch.object(buffer, "_write", side_effect=failure):
+            with pytest.raises(OperationalError):
+                buffer.flush()
+            # Still buffered for the next flush
+            assert not buffer.record(DATASET_DOWNLOAD, dataset_ids[0], "cookie-a")
+
+            buffer.max_events = 0
+            with pytest.raises(OperationalError):
+                buffer.flush()
+        assert buffer.dropped == 1
+
+        buffer.max_events = 1000
+        assert buffer.record(DATASET_DOWNLOAD, dataset_ids[0], "cookie-a")
+        buffer.flush()
+        assert DSDownloadRecord.query.filter_by(download_cookie="cookie-a").count() == 1
+
+    def test_synchronous_failures_do_not_reach_the_request(self, dataset_ids):
+        buffer = TrackingBuffer(flush_interval=0)
+        user = User(email="pending@example.com", password="test1234")
+        db.session.add(user)
+
+        with patch.object(buffer, "_write", side_effect=OperationalError("INSERT", {}, Exception("gone away"))):
+            assert buffer.record(DATASET_VIEW, dataset_ids[0], "cookie-a")
+
+        assert user in db.session
+        db.session.commit()
+        assert User.query.filter_by(email="pending@example.com").count() == 1
+        assert buffer.flush()[DATASET_VIEW] == {dataset_ids[0]: 1}
+
+    def test_events_of_deleted_datasets_are_dropped_alone(self, dataset_ids):
+        kept, deleted = dataset_ids
+        buffer = TrackingBuffer(max_events=1000, flush_interval=3600)
+        buffer.record(DATASET_DOWNLOAD, kept, "cookie-a")
+        buffer.record(DATASET_DOWNLOAD, deleted, "cookie-a")
+        buffer.record(DATASET_DOWNLOAD, kept, "cookie-b")
+        buffer.record(DATASET_VIEW, kept, "cookie-a")
+        buffer.count_download(deleted)
+        db.session.delete(db.session.get(DataSet, deleted))
+        db.session.commit()
+
+        inserted = buffer.flush()
+
+        assert inserted == {DATASET_DOWNLOAD: {kept: 2}, DATASET_VIEW: {kept: 1}}
+        assert buffer.dropped == 1
+        assert DSDownloadRecord.query.filter_by(dataset_id=kept).count() == 2
+        assert DSViewRecord.query.filter_by(dataset_id=kept).count() == 1
+        # Nothing was put back for the next flush
+        assert buffer.flush() == {}
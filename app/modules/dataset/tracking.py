@@ -0,0 +1,309 @@
+"""
+Write-behind tracking of dataset and file downloads and views.
+
+Download and view views used to look up the (user, target, cookie) record,
+insert it and commit the download counter on every request. They now hand
+the event to tracking_buffer, which deduplicates it by cookie in memory and
+returns: the request does no database write at all. A background thread
+writes the buffered events every TRACKING_FLUSH_INTERVAL seconds, or as
+soon as TRACKING_BUFFER_SIZE events are waiting, with one multi-row INSERT
+per record table and one batched UPDATE of DataSet.download_count.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from datetime import datetime, timezone
+
+from flask import current_app
+from sqlalchemy import and_, bindparam, insert, select, update
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app import db
+from app.modules.dataset.models import DataSet, DSDownloadRecord, DSViewRecord
+from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
+
+logger = logging.getLogger(__name__)
+
+DATASET_DOWNLOAD = "dataset_download"
+DATASET_VIEW = "dataset_view"
+FILE_DOWNLOAD = "file_download"
+FILE_VIEW = "file_view"
+
+# kind -> (record model, target column, date column, cookie column)
+TRACKED_RECORDS = {
+    DATASET_DOWNLOAD: (DSDownloadRecord, "dataset_id", "download_date", "download_cookie"),
+    DATASET_VIEW: (DSViewRecord, "dataset_id", "view_date", "view_cookie"),
+    FILE_DOWNLOAD: (HubfileDownloadRecord, "file_id", "download_date", "download_cookie"),
+    FILE_VIEW: (HubfileViewRecord, "file_id", "view_date", "view_cookie"),
+}
+
+
+class TrackingBuffer:
+    """
+    In-process buffer of download and view events.
+
+    record() keeps one event per (kind, target, user, cookie), as the record
+    tables always did: events already buffered, or stored recently (up to
+    TRACKING_SEEN_SIZE of them), are dropped in memory, and before inserting,
+    a flush reads which events of the batch another worker or an earlier
+    process already stored, with one query per table. An event only counts
+    as stored once its flush committed, so events dropped after failed
+    flushes can be recorded again. Each kind is written in a savepoint of
+    its own, and rows that break a constraint are dropped one by one rather
+    than holding back the rest of the batch. count_download() adds to the per-request
+    download_count of a dataset.
+
+    Listeners added with add_listener(fn) are called after every flush with
+    {kind: {target_id: new records}}, inside the flushing app context.
+    TRACKING_FLUSH_INTERVAL=0 writes every event through synchronously (the
+    tests set flush_interval to 0 on the shared buffer).
+    """
+
+    def __init__(self, max_events: int = None, flush_interval: float = None, seen_size: int = None):
+        if max_events is None:
+            max_events = int(os.getenv("TRACKING_BUFFER_SIZE", "500"))
+        if flush_interval is None:
+            flush_interval = float(os.getenv("TRACKING_FLUSH_INTERVAL", "5"))
+        if seen_size is None:
+            seen_size = int(os.getenv("TRACKING_SEEN_SIZE", "100000"))
+        self.max_events = max_events
+        self.flush_interval = flush_interval
+        self.seen_size = seen_size
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._pending = defaultdict(list)
+        self._pending_count = 0
+        self._download_counts = Counter()
+        self._seen = OrderedDict()
+        self._pending_keys = set()
+        self._listeners = []
+        self._timer = None
+        self._app = None
+        self.flushes = 0
+        self.dropped = 0
+
+    def add_listener(self, listener):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    # ------------------------------------------------------------------
+    # Recording (request path)
+    # ------------------------------------------------------------------
+    def record(self, kind: str, target_id: int, cookie: str, user_id: int = None, when: datetime = None) -> bool:
+        """Buffer one event; False when the same event was already seen."""
+        key = (kind, target_id, user_id, cookie)
+        with self._lock:
+            if key in self._pending_keys:
+                return False
+            if key in self._seen:
+                self._seen.move_to_end(key)
+                return False
+            self._pending_keys.add(key)
+            self._pending[kind].append((target_id, user_id, cookie, when or datetime.now(timezone.utc)))
+            self._pending_count += 1
+        self._after_change()
+        return True
+
+    def count_download(self, dataset_id: int):
+        with self._lock:
+            self._download_counts[dataset_id] += 1
+            self._pending_count += 1
+        self._after_change()
+
+    def _after_change(self):
+        if self._app is None:
+            self._app = current_app._get_current_object()
+        if self.flush_interval <= 0:
+            try:
+                self.flush()
+            except Exception as exc:
+                # Tracking must not fail the download or view that triggered it
+                logger.warning(f"Could not write tracked downloads and views: {exc}")
+        elif self._pending_count >= self.max_events:
+            self._schedule(0)
+        else:
+            self._schedule(self.flush_interval)
+
+    def _schedule(self, delay: float):
+        with self._lock:
+            if self._timer is not None and (delay > 0 or self._timer.interval == 0):
+                return
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(delay, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_in_background(self):
+        with self._lock:
+            self._timer = None
+        try:
+            with self._app.app_context():
+                self.flush()
+        except Exception as exc:
+            logger.warning(f"Could not flush tracked downloads and views: {exc}")
+            if self._pending_count:
+                self._schedule(self.flush_interval)
+
+    # ------------------------------------------------------------------
+    # Flushing
+    # ------------------------------------------------------------------
+    def _take(self):
+        with self._lock:
+            pending, counts = self._pending, self._download_counts
+            self._pending, self._download_counts = defaultdict(list), Counter()
+            self._pending_count = 0
+        return pending, counts
+
+    def _restore(self, pending, counts):
+        """Put back the events of a failed flush, unless the buffer already grew too large to keep them."""
+        with self._lock:
+            size = sum(len(events) for events in pending.values()) + sum(counts.values())
+            if self._pending_count + size > 10 * self.max_events:
+                self.dropped += size
+                self._pending_keys.difference_update(self._keys(pending))
+                logger.warning(f"Dropped {size} tracked downloads and views after a failed flush")
+                return
+            for kind, events in pending.items():
+                self._pending[kind][:0] = events
+            self._download_counts.update(counts)
+            self._pending_count += size
+
+    @staticmethod
+    def _keys(pending):
+        return [(kind, *event[:3]) for kind, events in pending.items() for event in events]
+
+    def _mark_stored(self, pending, dropped: list):
+        """The events of pending were written, except dropped (keys of events no row could be written for)."""
+        dropped = set(dropped)
+        with self._lock:
+            self.dropped += len(dropped)
+            for key in self._keys(pending):
+                self._pending_keys.discard(key)
+                if key not in dropped:
+                    self._seen[key] = None
+                    self._seen.move_to_end(key)
+            while len(self._seen) > self.seen_size:
+                self._seen.popitem(last=False)
+
+    @staticmethod
+    def _new_events(kind: str, events: list) -> list:
+        """events minus the ones already stored, one per (target, user, cookie)."""
+        model, target, _, cookie = TRACKED_RECORDS[kind]
+        target_column, cookie_column = getattr(model, target), getattr(model, cookie)
+        rows = db.session.execute(
+            select(target_column, model.user_id, cookie_column).where(
+                and_(
+                    target_column.in_(list({event[0] for event in events})),
+                    cookie_column.in_(list({event[2] for event in events})),
+                )
+            )
+        ).all()
+        stored = {tuple(row) for row in rows}
+        new = []
+        for event in events:
+            if event[:3] not in stored:
+                stored.add(event[:3])
+                new.append(event)
+        return new
+
+    def flush(self) -> dict:
+        """Write every buffered event now; returns {kind: {target_id: new records}}."""
+        with self._flush_lock:
+            pending, counts = self._take()
+            if not pending and not counts:
+                return {}
+            inserted, dropped = {}, []
+            written = False
+            try:
+                # A savepoint, so a failed write does not roll back the request that flushed synchronously
+                with db.session.begin_nested():
+                    inserted, dropped = self._write(pending, counts)
+                written = True
+                db.session.commit()
+            except Exception:
+                if written:
+                    db.session.rollback()
+                self._restore(pending, counts)
+                raise
+            self._mark_stored(pending, dropped)
+            self.flushes += 1
+
+        for listener in self._listeners:
+            try:
+                listener(inserted)
+            except Exception as exc:
+                logger.warning(f"Tracking listener {listener} failed: {exc}")
+                db.session.rollback()
+        return inserted
+
+    def _write(self, pending, counts) -> tuple:
+        """Returns ({kind: {target_id: new records}}, keys of the dropped events)."""
+        inserted, dropped = {}, []
+        for kind, events in pending.items():
+            stored, failed = self._insert(kind, self._new_events(kind, events))
+            inserted[kind] = Counter(event[0] for event in stored)
+            dropped.extend((kind, *event[:3]) for event in failed)
+        if counts:
+            table = DataSet.__table__
+            db.session.execute(
+                update(table)
+                .where(table.c.id == bindparam("dataset_id"))
+                .values(download_count=table.c.download_count + bindparam("downloads")),
+                [{"dataset_id": key, "downloads": value} for key, value in counts.items()],
+            )
+        return inserted, dropped
+
+    @staticmethod
+    def _insert(kind: str, events: list) -> tuple:
+        """
+        Insert the events of one kind with one statement, in a savepoint of
+        its own. When the batch breaks a constraint (e.g. its target was
+        deleted while the event was buffered), the rows are retried one by one
+        and only those that fail are dropped. Returns (stored, dropped) events;
+        other errors (a lost connection) are raised, so the batch is retried.
+        """
+        if not events:
+            return [], []
+        model, target, date, cookie = TRACKED_RECORDS[kind]
+        rows = [{target: t, "user_id": u, cookie: c, date: when} for t, u, c, when in events]
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(model), rows)
+            return events, []
+        except (IntegrityError, DataError) as exc:
+            logger.warning(f"Writing {len(events)} {kind} events one by one: {exc.orig}")
+
+        stored, dropped = [], []
+        for event, row in zip(events, rows):
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(model), [row])
+                stored.append(event)
+            except (IntegrityError, DataError) as exc:
+                logger.warning(f"Dropped {kind} event for {target} {event[0]}: {exc.orig}")
+                dropped.append(event)
+        return stored, dropped
+
+    def flush_at_exit(self):
+        if self._app is not None:
+            try:
+                with self._app.app_context():
+                    self.flush()
+            except Exception as exc:
+                logger.warning(f"Could not flush tracked downloads and views at exit: {exc}")
+
+    def clear(self):
+        """Forget buffered and seen events without writing them."""
+        with self._lock:
+            self._pending, self._download_counts = defaultdict(list), Counter()
+            self._pending_count = 0
+            self._pending_keys.clear()
+            self._seen.clear()
+
+
+tracking_buffer = TrackingBuffer()
+atexit.register(tracking_buffer.flush_at_exit)
@@ -0,0 +1,58 @@
+"""
+Trigrams of author and object names, for typo-tolerant matching.
+
+Names are normalized to lowercase ASCII letters and digits ("Ana Ruíz" and
+"ana ruiz" both become "anaruiz"), then cut into the overlapping three
+character pieces of the name padded with PAD ("$$anaruiz$"). The trigrams
+are stored in the name_trigram table (see models.name_trigram), indexed by
+(kind, trigram), so a lookup reads only the postings of the query's own
+trigrams. A name matches a query when it contains the normalized query, or
+when it holds at least SIMILARITY_THRESHOLD of the query's trigrams
+("Andromda" keeps 7 of its 9 trigrams in "Andromeda").
+"""
+
+import math
+import os
+import re
+
+import unidecode
+
+PAD = "$"
+TRIGRAM_SIZE = 3
+
+# Share of the query trigrams a name must hold to match fuzzily
+SIMILARITY_THRESHOLD = float(os.getenv("FUZZY_SIMILARITY_THRESHOLD", "0.5"))
+
+# Names are cut to the width of the name_trigram.term column
+MAX_TERM_LENGTH = 255
+
+_NOT_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_name(name) -> str:
+    return _NOT_ALPHANUMERIC.sub("", unidecode.unidecode(name or "").lower())[:MAX_TERM_LENGTH]
+
+
+def trigrams(normalized: str) -> set:
+    """Padded trigrams of a normalized name; empty for an empty name."""
+    if not normalized:
+        return set()
+    padded = PAD * 2 + normalized + PAD
+    return {padded[i : i + TRIGRAM_SIZE] for i in range(len(padded) - TRIGRAM_SIZE + 1)}
+
+
+def min_shared(query_trigrams: set, threshold: float = None) -> int:
+    """Trigrams a name must share with the query to be a fuzzy match."""
+    if threshold is None:
+        threshold = SIMILARITY_THRESHOLD
+    return max(1, math.ceil(threshold * len(query_trigrams)))
+
+
+def similarity(query: str, name: str) -> float:
+    """Share of the trigrams of query found in name, both normalized (1.0 when name contains query)."""
+    query_trigrams = trigrams(query)
+    if not query_trigrams:
+        return 0.0
+    if query in name:
+        return 1.0
+    return len(query_trigrams & trigrams(name)) / len(query_trigrams)
@@ -29,10 +29,22 @@ function send_query() {
     });
 }
 
+// Explore results are paginated by the server; further pages load on scroll
+const EXPLORE_PAGE_SIZE = 20;
+
+const exploreState = {
+    criteria: null,
+    nextCursor: null,
+    loading: false,
+    requestId: 0,
+};
+
+let resultsObserver = null;
+
 function filterChangeHandler(e) {
     const csrfToken = document.getElementById('csrf_token').value;
 
-    const searchCriteria = {
+    exploreState.criteria = {
         csrf_token: csrfToken,
         query: document.querySelector('#query').value,
         date_after: document.querySelector('#date_after').value,
@@ -40,166 +52,217 @@ function filterChangeHandler(e) {
         author: document.querySelector('#author').value,
         tags: $('#tags').val() || [],
         publication_type: document.querySelector('#publication_type').value,
+        object_name: document.querySelector('#object_name').value,
+        filter_used: document.querySelector('#filter_used').value,
+        observed_after: document.querySelector('#observed_after').value,
+        observed_before: document.querySelector('#observed_before').value,
+        magnitude_min: document.querySelector('#magnitude_min').value,
+        magnitude_max: document.querySelector('#magnitude_max').value,
         sorting: document.querySelector('[name="sorting"]:checked').value,
     };
+    exploreState.nextCursor = null;
+    // Responses of previous criteria are ignored once they arrive
+    exploreState.requestId += 1;
+
+    fetch_results_page(true);
+}
+
+function fetch_results_page(firstPage) {
+    const requestId = exploreState.requestId;
+    const body = {...exploreState.criteria, page_size: EXPLORE_PAGE_SIZE};
+    if (!firstPage) {
+        body.cursor = exploreState.nextCursor;
+    }
 
-    console.log(document.querySelector('#publication_type').value);
+    exploreState.loading = true;
 
     fetch('/explore', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify(searchCriteria),
+        body: JSON.stringify(body),
     })
     .then(response => response.json())
     .then(data => {
+        if (requestId !== exploreState.requestId) {
+            return;
+        }
+        exploreState.loading = false;
+        exploreState.nextCursor = data.next_cursor || null;
+
+        if (firstPage) {
+            document.getElementById('results').innerHTML = '';
+
+            // results counter
+            const resultCount = data.total_estimate ?? data.datasets.length;
+            const resultText = resultCount === 1 ? 'dataset' : 'datasets';
+            document.getElementById('results_number').textContent = `${resultCount} ${resultText} found`;
+
+            if (resultCount === 0) {
+                console.log("show not found icon");
+                document.getElementById("results_not_found").style.display = "block";
+            } else {
+                document.getElementById("results_not_found").style.display = "none";
+            }
+        }
 
-        console.log(data);
-        document.getElementById('results').innerHTML = '';
-
-        // results counter
-        const resultCount = data.length;
-        const resultText = resultCount === 1 ? 'dataset' : 'datasets';
-        document.getElementById('results_number').textContent = `${resultCount} ${resultText} found`;
+        (data.datasets || []).forEach(dataset => append_dataset_card(dataset));
+        feather.replace(); // Re-render feather icons
 
-        if (resultCount === 0) {
-            console.log("show not found icon");
-            document.getElementById("results_not_found").style.display = "block";
-        } else {
-            document.getElementById("results_not_found").style.display = "none";
+        watch_results_end();
+    })
+    .catch(error => {
+        if (requestId === exploreState.requestId) {
+            exploreState.loading = false;
         }
+        console.error("Could not load explore results", error);
+    });
+}
 
+function watch_results_end() {
+    const sentinel = document.getElementById('results_sentinel');
+    if (!sentinel || !('IntersectionObserver' in window)) {
+        return;
+    }
+    if (!resultsObserver) {
+        resultsObserver = new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting) && exploreState.nextCursor && !exploreState.loading) {
+                fetch_results_page(false);
+            }
+        });
+    }
+    // Observing again reports the current intersection, so a short page
+    // that leaves the sentinel visible loads the next one right away
+    resultsObserver.unobserve(sentinel);
+    resultsObserver.observe(sentinel);
+}
 
+function append_dataset_card(dataset) {
+    let card = document.createElement('div');
+    card.className = 'col-12';
+    card.innerHTML = `
+                    <div class="card">
+                        <div class="card-body">
+                            <div class="d-flex align-items-center justify-content-between">
+                                <h3><a href="${dataset.url}">${dataset.title}</a></h3>
+                                <div>
+                                    <span class="badge bg-primary" style="cursor: pointer;" onclick="set_publication_type_as_query('${dataset.publication_type}')">${dataset.publication_type}</span>
+                                </div>
+                            </div>
+                            <p class="text-secondary">${formatDate(dataset.created_at)}</p>
 
-        data.forEach(dataset => {
-            let card = document.createElement('div');
-            card.className = 'col-12';
-            card.innerHTML = `
-                            <div class="card">
-                                <div class="card-body">
-                                    <div class="d-flex align-items-center justify-content-between">
-                                        <h3><a href="${dataset.url}">${dataset.title}</a></h3>
-                                        <div>
-                                            <span class="badge bg-primary" style="cursor: pointer;" onclick="set_publication_type_as_query('${dataset.publication_type}')">${dataset.publication_type}</span>
-                                        </div>
-                                    </div>
-                                    <p class="text-secondary">${formatDate(dataset.created_at)}</p>
+                            <div class="row mb-2">
 
-                                    <div class="row mb-2">
+                                <div class="col-md-4 col-12">
+                                    <span class=" text-secondary">
+                                        Description
+                                    </span>
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    <p class="card-text">${dataset.description}</p>
+                                </div>
 
-                                        <div class="col-md-4 col-12">
-                                            <span class=" text-secondary">
-                                                Description
-                                            </span>
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            <p class="card-text">${dataset.description}</p>
-                                        </div>
+                            </div>
 
-                                    </div>
+                            <div class="row mb-2">
 
-                                    <div class="row mb-2">
+                                <div class="col-md-4 col-12">
+                                    <span class=" text-secondary">
+                                        Authors
+                                    </span>
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    ${dataset.authors.map(author => `
+                                        <p class="p-0 m-0">${author.name}${author.affiliation ? ` (${author.affiliation})` : ''}${author.orcid ? ` (${author.orcid})` : ''}</p>
+                                    `).join('')}
+                                </div>
 
-                                        <div class="col-md-4 col-12">
-                                            <span class=" text-secondary">
-                                                Authors
-                                            </span>
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            ${dataset.authors.map(author => `
-                                                <p class="p-0 m-0">${author.name}${author.affiliation ? ` (${author.affiliation})` : ''}${author.orcid ? ` (${author.orcid})` : ''}</p>
-                                            `).join('')}
-                                        </div>
+                            </div>
 
-                                    </div>
+                            <div class="row mb-2">
 
-                                    <div class="row mb-2">
+                                <div class="col-md-4 col-12">
+                                    <span class=" text-secondary">
+                                        Updated by
+                                    </span>
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    ${dataset.creator ? `
+                                        <p class="p-0 m-0">
+                                            <a href="${dataset.creator.profile_url}" class="text-decoration-none">
+                                                ${dataset.creator.name} ${dataset.creator.surname}
+                                            </a>
+                                        </p>
+                                    ` : '<p class="p-0 m-0 text-muted">Unknown</p>'}
+                                </div>
 
-                                        <div class="col-md-4 col-12">
-                                            <span class=" text-secondary">
-                                                Updated by
-                                            </span>
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            ${dataset.creator ? `
-                                                <p class="p-0 m-0">
-                                                    <a href="${dataset.creator.profile_url}" class="text-decoration-none">
-                                                        ${dataset.creator.name} ${dataset.creator.surname}
-                                                    </a>
-                                                </p>
-                                            ` : '<p class="p-0 m-0 text-muted">Unknown</p>'}
-                                        </div>
+                            </div>
 
-                                    </div>
+                            <div class="row mb-2">
 
-                                    <div class="row mb-2">
+                                <div class="col-md-4 col-12">
+                                    <span class=" text-secondary">
+                                        Tags
+                                    </span>
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    ${dataset.tags.map(tag => `<span class="badge bg-primary me-1" style="cursor: pointer;" onclick="set_tag_as_query('${tag}')">${tag}</span>`).join('')}
+                                </div>
 
-                                        <div class="col-md-4 col-12">
-                                            <span class=" text-secondary">
-                                                Tags
-                                            </span>
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            ${dataset.tags.map(tag => `<span class="badge bg-primary me-1" style="cursor: pointer;" onclick="set_tag_as_query('${tag}')">${tag}</span>`).join('')}
-                                        </div>
+                            </div>
 
-                                    </div>
+                            <div class="row">
 
-                                    <div class="row">
+                                <div class="col-md-4 col-12">
 
-                                        <div class="col-md-4 col-12">
+                                </div>
+                                <div class="col-md-8 col-12">
+                                    <a href="${dataset.url}" class="btn btn-outline-primary btn-sm" id="search" style="border-radius: 5px;">
+                                        View dataset
+                                    </a>
+                                    <a href="/dataset/download/${dataset.id}" class="btn btn-outline-primary btn-sm" id="search" style="border-radius: 5px;">
+                                        Download (${dataset.total_size_in_human_format})
+                                    </a>
+                                </div>
 
-                                        </div>
-                                        <div class="col-md-8 col-12">
-                                            <a href="${dataset.url}" class="btn btn-outline-primary btn-sm" id="search" style="border-radius: 5px;">
-                                                View dataset
-                                            </a>
-                                            <a href="/dataset/download/${dataset.id}" class="btn btn-outline-primary btn-sm" id="search" style="border-radius: 5px;">
-                                                Download (${dataset.total_size_in_human_format})
-                                            </a>
-                                        </div>
 
+                            </div>
 
-                                    </div>
-
-                                    ${dataset.recommendations && dataset.recommendations.length > 0 ? `
-                                    <div class="row mt-3">
-                                        <div class="col-12">
-                                            <h6 class="text-muted mb-2" style="font-size: 0.9rem;">
-                                                <i data-feather="star" style="width: 14px; height: 14px;"></i> Similar Datasets
-                                            </h6>
-                                            ${dataset.recommendations.map(rec => `
-                                                <div class="mb-2">
-                                                    <a href="${rec.url}" class="text-decoration-none">
-                                                        <div class="recommendation-card p-2 rounded" style="background-color: #f8f9fa; border-left: 3px solid #5700b3;">
-                                                            <div class="d-flex justify-content-between align-items-center">
-                                                                <strong style="color: #5700b3; flex: 1; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; margin-right: 10px; font-size: 0.85rem;">
-                                                                    ${rec.title.length > 50 ? rec.title.substring(0, 50) + '...' : rec.title}
-                                                                </strong>
-                                                                <span class="badge" style="background-color: #5700b3; font-size: 0.7rem; white-space: nowrap;">
-                                                                    ${rec.score}/10
-                                                                </span>
-                                                            </div>
-                                                            <small class="text-muted" style="font-size: 0.75rem;">
-                                                                ${rec.downloads} downloads · ${rec.coincidences} match${rec.coincidences !== 1 ? 'es' : ''}
-                                                            </small>
-                                                        </div>
-                                                    </a>
+                            ${dataset.recommendations && dataset.recommendations.length > 0 ? `
+                            <div class="row mt-3">
+                                <div class="col-12">
+                                    <h6 class="text-muted mb-2" style="font-size: 0.9rem;">
+                                        <i data-feather="star" style="width: 14px; height: 14px;"></i> Similar Datasets
+                                    </h6>
+                                    ${dataset.recommendations.map(rec => `
+                                        <div class="mb-2">
+                                            <a href="${rec.url}" class="text-decoration-none">
+                                                <div class="recommendation-card p-2 rounded" style="background-color: #f8f9fa; border-left: 3px solid #5700b3;">
+                                                    <div class="d-flex justify-content-between align-items-center">
+                                                        <strong style="color: #5700b3; flex: 1; overflow: hidden; text-overflow: ellipsis; white-space: nowrap; margin-right: 10px; font-size: 0.85rem;">
+                                                            ${rec.title.length > 50 ? rec.title.substring(0, 50) + '...' : rec.title}
+                                                        </strong>
+                                                        <span class="badge" style="background-color: #5700b3; font-size: 0.7rem; white-space: nowrap;">
+                                                            ${rec.score}/10
+                                                        </span>
+                                                    </div>
+                                                    <small class="text-muted" style="font-size: 0.75rem;">
+                                                        ${rec.downloads} downloads · ${rec.coincidences} match${rec.coincidences !== 1 ? 'es' : ''}
+                                                    </small>
                                                 </div>
-                                            `).join('')}
+                                            </a>
                                         </div>
-                                    </div>
-                                    ` : ''}
-
+                                    `).join('')}
                                 </div>
                             </div>
-                        `;
+                            ` : ''}
 
-                        document.getElementById('results').appendChild(card);
-                        feather.replace(); // Re-render feather icons
-        });
-    });
+                        </div>
+                    </div>
+                `;
+
+    document.getElementById('results').appendChild(card);
 }
 
 function formatDate(dateString) {
@@ -226,6 +289,46 @@ function set_publication_type_as_query(publicationType) {
     publicationTypeSelect.dispatchEvent(new Event('input', {bubbles: true}));
 }
 
+// Search box suggestions (titles, object names, authors), fetched after a short pause in typing
+const AUTOCOMPLETE_DELAY_MS = 150;
+let autocompleteTimer = null;
+let autocompleteController = null;
+
+document.getElementById('query').addEventListener('input', (e) => {
+    clearTimeout(autocompleteTimer);
+    const prefix = e.target.value.trim();
+    if (prefix.length < 2) {
+        document.getElementById('query-suggestions').innerHTML = '';
+        return;
+    }
+    autocompleteTimer = setTimeout(() => fetch_suggestions(prefix), AUTOCOMPLETE_DELAY_MS);
+});
+
+function fetch_suggestions(prefix) {
+    if (autocompleteController) {
+        autocompleteController.abort();
+    }
+    autocompleteController = new AbortController();
+
+    fetch(`/explore/autocomplete?q=${encodeURIComponent(prefix)}`, {signal: autocompleteController.signal})
+        .then(response => response.json())
+        .then(data => {
+            const datalist = document.getElementById('query-suggestions');
+            datalist.innerHTML = '';
+            data.suggestions.forEach(suggestion => {
+                const option = document.createElement('option');
+                option.value = suggestion.text;
+                option.label = suggestion.kind;
+                datalist.appendChild(option);
+            });
+        })
+        .catch(error => {
+            if (error.name !== 'AbortError') {
+                console.error('Error fetching suggestions:', error);
+            }
+        });
+}
+
 document.getElementById('clear-filters').addEventListener('click', clearFilters);
 
 function clearFilters() {
@@ -257,6 +360,11 @@ function clearFilters() {
     publicationTypeSelect.value = "any"; // replace "any" with whatever your default value is
     // publicationTypeSelect.dispatchEvent(new Event('input', {bubbles: true}));
 
+    // Reset the observation filters
+    ['object_name', 'filter_used', 'observed_after', 'observed_before', 'magnitude_min', 'magnitude_max'].forEach(id => {
+        document.getElementById(id).value = "";
+    });
+
     // Reset the sorting option
     let sortingOptions = document.querySelectorAll('[name="sorting"]');
     sortingOptions.forEach(option => {
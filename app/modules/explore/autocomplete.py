@@ -0,0 +1,297 @@
+import bisect
+import heapq
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import unidecode
+
+from app.modules.dataset.fingerprints import FingerprintChanges
+
+logger = logging.getLogger(__name__)
+
+# Kinds of suggestion, in the order rows list them
+SUGGESTION_KINDS = ("title", "object", "author")
+
+DEFAULT_SUGGESTIONS = 10
+MAX_SUGGESTIONS = 25
+
+# Shorter prefixes would scan most of the index for little use
+MIN_PREFIX_LENGTH = 2
+
+# Longer texts (titles) are cut before indexing
+MAX_TEXT_LENGTH = 120
+
+
+def normalize_text(text) -> str:
+    """Lowercase ASCII with single spaces, the form both terms and prefixes are compared in."""
+    return " ".join(unidecode.unidecode(text or "").lower().split())
+
+
+class AutocompleteIndex:
+    """
+    Suggestions for the explore search box: dataset titles, observed object
+    names and author names, most downloaded first.
+
+    Every word start of a term is a key in a sorted list, so "ruiz" finds
+    "Ana Ruiz"; a prefix is the bisect range [prefix, prefix + max char),
+    and its top suggestions are memoized until the index changes. A term
+    shared by several datasets (an author, an object) ranks by the summed
+    download_count of those datasets, as of the last rebuild or change of
+    each dataset.
+
+    Memory is capped by AUTOCOMPLETE_MAX_TERMS: past it, the least
+    downloaded terms are dropped. Like the explore facets, the index is
+    rebuilt when the published-catalog fingerprint changes or
+    AUTOCOMPLETE_TTL expires (which also refreshes download counts); the
+    fingerprint is checked at most every AUTOCOMPLETE_CHECK_INTERVAL seconds.
+    """
+
+    def __init__(
+        self,
+        max_terms: int = None,
+        ttl_seconds: int = None,
+        check_interval: float = None,
+        cache_size: int = None,
+    ):
+        if max_terms is None:
+            max_terms = int(os.getenv("AUTOCOMPLETE_MAX_TERMS", "200000"))
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv("AUTOCOMPLETE_TTL", "900"))
+        if check_interval is None:
+            check_interval = float(os.getenv("AUTOCOMPLETE_CHECK_INTERVAL", "10"))
+        if cache_size is None:
+            cache_size = int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", "2048"))
+        self.max_terms = max_terms
+        self.ttl_seconds = ttl_seconds
+        self.check_interval = check_interval
+        self.cache_size = cache_size
+        self._lock = threading.RLock()
+        self._clear_state()
+
+    def _clear_state(self):
+        # term id -> [text, kind, {dataset_id: downloads}, downloads]
+        self._terms = {}
+        self._term_ids = {}
+        self._keys = []
+        self._keys_sorted = True
+        self._datasets = {}
+        self._next_id = 0
+        self._suggestions = OrderedDict()
+        self._changes = FingerprintChanges()
+        self._fingerprint = None
+        self._built_at = None
+        self._checked_at = None
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def clear(self):
+        with self._lock:
+            self._clear_state()
+
+    @staticmethod
+    def _word_starts(normalized: str) -> list:
+        suffixes = [normalized]
+        space = normalized.find(" ")
+        while space != -1:
+            suffixes.append(normalized[space + 1 :])
+            space = normalized.find(" ", space + 1)
+        return suffixes
+
+    def add(self, dataset_id: int, downloads: int, titles=(), objects=(), authors=()):
+        """Index (or re-index) the terms of one dataset."""
+        with self._lock:
+            self.remove(dataset_id)
+            term_ids = set()
+            for kind, texts in zip(SUGGESTION_KINDS, (titles, objects, authors)):
+                for text in texts:
+                    text = " ".join((text or "").split())[:MAX_TEXT_LENGTH]
+                    normalized = normalize_text(text)
+                    if normalized:
+                        term_ids.add(self._add_term(kind, normalized, text, dataset_id, downloads or 0))
+            if term_ids:
+                self._datasets[dataset_id] = term_ids
+                self._changes.added(dataset_id)
+            self._suggestions.clear()
+            if len(self._terms) > self.max_terms:
+                self._trim()
+
+    def add_dataset(self, dataset):
+        """Index a DataSet, or drop it while it has no DOI (explore only shows published datasets)."""
+        meta = dataset.ds_meta_data
+        if meta is None or not meta.dataset_doi:
+            self.remove(dataset.id)
+            return
+        self.add(
+            dataset.id,
+            dataset.download_count,
+            titles=[meta.title],
+            objects=[meta.observation.object_name] if meta.observation else [],
+            authors=[author.name for author in meta.authors],
+        )
+
+    def _add_term(self, kind: str, normalized: str, text: str, dataset_id: int, downloads: int) -> int:
+        term_id = self._term_ids.get((kind, normalized))
+        if term_id is None:
+            term_id = self._next_id
+            self._next_id += 1
+            self._term_ids[(kind, normalized)] = term_id
+            self._terms[term_id] = [text, kind, {}, 0]
+            for key in self._word_starts(normalized):
+                if self._keys_sorted:
+                    bisect.insort(self._keys, (key, term_id))
+                else:
+                    self._keys.append((key, term_id))
+        term = self._terms[term_id]
+        term[2][dataset_id] = downloads
+        term[3] += downloads
+        return term_id
+
+    def remove(self, dataset_id: int):
+        with self._lock:
+            if dataset_id in self._datasets:
+                self._changes.removed(dataset_id)
+            for term_id in self._datasets.pop(dataset_id, ()):
+                term = self._terms.get(term_id)
+                if term is None:
+                    continue
+                term[3] -= term[2].pop(dataset_id, 0)
+                if not term[2]:
+                    self._drop_term(term_id)
+            self._suggestions.clear()
+
+    def _drop_term(self, term_id: int):
+        text, kind, _, _ = self._terms.pop(term_id)
+        normalized = normalize_text(text)
+        del self._term_ids[(kind, normalized)]
+        for key in self._word_starts(normalized):
+            position = bisect.bisect_left(self._keys, (key, term_id))
+            if position < len(self._keys) and self._keys[position] == (key, term_id):
+                del self._keys[position]
+
+    def _trim(self):
+        """Drop the least downloaded terms down to 90% of max_terms, so trimming is not paid on every add."""
+        keep = int(self.max_terms * 0.9)
+        ranked = sorted(self._terms.items(), key=lambda item: (-item[1][3], len(item[1][0]), item[0]))
+        dropped = {term_id for term_id, _ in ranked[keep:]}
+        for term_id in dropped:
+            text, kind, _, _ = self._terms.pop(term_id)
+            del self._term_ids[(kind, normalize_text(text))]
+        self._keys = [key for key in self._keys if key[1] not in dropped]
+        for dataset_id in list(self._datasets):
+            self._datasets[dataset_id] -= dropped
+            if not self._datasets[dataset_id]:
+                del self._datasets[dataset_id]
+        logger.info(f"Autocomplete index trimmed to {len(self._terms)} terms ({len(dropped)} dropped)")
+
+    def rebuild(self, rows, fingerprint=None):
+        """
+        Rebuild from (dataset_id, download_count, title, object_name,
+        author_name) rows, as returned by DataSetRepository.get_autocomplete_rows().
+        """
+        datasets = {}
+        for dataset_id, downloads, title, object_name, author_name in rows:
+            if dataset_id not in datasets:
+                datasets[dataset_id] = (downloads, {title}, {object_name}, set())
+            if author_name:
+                datasets[dataset_id][3].add(author_name)
+
+        with self._lock:
+            self.clear()
+            # Keys are appended and sorted once at the end instead of insorted one by one
+            self._keys_sorted = False
+            for dataset_id, (downloads, titles, objects, authors) in datasets.items():
+                self.add(dataset_id, downloads, titles, objects - {None}, authors)
+            self._keys.sort()
+            self._keys_sorted = True
+            self._changes.clear()
+            self._fingerprint = fingerprint
+            self._built_at = self._checked_at = time.monotonic()
+
+        logger.info(f"Autocomplete index rebuilt with {len(self._terms)} terms from {len(datasets)} datasets")
+
+    def sync_fingerprint(self, repository):
+        """
+        Record the published-catalog fingerprint after incremental updates, or mark the
+        index stale when it changed by more than those updates (see fingerprints).
+        """
+        if self._built_at is None:
+            self._changes.clear()
+            return
+        fingerprint = repository.get_published_fingerprint()
+        with self._lock:
+            if self._changes.follows(self._fingerprint, fingerprint):
+                self._fingerprint = fingerprint
+            else:
+                # Another worker changed the published catalog as well: rebuild on the next ensure_fresh
+                self._built_at = None
+
+    def ensure_fresh(self, repository):
+        """Rebuild from the database if the catalog changed behind our back."""
+        now = time.monotonic()
+        if self._built_at is not None and now - self._built_at <= self.ttl_seconds:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            fingerprint = repository.get_published_fingerprint()
+            if fingerprint == self._fingerprint:
+                return
+        else:
+            fingerprint = repository.get_published_fingerprint()
+        self.rebuild(repository.get_autocomplete_rows(), fingerprint=fingerprint)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def suggest(self, prefix: str, limit: int = DEFAULT_SUGGESTIONS, kind: str = None) -> list:
+        """
+        Up to limit {"text", "kind", "downloads"} suggestions whose text has
+        a word starting with prefix, most downloaded first (shorter texts
+        first on ties). kind restricts them to one of SUGGESTION_KINDS.
+        """
+        normalized = normalize_text(prefix)
+        if len(normalized) < MIN_PREFIX_LENGTH:
+            return []
+        limit = max(1, min(int(limit), MAX_SUGGESTIONS))
+
+        with self._lock:
+            cache_key = (normalized, kind)
+            ranked = self._suggestions.get(cache_key)
+            if ranked is None:
+                low = bisect.bisect_left(self._keys, (normalized,))
+                high = bisect.bisect_left(self._keys, (normalized + "\U0010ffff",))
+                term_ids = {term_id for _, term_id in self._keys[low:high]}
+                if kind is not None:
+                    term_ids = {term_id for term_id in term_ids if self._terms[term_id][1] == kind}
+                ranked = heapq.nsmallest(
+                    MAX_SUGGESTIONS,
+                    term_ids,
+                    key=lambda term_id: (
+                        -self._terms[term_id][3],
+                        len(self._terms[term_id][0]),
+                        self._terms[term_id][0],
+                    ),
+                )
+                ranked = [
+                    {
+                        "text": self._terms[term_id][0],
+                        "kind": self._terms[term_id][1],
+                        "downloads": self._terms[term_id][3],
+                    }
+                    for term_id in ranked
+                ]
+                self._suggestions[cache_key] = ranked
+                while len(self._suggestions) > self.cache_size:
+                    self._suggestions.popitem(last=False)
+            else:
+                self._suggestions.move_to_end(cache_key)
+            return ranked[:limit]
+
+    def __len__(self):
+        return len(self._terms)
+
+
+autocomplete_index = AutocompleteIndex()
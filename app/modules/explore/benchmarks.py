@@ -0,0 +1,119 @@
+"""
+Benchmark of the explore author filter: the name_trigram lookup against the
+substring scan over every author name that it replaces.
+
+Used by the ``rosemary explore:benchmark-fuzzy`` command and by
+tests/test_benchmark_fuzzy_search.py. The catalog comes from
+generate_synthetic_catalog with realistic, mostly distinct author names;
+every sampled author is looked up by full name, by surname and with a
+typo, and typo recall tells how often the author's dataset still comes back.
+"""
+
+import platform
+import random
+from datetime import datetime, timezone
+
+from app import db
+from app.modules.dataset.benchmarks import delete_synthetic_catalog, generate_synthetic_catalog, measure
+from app.modules.dataset.models import Author, DataSet
+from app.modules.explore.repositories import ExploreRepository
+
+DEFAULT_AUTHORS = 100000
+
+FIRST_NAMES = [
+    "Ana", "Luis", "Maria", "Jose", "Carmen", "Pablo", "Lucia", "Javier", "Elena", "Diego",
+    "Sofia", "Hugo", "Marta", "Daniel", "Laura", "Adrian", "Paula", "Alvaro", "Irene", "Sergio",
+    "Alice", "James", "Emma", "Oliver", "Chloe", "Henry", "Grace", "Thomas", "Julia", "Marco",
+]  # fmt: skip
+SYLLABLES = ["ba", "ce", "do", "fa", "gu", "he", "ji", "ka", "lo", "me", "nu", "pe", "ro", "sa", "ti", "va", "zo", "ri"]
+
+
+def synthetic_author_names(count: int, seed: int = 0) -> list:
+    """count distinct "First Surname" names, surnames made of 2 to 4 random syllables."""
+    rng = random.Random(seed)
+    names = {}
+    while len(names) < count:
+        surname = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+        names[f"{rng.choice(FIRST_NAMES)} {surname}"] = None
+    return list(names)
+
+
+def with_typo(name: str, rng: random.Random) -> str:
+    """name with two adjacent letters of its surname swapped, or one of them dropped."""
+    first, surname = name.split(" ", 1)
+    position = rng.randrange(1, len(surname) - 1)
+    if rng.random() < 0.5:
+        surname = surname[:position] + surname[position + 1] + surname[position] + surname[position + 2 :]
+    else:
+        surname = surname[:position] + surname[position + 1 :]
+    return f"{first} {surname}"
+
+
+def benchmark_fuzzy_search(catalog, sample: int = 50, seed: int = 0) -> dict:
+    """Measure the scan and trigram author filters on an already generated, published catalog."""
+    rng = random.Random(seed)
+    authors = (
+        db.session.query(Author.name, DataSet.id)
+        .join(DataSet, DataSet.ds_meta_data_id == Author.ds_meta_data_id)
+        .filter(Author.id.between(catalog.author_ids.start, catalog.author_ids.stop - 1))
+        .all()
+    )
+    authors = rng.sample(authors, min(sample, len(authors)))
+    queries = {
+        "full_name": [(name, dataset_id) for name, dataset_id in authors],
+        "surname": [(name.split(" ", 1)[1], dataset_id) for name, dataset_id in authors],
+        "typo": [(with_typo(name, rng), dataset_id) for name, dataset_id in authors],
+    }
+
+    trigram = ExploreRepository()
+    trigram.fuzzy_names = True
+    scan = ExploreRepository()
+    scan.fuzzy_names = False
+
+    variants = {}
+    recall = {}
+    for engine, repository in (("scan", scan), ("trigram", trigram)):
+        for kind, calls in queries.items():
+            variants[f"{engine}_{kind}"] = measure(
+                lambda author: repository.filter_ids(author=author), [(author,) for author, _ in calls]
+            )
+            found = sum(dataset_id in repository.filter_ids(author=author) for author, dataset_id in calls)
+            recall[f"{engine}_{kind}"] = round(found / len(calls), 3) if calls else None
+
+    return {
+        "size": catalog.size,
+        "authors": len(catalog.author_ids),
+        "sample": len(authors),
+        "generation_seconds": round(catalog.generation_seconds, 2),
+        "variants": variants,
+        "recall": recall,
+        "speedup_p50": {
+            kind: round(
+                variants[f"scan_{kind}"]["latency_ms"]["p50"] / variants[f"trigram_{kind}"]["latency_ms"]["p50"], 2
+            )
+            for kind in queries
+        },
+    }
+
+
+def run_fuzzy_search_benchmark(authors: int = DEFAULT_AUTHORS, sample: int = 50, seed: int = 0, keep: bool = False):
+    """
+    Generate a published catalog with about `authors` author rows (one to
+    three per dataset), benchmark it and (unless keep) delete it again.
+    """
+    catalog = generate_synthetic_catalog(
+        max(1, authors // 2), seed=seed, author_names=synthetic_author_names(authors, seed), published=True
+    )
+    try:
+        result = benchmark_fuzzy_search(catalog, sample=sample, seed=seed)
+    finally:
+        if not keep:
+            delete_synthetic_catalog(catalog)
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "database": db.engine.dialect.name,
+        "seed": seed,
+        "results": [result],
+    }
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from app.modules.dataset.recommendation_index import normalize_tags
+from app.modules.explore.repositories import OBSERVATION_FILTERS, ExploreRepository
+
+logger = logging.getLogger(__name__)
+
+
+def criteria_key(
+    query="",
+    date_after=None,
+    date_before=None,
+    author="any",
+    sorting="newest",
+    publication_type="any",
+    tags=[],
+    **extra,
+):
+    """
+    Cache key of explore criteria, normalized the way ExploreRepository reads
+    them: case and spacing of the query, tag order and case, and author
+    spacing do not change the results, so they do not change the key either.
+    Query words keep their order, which the fuzzy name match of the words run
+    together ("ngc 224" -> "ngc224") depends on.
+    extra holds page parameters (cursor, page_size, with_total) and the
+    observation criteria picked by observation_criteria().
+    """
+    author = "any" if author == "any" else author.strip().replace(" ", "").lower()
+    normalized = {
+        "query": " ".join(ExploreRepository._query_words(query)),
+        "date_after": date_after or None,
+        "date_before": date_before or None,
+        "author": author,
+        "sorting": sorting,
+        "publication_type": publication_type.lower() if publication_type else "any",
+        "tags": sorted({name for tag in tags for name in normalize_tags(tag)} - {""}),
+        **extra,
+    }
+    return json.dumps(normalized, sort_keys=True, default=str)
+
+
+def observation_criteria(criteria: dict) -> dict:
+    """The non-empty observation criteria (OBSERVATION_FILTERS) of criteria, for criteria_key."""
+    picked = {}
+    for name in OBSERVATION_FILTERS:
+        value = criteria.get(name)
+        if value is not None and str(value).strip():
+            picked[name] = str(value).strip()
+    return picked
+
+
+class ExploreResultCache:
+    """
+    LRU cache of explore results per normalized criteria, with a TTL.
+
+    Entries hold ordered dataset ids (plus page cursors), never ORM objects,
+    so they can outlive the request session. DataSetService invalidates the
+    whole cache whenever a dataset is created, edited, synchronized or
+    deleted in this process; EXPLORE_CACHE_TTL bounds how long other workers
+    serve results from before such a change. EXPLORE_CACHE_SIZE=0 disables it.
+    """
+
+    def __init__(self, max_entries: int = None, ttl_seconds: float = None):
+        if max_entries is None:
+            max_entries = int(os.getenv("EXPLORE_CACHE_SIZE", "256"))
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("EXPLORE_CACHE_TTL", "60"))
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str):
+        """The cached value for key, or None when missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and time.monotonic() - entry[0] <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every entry: any dataset change can move any result list."""
+        with self._lock:
+            if self._entries:
+                logger.debug(f"Explore result cache invalidated ({len(self._entries)} entries)")
+            self._entries.clear()
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+explore_result_cache = ExploreResultCache()
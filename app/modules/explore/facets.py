@@ -0,0 +1,190 @@
+import bisect
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import Counter
+
+from app.modules.dataset.fingerprints import FingerprintChanges
+from app.modules.dataset.recommendation_index import normalize_tags
+
+logger = logging.getLogger(__name__)
+
+
+class ExploreFacetSnapshot:
+    """
+    Filter options of the explore page (authors, tags, publication types and
+    the created_at bounds), held in process memory.
+
+    Each dataset's contribution is kept so that DataSetService can apply
+    creates, edits and deletes incrementally. Like the recommendation index,
+    it is rebuilt from the database when the catalog fingerprint changes or
+    EXPLORE_FACETS_TTL expires; the fingerprint itself is checked at most
+    every EXPLORE_FACETS_CHECK_INTERVAL seconds, so rendering the page does
+    not query the catalog at all in between.
+    """
+
+    def __init__(self, ttl_seconds: int = None, check_interval: float = None):
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv("EXPLORE_FACETS_TTL", "300"))
+        if check_interval is None:
+            check_interval = float(os.getenv("EXPLORE_FACETS_CHECK_INTERVAL", "10"))
+        self.ttl_seconds = ttl_seconds
+        self.check_interval = check_interval
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._authors = Counter()
+        self._tags = Counter()
+        self._publication_types = Counter()
+        self._dates = []
+        self._snapshot = None
+        self._changes = FingerprintChanges()
+        self._fingerprint = None
+        self._built_at = None
+        self._checked_at = None
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._authors.clear()
+            self._tags.clear()
+            self._publication_types.clear()
+            self._dates = []
+            self._snapshot = None
+            self._changes.clear()
+            self._fingerprint = None
+            self._built_at = None
+            self._checked_at = None
+
+    def add(self, dataset_id: int, created_at, publication_type, tags: set, authors: set):
+        with self._lock:
+            self.remove(dataset_id)
+            entry = (created_at, publication_type, frozenset(tags), frozenset(authors))
+            self._entries[dataset_id] = entry
+            self._apply(entry, 1)
+            self._changes.added(dataset_id)
+
+    def add_dataset(self, dataset):
+        meta = dataset.ds_meta_data
+        self.add(
+            dataset.id,
+            dataset.created_at,
+            meta.publication_type.value.lower() if meta.publication_type else None,
+            normalize_tags(meta.tags) - {""},
+            {author.name.strip() for author in meta.authors if author.name},
+        )
+
+    def remove(self, dataset_id: int):
+        with self._lock:
+            entry = self._entries.pop(dataset_id, None)
+            if entry is not None:
+                self._apply(entry, -1)
+                self._changes.removed(dataset_id)
+
+    def _apply(self, entry, delta: int):
+        created_at, publication_type, tags, authors = entry
+        self._change(self._tags, tags, delta)
+        self._change(self._authors, authors, delta)
+        if publication_type:
+            self._change(self._publication_types, (publication_type,), delta)
+        if created_at is not None:
+            if delta > 0:
+                bisect.insort(self._dates, created_at)
+            else:
+                position = bisect.bisect_left(self._dates, created_at)
+                if position < len(self._dates) and self._dates[position] == created_at:
+                    del self._dates[position]
+        self._snapshot = None
+
+    @staticmethod
+    def _change(counter: Counter, keys, delta: int):
+        for key in keys:
+            counter[key] += delta
+            if counter[key] <= 0:
+                del counter[key]
+
+    def rebuild(self, rows, fingerprint=None):
+        """
+        Rebuild from (dataset_id, created_at, publication_type, tags,
+        author_name) rows, as returned by DataSetRepository.get_facet_rows().
+        """
+        datasets = {}
+        for dataset_id, created_at, publication_type, tags, author_name in rows:
+            if dataset_id not in datasets:
+                publication_type = publication_type.value.lower() if publication_type else None
+                datasets[dataset_id] = (created_at, publication_type, normalize_tags(tags) - {""}, set())
+            if author_name:
+                datasets[dataset_id][3].add(author_name.strip())
+
+        with self._lock:
+            self.clear()
+            for dataset_id, entry in datasets.items():
+                self.add(dataset_id, *entry)
+            self._changes.clear()
+            self._fingerprint = fingerprint
+            self._built_at = self._checked_at = time.monotonic()
+
+        logger.info(f"Explore facet snapshot rebuilt with {len(datasets)} datasets")
+
+    def sync_fingerprint(self, repository):
+        """
+        Record the catalog fingerprint after incremental updates, or mark the
+        snapshot stale when it changed by more than those updates (see fingerprints).
+        """
+        if self._built_at is None:
+            self._changes.clear()
+            return
+        fingerprint = repository.get_catalog_fingerprint()
+        with self._lock:
+            if self._changes.follows(self._fingerprint, fingerprint):
+                self._fingerprint = fingerprint
+            else:
+                # Another worker changed the catalog as well: rebuild on the next ensure_fresh
+                self._built_at = None
+
+    def ensure_fresh(self, repository):
+        """Rebuild from the database if the catalog changed behind our back."""
+        now = time.monotonic()
+        if self._built_at is not None and now - self._built_at <= self.ttl_seconds:
+            if now - self._checked_at < self.check_interval:
+                return
+            self._checked_at = now
+            fingerprint = repository.get_catalog_fingerprint()
+            if fingerprint == self._fingerprint:
+                return
+        else:
+            fingerprint = repository.get_catalog_fingerprint()
+        self.rebuild(repository.get_facet_rows(), fingerprint=fingerprint)
+
+    # ------------------------------------------------------------------
+    # Lookups
+    # ------------------------------------------------------------------
+    def snapshot(self) -> dict:
+        """
+        The current facets; the dict is shared between callers and only
+        rebuilt after a change. "version" is a digest of the content, so it
+        is the same on every worker holding the same facets.
+        """
+        with self._lock:
+            if self._snapshot is None:
+                facets = {
+                    "authors": sorted(self._authors, key=lambda name: (name.lower(), name)),
+                    "tags": sorted(self._tags),
+                    "publication_types": dict(sorted(self._publication_types.items())),
+                    "date_min": self._dates[0].date().isoformat() if self._dates else None,
+                    "date_max": self._dates[-1].date().isoformat() if self._dates else None,
+                }
+                digest = hashlib.sha1(json.dumps(facets, sort_keys=True).encode(), usedforsecurity=False)
+                self._snapshot = {"version": digest.hexdigest()[:16], **facets}
+            return self._snapshot
+
+    def __len__(self):
+        return len(self._entries)
+
+
+explore_facets = ExploreFacetSnapshot()
@@ -1,47 +1,419 @@
+import base64
+import binascii
+import json
+import os
 import re
+from dataclasses import dataclass
 from datetime import datetime
+from typing import Optional
 
 import unidecode
-from sqlalchemy import func, or_
+from sqlalchemy import Float, Integer, and_, case, func, literal, or_, select, text, union_all
+from sqlalchemy.dialects.mysql import match
 
-from app.modules.dataset.models import Author, DataSet, DSMetaData, PublicationType
+from app.modules.dataset.models import (
+    NAME_KIND_AUTHOR,
+    NAME_KIND_OBJECT,
+    Author,
+    DataSet,
+    DSMetaData,
+    Observation,
+    PublicationType,
+    Tag,
+    dataset_tag,
+    name_trigram,
+)
+from app.modules.dataset.recommendation_index import normalize_tags
+from app.modules.dataset.repositories import dataset_loading_options
+from app.modules.dataset.sky import angular_separation, cone_window
+from app.modules.dataset.trigrams import TRIGRAM_SIZE, min_shared, normalize_name, trigrams
 from core.repositories.BaseRepository import BaseRepository
 
+# Words shorter than innodb_ft_min_token_size are not in the FULLTEXT index
+FULLTEXT_MIN_WORD_LENGTH = 3
+
+SQLITE_FTS_TABLE = "explore_fts"
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Datasets loaded and serialized at a time by streaming responses
+STREAM_BATCH_SIZE = 200
+
+# Criteria on Observation accepted by filter() and friends (see observation_conditions)
+OBSERVATION_FILTERS = (
+    "observed_after",
+    "observed_before",
+    "magnitude_min",
+    "magnitude_max",
+    "filter_used",
+    "object_name",
+)
+
+# Most datasets returned by a cone search (nearest first)
+CONE_SEARCH_MAX_RESULTS = 500
+
+_SQLITE_FTS_ROW = (
+    "SELECT m.id, m.title, m.description, m.tags, "
+    "(SELECT group_concat(coalesce(a.name, '') || ' ' || coalesce(a.affiliation, '') || ' ' || "
+    "coalesce(a.orcid, ''), ' ') FROM author a WHERE a.ds_meta_data_id = m.id) "
+    "FROM ds_meta_data m"
+)
+
+
+def _sqlite_fts_refresh(ds_meta_data_id: str) -> str:
+    return (
+        f"INSERT OR REPLACE INTO {SQLITE_FTS_TABLE}(rowid, title, description, tags, authors) "
+        f"{_SQLITE_FTS_ROW} WHERE m.id = {ds_meta_data_id};"
+    )
+
+
+_SQLITE_FTS_TRIGGERS = {
+    "explore_fts_ds_meta_data_ai": f"AFTER INSERT ON ds_meta_data BEGIN {_sqlite_fts_refresh('NEW.id')} END",
+    "explore_fts_ds_meta_data_au": f"AFTER UPDATE ON ds_meta_data BEGIN {_sqlite_fts_refresh('NEW.id')} END",
+    "explore_fts_ds_meta_data_ad": (
+        f"AFTER DELETE ON ds_meta_data BEGIN DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = OLD.id; END"
+    ),
+    "explore_fts_author_ai": f"AFTER INSERT ON author BEGIN {_sqlite_fts_refresh('NEW.ds_meta_data_id')} END",
+    "explore_fts_author_au": (
+        f"AFTER UPDATE ON author BEGIN {_sqlite_fts_refresh('OLD.ds_meta_data_id')} "
+        f"{_sqlite_fts_refresh('NEW.ds_meta_data_id')} END"
+    ),
+    "explore_fts_author_ad": f"AFTER DELETE ON author BEGIN {_sqlite_fts_refresh('OLD.ds_meta_data_id')} END",
+}
+
+
+def _criterion(value):
+    """A criterion value stripped of surrounding spaces, or None when empty."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _magnitude(value: str, name: str) -> float:
+    try:
+        return float(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}: {value!r}")
+
+
+def observation_conditions(
+    observed_after=None,
+    observed_before=None,
+    magnitude_min=None,
+    magnitude_max=None,
+    filter_used=None,
+    object_name=None,
+    **kwargs,
+) -> list:
+    """
+    SQL conditions on Observation for the astronomy criteria; empty values
+    are ignored. Dates are YYYY-MM-DD and inclusive, magnitudes are
+    inclusive bounds (brighter means a lower magnitude), filter_used and
+    object_name match exactly, so that the equality columns lead the
+    composite indexes and the date or magnitude bound is a range scan.
+    Raises ValueError on malformed values.
+    """
+    object_name, filter_used = _criterion(object_name), _criterion(filter_used)
+    observed_after, observed_before = _criterion(observed_after), _criterion(observed_before)
+    magnitude_min, magnitude_max = _criterion(magnitude_min), _criterion(magnitude_max)
+
+    conditions = []
+    if object_name is not None:
+        conditions.append(Observation.object_name == object_name)
+    if filter_used is not None:
+        conditions.append(Observation.filter_used == filter_used)
+    if observed_after is not None:
+        conditions.append(Observation.observation_date >= datetime.strptime(observed_after, "%Y-%m-%d").date())
+    if observed_before is not None:
+        conditions.append(Observation.observation_date <= datetime.strptime(observed_before, "%Y-%m-%d").date())
+    if magnitude_min is not None:
+        conditions.append(Observation.magnitude >= _magnitude(magnitude_min, "magnitude_min"))
+    if magnitude_max is not None:
+        conditions.append(Observation.magnitude <= _magnitude(magnitude_max, "magnitude_max"))
+    return conditions
+
+
+def clamp_page_size(page_size) -> int:
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid page_size: {page_size!r}")
+    return max(1, min(page_size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(sorting: str, dataset=None, offset: int = None) -> str:
+    """Opaque cursor: the (created_at, id) of the last row for date sortings, an offset for relevance."""
+    if offset is not None:
+        payload = {"s": sorting, "o": offset}
+    else:
+        payload = {"s": sorting, "c": dataset.created_at.isoformat(), "i": dataset.id}
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, sorting: str):
+    """Position encoded by encode_cursor, or None for the first page. Raises ValueError when invalid."""
+    if not cursor:
+        return None
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if payload["s"] != sorting:
+            raise ValueError("cursor belongs to another sorting")
+        if "o" in payload:
+            return {"offset": max(0, int(payload["o"]))}
+        return {"created_at": datetime.fromisoformat(payload["c"]), "id": int(payload["i"])}
+    except (ValueError, TypeError, KeyError, binascii.Error) as exc:
+        raise ValueError(f"Invalid cursor: {exc}")
+
+
+@dataclass
+class ExplorePage:
+    datasets: list
+    next_cursor: Optional[str]
+    page_size: int
+    total_estimate: Optional[int] = None
+
+    @classmethod
+    def from_rows(cls, rows: list, sorting: str, page_size: int, offset: int = None, total_estimate: int = None):
+        """
+        Build a page from up to page_size + 1 rows; the extra row only tells
+        that there is a next page. offset is given for offset-paged results.
+        """
+        datasets = rows[:page_size]
+        next_cursor = None
+        if len(rows) > page_size:
+            if offset is None:
+                next_cursor = encode_cursor(sorting, dataset=datasets[-1])
+            else:
+                next_cursor = encode_cursor(sorting, offset=offset + page_size)
+        return cls(datasets=datasets, next_cursor=next_cursor, page_size=page_size, total_estimate=total_estimate)
+
 
 class ExploreRepository(BaseRepository):
     def __init__(self):
         super().__init__(DataSet)
+        # Typo-tolerant author filter and name matches in free text, through the name_trigram table
+        self.fuzzy_names = os.getenv("EXPLORE_FUZZY_NAMES", "true").lower() in ("1", "true", "yes")
 
-    def filter(
-        self,
-        query="",
-        date_after=None,
-        date_before=None,
-        author="any",
-        sorting="newest",
-        publication_type="any",
-        tags=[],
-        **kwargs,
-    ):
-
-        normalized_query = unidecode.unidecode(query).lower()
+    @staticmethod
+    def _query_words(query: str) -> list:
+        normalized_query = unidecode.unidecode(query or "").lower()
         cleaned_query = re.sub(r'[,.":\'()\[\]^;!¡¿?]', "", normalized_query)
+        return cleaned_query.split()
+
+    @staticmethod
+    def _ilike_conditions(words: list) -> list:
+        """Substring match of every word over metadata and authors, without joining authors."""
+        conditions = []
+        for word in words:
+            pattern = f"%{word}%"
+            conditions.append(DSMetaData.title.ilike(pattern))
+            conditions.append(DSMetaData.description.ilike(pattern))
+            conditions.append(DSMetaData.tags.ilike(pattern))
+            conditions.append(
+                DSMetaData.authors.any(
+                    or_(Author.name.ilike(pattern), Author.affiliation.ilike(pattern), Author.orcid.ilike(pattern))
+                )
+            )
+        return conditions
+
+    @staticmethod
+    def name_matches(name: str, kinds=(NAME_KIND_AUTHOR, NAME_KIND_OBJECT)):
+        """
+        (ds_meta_data_id, similarity) of every author or object name that
+        contains name or shares enough of its trigrams, one row per matching
+        name, as a select; None when name is too short to have trigrams
+        of its own. similarity is 1.0 for names containing the query.
+        """
+        normalized = normalize_name(name)
+        if len(normalized) < TRIGRAM_SIZE:
+            return None
+        query_trigrams = trigrams(normalized)
+        shared = func.count()
+        contains = name_trigram.c.term.contains(normalized, autoescape=True)
+        return (
+            select(
+                name_trigram.c.ds_meta_data_id,
+                case((contains, literal(1.0)), else_=shared * 1.0 / len(query_trigrams)).label("similarity"),
+            )
+            .where(name_trigram.c.kind.in_(kinds), name_trigram.c.trigram.in_(sorted(query_trigrams)))
+            .group_by(name_trigram.c.ds_meta_data_id, name_trigram.c.kind, name_trigram.c.term)
+            .having(or_(shared >= min_shared(query_trigrams), contains))
+        )
+
+    def fuzzy_name_search(self, name: str, kinds=(NAME_KIND_AUTHOR, NAME_KIND_OBJECT), limit: int = 20) -> list:
+        """(ds_meta_data_id, similarity) pairs for name, most similar first."""
+        matches = self.name_matches(name, kinds)
+        if matches is None:
+            return []
+        matches = matches.subquery()
+        rows = (
+            self.session.query(matches.c.ds_meta_data_id, func.max(matches.c.similarity).label("similarity"))
+            .group_by(matches.c.ds_meta_data_id)
+            .order_by(func.max(matches.c.similarity).desc(), matches.c.ds_meta_data_id)
+            .limit(limit)
+            .all()
+        )
+        return [(ds_meta_data_id, float(similarity)) for ds_meta_data_id, similarity in rows]
+
+    def _fuzzy_text_hits(self, words: list):
+        """
+        Subquery of (ds_meta_data_id, similarity) for the author and object
+        names matching any query word, or the whole query run together
+        ("ngc 224" -> "ngc224"); None when fuzzy names are off or no word
+        is long enough.
+        """
+        if not self.fuzzy_names:
+            return None
+        candidates = dict.fromkeys(words + ["".join(words)] if len(words) > 1 else words)
+        selects = [matches for matches in map(self.name_matches, candidates) if matches is not None]
+        if not selects:
+            return None
+        matches = union_all(*selects).subquery("name_matches")
+        return (
+            select(matches.c.ds_meta_data_id, func.max(matches.c.similarity).label("similarity"))
+            .group_by(matches.c.ds_meta_data_id)
+            .subquery("fuzzy_hits")
+        )
+
+    @staticmethod
+    def _author_scan_condition(author: str):
+        """Substring match on every author name with spaces removed; cannot use an index."""
+        author_normalized = author.strip().replace(" ", "").lower()
+        formatted_name = func.lower(func.replace(func.trim(Author.name), " ", ""))
+        return DSMetaData.authors.any(formatted_name.ilike(f"%{author_normalized}%"))
+
+    def _mysql_text_search(self, datasets, words: list, fuzzy=None):
+        """MATCH ... AGAINST on the FULLTEXT indexes, prefix-matching every word, or a fuzzy name hit."""
+        tokens = [token for word in words for token in re.findall(r"\w+", word)]
+        indexed = [token for token in tokens if len(token) >= FULLTEXT_MIN_WORD_LENGTH]
+        short = [token for token in tokens if len(token) < FULLTEXT_MIN_WORD_LENGTH]
 
-        filters = []
-        for word in cleaned_query.split():
-            filters.append(DSMetaData.title.ilike(f"%{word}%"))
-            filters.append(DSMetaData.description.ilike(f"%{word}%"))
-            filters.append(Author.name.ilike(f"%{word}%"))
-            filters.append(Author.affiliation.ilike(f"%{word}%"))
-            filters.append(Author.orcid.ilike(f"%{word}%"))
-            filters.append(DSMetaData.tags.ilike(f"%{word}%"))
-
-        datasets = (
-            self.model.query.join(DataSet.ds_meta_data)
-            .join(DSMetaData.authors)
-            .filter(or_(*filters))
-            .filter(DSMetaData.dataset_doi.isnot(None))
+        conditions = self._ilike_conditions(short)
+        relevance = None
+        if indexed:
+            against = " ".join(f"{token}*" for token in indexed)
+            metadata_match = match(DSMetaData.title, DSMetaData.description, DSMetaData.tags, against=against)
+            author_match = match(Author.name, Author.affiliation, Author.orcid, against=against)
+            metadata_match = metadata_match.in_boolean_mode()
+            author_match = author_match.in_boolean_mode()
+
+            author_relevance = (
+                select(func.max(author_match))
+                .where(Author.ds_meta_data_id == DSMetaData.id)
+                .correlate(DSMetaData)
+                .scalar_subquery()
+            )
+            conditions.append(metadata_match > 0)
+            conditions.append(DSMetaData.id.in_(select(Author.ds_meta_data_id).where(author_match > 0)))
+            relevance = metadata_match + func.coalesce(author_relevance, 0)
+
+        if fuzzy is not None:
+            conditions.append(fuzzy.c.ds_meta_data_id.isnot(None))
+            similarity = func.coalesce(fuzzy.c.similarity, 0)
+            relevance = similarity if relevance is None else relevance + similarity
+
+        if not conditions:
+            return datasets, None
+        return datasets.filter(or_(*conditions)), relevance
+
+    def _ensure_sqlite_fulltext(self):
+        """
+        Create the FTS5 table and the triggers keeping it in sync with
+        ds_meta_data and author, backfilling it whenever the triggers were
+        missing (new database, or tables recreated by drop_all/create_all).
+        """
+        existing = {
+            row[0]
+            for row in self.session.execute(
+                text("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') AND name LIKE 'explore_fts%'")
+            )
+        }
+        if SQLITE_FTS_TABLE in existing and existing.issuperset(_SQLITE_FTS_TRIGGERS):
+            return
+
+        self.session.execute(
+            text(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_FTS_TABLE} USING fts5("
+                "title, description, tags, authors, tokenize='unicode61 remove_diacritics 2')"
+            )
+        )
+        for name, body in _SQLITE_FTS_TRIGGERS.items():
+            self.session.execute(text(f"CREATE TRIGGER IF NOT EXISTS {name} {body}"))
+        self.session.execute(text(f"DELETE FROM {SQLITE_FTS_TABLE}"))
+        self.session.execute(
+            text(f"INSERT INTO {SQLITE_FTS_TABLE}(rowid, title, description, tags, authors) {_SQLITE_FTS_ROW}")
+        )
+        self.session.commit()
+
+    def _sqlite_text_search(self, datasets, words: list, fuzzy=None):
+        """FTS5 stand-in for local/test runs, ranked with bm25."""
+        tokens = [token for word in words for token in re.findall(r"\w+", word)]
+        if not tokens:
+            if fuzzy is not None:
+                return datasets.filter(fuzzy.c.ds_meta_data_id.isnot(None)), fuzzy.c.similarity
+            return datasets, None
+
+        self._ensure_sqlite_fulltext()
+        fts_match = " OR ".join(f'"{token}"*' for token in tokens)
+        hits = (
+            text(
+                f"SELECT rowid AS ds_meta_data_id, -bm25({SQLITE_FTS_TABLE}) AS relevance "
+                f"FROM {SQLITE_FTS_TABLE} WHERE {SQLITE_FTS_TABLE} MATCH :fts_match"
+            )
+            .bindparams(fts_match=fts_match)
+            .columns(ds_meta_data_id=Integer, relevance=Float)
+            .subquery("fts_hits")
+        )
+        if fuzzy is None:
+            datasets = datasets.join(hits, hits.c.ds_meta_data_id == DSMetaData.id)
+            return datasets, hits.c.relevance
+
+        datasets = datasets.outerjoin(hits, hits.c.ds_meta_data_id == DSMetaData.id).filter(
+            or_(hits.c.ds_meta_data_id.isnot(None), fuzzy.c.ds_meta_data_id.isnot(None))
         )
+        return datasets, func.coalesce(hits.c.relevance, 0) + func.coalesce(fuzzy.c.similarity, 0)
+
+    def _text_search(self, datasets, words: list):
+        """
+        Restrict to datasets matching any word, or whose author or object
+        name matches one fuzzily; returns (query, relevance expression or None).
+        """
+        fuzzy = self._fuzzy_text_hits(words)
+        if fuzzy is not None:
+            datasets = datasets.outerjoin(fuzzy, fuzzy.c.ds_meta_data_id == DSMetaData.id)
+
+        dialect = self.session.get_bind().dialect.name
+        if dialect in ("mysql", "mariadb"):
+            return self._mysql_text_search(datasets, words, fuzzy)
+        if dialect == "sqlite":
+            return self._sqlite_text_search(datasets, words, fuzzy)
+        conditions = self._ilike_conditions(words)
+        if fuzzy is None:
+            return datasets.filter(or_(*conditions)), None
+        return datasets.filter(or_(*conditions, fuzzy.c.ds_meta_data_id.isnot(None))), fuzzy.c.similarity
+
+    def _filtered_query(
+        self, query="", date_after=None, date_before=None, author="any", publication_type="any", tags=[], **kwargs
+    ):
+        """Unordered query for the criteria; returns (query, relevance expression or None)."""
+        datasets = self.model.query.join(DataSet.ds_meta_data).filter(DSMetaData.dataset_doi.isnot(None))
+
+        relevance = None
+        words = self._query_words(query)
+        if words:
+            datasets, relevance = self._text_search(datasets, words)
+
+        # Ids already matched by an external search backend
+        dataset_ids = kwargs.get("dataset_ids")
+        if dataset_ids is not None:
+            datasets = datasets.filter(self.model.id.in_(list(dataset_ids)))
+
+        # Astronomy fields of the observation (one per dataset, so the join adds no rows)
+        conditions = observation_conditions(**kwargs)
+        if conditions:
+            datasets = datasets.join(DSMetaData.observation).filter(*conditions)
 
         if date_after:
             date_after_dt = datetime.strptime(date_after, "%Y-%m-%d")
@@ -52,13 +424,16 @@ class ExploreRepository(BaseRepository):
             datasets = datasets.filter(DataSet.created_at <= date_before_dt)
 
         if author != "any":
-            author_normalized = author.strip().replace(" ", "").lower()
-            formatted_name = func.lower(func.replace(func.trim(Author.name), " ", ""))
-            datasets = datasets.filter(DSMetaData.authors.any(formatted_name.ilike(f"%{author_normalized}%")))
+            matches = self.name_matches(author, [NAME_KIND_AUTHOR]) if self.fuzzy_names else None
+            if matches is not None:
+                datasets = datasets.filter(DSMetaData.id.in_(select(matches.subquery().c.ds_meta_data_id)))
+            else:
+                datasets = datasets.filter(self._author_scan_condition(author))
 
         if len(tags) > 0:
-            tag_conditions = [DSMetaData.tags.ilike(f"%{tag}%") for tag in tags]
-            datasets = datasets.filter(or_(*tag_conditions))
+            # Exact match on the normalized tags (any of them), through the dataset_tag indexes
+            tag_names = {name for tag in tags for name in normalize_tags(tag)} - {""}
+            datasets = datasets.filter(DataSet.normalized_tags.any(Tag.name.in_(tag_names)))
 
         if publication_type != "any":
             matching_type = None
@@ -70,8 +445,198 @@ class ExploreRepository(BaseRepository):
             if matching_type is not None:
                 datasets = datasets.filter(DSMetaData.publication_type == matching_type.name)
 
-        datasets = datasets.order_by(
-            self.model.created_at.asc() if sorting == "oldest" else self.model.created_at.desc()
+        return datasets, relevance
+
+    def _order(self, datasets, sorting, relevance):
+        """Sort order of the results; id breaks created_at ties so that pages never overlap."""
+        if sorting == "relevance" and relevance is not None:
+            return datasets.order_by(relevance.desc(), self.model.created_at.desc(), self.model.id.desc())
+        if sorting == "oldest":
+            return datasets.order_by(self.model.created_at.asc(), self.model.id.asc())
+        return datasets.order_by(self.model.created_at.desc(), self.model.id.desc())
+
+    def filter(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        **kwargs,
+    ):
+        datasets, relevance = self._filtered_query(
+            query, date_after, date_before, author, publication_type, tags, **kwargs
+        )
+        return self._order(datasets, sorting, relevance).options(*dataset_loading_options()).all()
+
+    def filter_page(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        cursor=None,
+        page_size=DEFAULT_PAGE_SIZE,
+        with_total=False,
+        **kwargs,
+    ) -> ExplorePage:
+        """
+        One page of filter() results.
+
+        Date sortings use keyset pagination on (created_at, id): the cursor
+        holds the last row returned, so every page is an index range scan
+        however deep the client scrolls. Relevance has no stable key to seek
+        on and pages by offset instead.
+        """
+        page_size = clamp_page_size(page_size)
+        position = decode_cursor(cursor, sorting)
+        datasets, relevance = self._filtered_query(
+            query, date_after, date_before, author, publication_type, tags, **kwargs
         )
 
-        return datasets.all()
+        keyset = not (sorting == "relevance" and relevance is not None)
+        if position is not None and keyset != ("id" in position):
+            raise ValueError("Invalid cursor: it does not match the requested results")
+
+        ordered = self._order(datasets, sorting, relevance)
+        if position is not None and keyset:
+            created_at, dataset_id = position["created_at"], position["id"]
+            if sorting == "oldest":
+                after = or_(
+                    self.model.created_at > created_at,
+                    and_(self.model.created_at == created_at, self.model.id > dataset_id),
+                )
+            else:
+                after = or_(
+                    self.model.created_at < created_at,
+                    and_(self.model.created_at == created_at, self.model.id < dataset_id),
+                )
+            ordered = ordered.filter(after)
+        offset = position["offset"] if position is not None and not keyset else 0
+
+        rows = ordered.options(*dataset_loading_options()).offset(offset).limit(page_size + 1).all()
+
+        # Counted on the first page only; no extra query when it holds every result
+        total_estimate = None
+        if with_total and position is None:
+            total_estimate = len(rows) if len(rows) <= page_size else datasets.order_by(None).count()
+
+        return ExplorePage.from_rows(
+            rows, sorting, page_size, offset=None if keyset else offset, total_estimate=total_estimate
+        )
+
+    def filter_ids(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        **kwargs,
+    ) -> list:
+        """Ids of the filter() results, in the same order, without loading any dataset."""
+        datasets, relevance = self._filtered_query(
+            query, date_after, date_before, author, publication_type, tags, **kwargs
+        )
+        return [row[0] for row in self._order(datasets, sorting, relevance).with_entities(self.model.id)]
+
+    def load_ordered(self, dataset_ids: list) -> list:
+        """Datasets with what to_dict() reads, in the order of dataset_ids."""
+        if not dataset_ids:
+            return []
+        loaded = {
+            dataset.id: dataset
+            for dataset in self.model.query.filter(self.model.id.in_(dataset_ids)).options(*dataset_loading_options())
+        }
+        return [loaded[dataset_id] for dataset_id in dataset_ids if dataset_id in loaded]
+
+    def iter_batches(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        batch_size=STREAM_BATCH_SIZE,
+        **kwargs,
+    ):
+        """
+        filter() results as successive lists of at most batch_size datasets.
+
+        The ordered ids are read with yield_per on a connection of their own:
+        the server-side cursor stays open while every batch is loaded, with
+        its relationships, through the session. Only one batch is held in
+        memory and the first one is ready before the last row is read.
+        """
+        datasets, relevance = self._filtered_query(
+            query, date_after, date_before, author, publication_type, tags, **kwargs
+        )
+        ids = self._order(datasets, sorting, relevance).with_entities(self.model.id)
+        with self.session.get_bind().connect() as connection:
+            result = connection.execution_options(yield_per=batch_size).execute(ids.statement)
+            for partition in result.partitions():
+                yield self.load_ordered([row[0] for row in partition])
+
+    def cone_search(
+        self, ra: float, dec: float, radius: float, published_only=True, limit=CONE_SEARCH_MAX_RESULTS
+    ) -> list:
+        """
+        [(dataset, observation, separation)] for the observations within
+        radius degrees of (ra, dec), nearest first.
+
+        Candidates come from the (dec_zone, ra_deg) index: one range of
+        ra_deg per declination zone the cone crosses, so the scan grows with
+        the area searched rather than with the catalog. The exact angular
+        distance then discards the corners of those ranges.
+        """
+        window = cone_window(ra, dec, radius)
+        candidates = (
+            self.session.query(DataSet, Observation)
+            .join(DataSet.ds_meta_data)
+            .join(DSMetaData.observation)
+            .filter(
+                Observation.dec_zone.in_(window.zones),
+                or_(*[Observation.ra_deg.between(low, high) for low, high in window.ra_ranges]),
+                Observation.dec_deg.between(window.dec_min, window.dec_max),
+            )
+            .options(*dataset_loading_options())
+        )
+        if published_only:
+            candidates = candidates.filter(DSMetaData.dataset_doi.isnot(None))
+
+        matches = []
+        for dataset, observation in candidates:
+            separation = angular_separation(ra, dec, observation.ra_deg, observation.dec_deg)
+            if separation <= radius:
+                matches.append((dataset, observation, separation))
+        matches.sort(key=lambda match: (match[2], match[0].id))
+        return matches[:limit]
+
+    def tag_facets(
+        self, query="", date_after=None, date_before=None, author="any", publication_type="any", tags=[], **kwargs
+    ) -> list:
+        """
+        [{"name", "count"}] of the tags in the filter() results, most used
+        first, counted with a single GROUP BY over dataset_tag.
+        """
+        datasets, _ = self._filtered_query(query, date_after, date_before, author, publication_type, tags, **kwargs)
+        matching_ids = datasets.with_entities(self.model.id).order_by(None).subquery()
+        dataset_count = func.count(dataset_tag.c.dataset_id)
+        rows = (
+            self.session.query(Tag.name, dataset_count)
+            .join(dataset_tag, dataset_tag.c.tag_id == Tag.id)
+            .filter(dataset_tag.c.dataset_id.in_(select(matching_ids.c.id)))
+            .group_by(Tag.id, Tag.name)
+            .order_by(dataset_count.desc(), Tag.name)
+            .all()
+        )
+        return [{"name": name, "count": count} for name, count in rows]
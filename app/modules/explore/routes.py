@@ -1,61 +1,110 @@
-from flask import jsonify, render_template, request, url_for
+from flask import jsonify, render_template, request
 
-from app.modules.dataset.models import Author, DSMetaData
-from app.modules.dataset.services import DataSetService
+from app.modules.dataset.sky import parse_cone_arguments
 from app.modules.explore import explore_bp
+from app.modules.explore.autocomplete import DEFAULT_SUGGESTIONS, SUGGESTION_KINDS
 from app.modules.explore.forms import ExploreForm
+from app.modules.explore.repositories import DEFAULT_PAGE_SIZE
 from app.modules.explore.services import ExploreService
-from app.modules.profile.models import UserProfile
+from core.serialisers.ndjson import ndjson_response, wants_ndjson
 
 
 @explore_bp.route("/explore", methods=["GET", "POST"])
 def index():
     if request.method == "GET":
         query = request.args.get("query", "")
-        authors = Author.query.with_entities(Author.name).distinct().order_by(Author.name.asc()).all()
-        tag_strings = DSMetaData.query.with_entities(DSMetaData.tags).filter(DSMetaData.tags.isnot(None)).all()
-        tags = set()
-        for (tag_string,) in tag_strings:
-            if tag_string:
-                tags.update(tag.strip() for tag in tag_string.split(","))
-        tags = sorted(list(tags))
+        explore_service = ExploreService()
+        facets = explore_service.get_facet_snapshot()
+        explore_service.warm_autocomplete()
         form = ExploreForm()
-        return render_template("explore/index.html", form=form, query=query, authors=authors, tags=tags)
+        return render_template(
+            "explore/index.html",
+            form=form,
+            query=query,
+            authors=facets["authors"],
+            tags=facets["tags"],
+            facets=facets,
+        )
 
     if request.method == "POST":
         criteria = request.get_json()
-        datasets = ExploreService().filter(**criteria)
-
-        dataset_service = DataSetService()
-        result = []
-        for dataset in datasets:
-            dataset_dict = dataset.to_dict()
-
-            # Add recommendations for each dataset
-            recommendations = dataset_service.get_recommendations(dataset.id, limit=3)
-            dataset_dict["recommendations"] = [
-                {
-                    "title": rec["dataset"].ds_meta_data.title,
-                    "url": f"/doi/{rec['dataset'].ds_meta_data.dataset_doi}/",
-                    "score": rec["score"],
-                    "downloads": rec["downloads"],
-                    "coincidences": rec["coincidences"],
-                }
-                for rec in recommendations
-            ]
-
-            # Add creator info for each dataset
-            dataset_creator = UserProfile.query.filter_by(user_id=dataset.user_id).first()
-            dataset_dict["creator"] = (
-                {
-                    "name": dataset_creator.name,
-                    "surname": dataset_creator.surname,
-                    "profile_url": url_for("profile.author_profile", user_id=dataset.user_id),
-                }
-                if dataset_creator
-                else None
-            )
-
-            result.append(dataset_dict)
-
-        return jsonify(result)
+        cursor = criteria.pop("cursor", None)
+        page_size = criteria.pop("page_size", DEFAULT_PAGE_SIZE)
+        explore_service = ExploreService()
+
+        # Opt-in streaming of every result, one dataset per line, instead of a page
+        if wants_ndjson():
+            try:
+                return ndjson_response(explore_service.stream_results(**criteria))
+            except ValueError as exc:
+                return jsonify({"error": str(exc)}), 400
+
+        try:
+            page = explore_service.filter_page(cursor=cursor, page_size=page_size, with_total=True, **criteria)
+        except ValueError as exc:
+            return jsonify({"error": str(exc)}), 400
+        result = explore_service.serialize_results(page.datasets)
+
+        return jsonify(
+            {
+                "datasets": result,
+                "next_cursor": page.next_cursor,
+                "page_size": page.page_size,
+                "total_estimate": page.total_estimate,
+            }
+        )
+
+
+@explore_bp.route("/explore/cone", methods=["GET"])
+def cone_search():
+    """Datasets with an observation within `radius` degrees of (`ra`, `dec`), nearest first."""
+    try:
+        ra, dec, radius = parse_cone_arguments(request.args)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    datasets = ExploreService().cone_search(ra, dec, radius)
+    return jsonify({"ra": ra, "dec": dec, "radius": radius, "total": len(datasets), "datasets": datasets})
+
+
+@explore_bp.route("/explore/autocomplete", methods=["GET"])
+def autocomplete():
+    """Suggestions for the search box: titles, object names and authors with a word starting with `q`."""
+    kind = request.args.get("kind") or None
+    if kind is not None and kind not in SUGGESTION_KINDS:
+        return jsonify({"error": f"kind must be one of {', '.join(SUGGESTION_KINDS)}"}), 400
+    limit = request.args.get("limit", DEFAULT_SUGGESTIONS, type=int)
+
+    query = request.args.get("q", "")
+    suggestions = ExploreService().get_suggestions(query, limit=limit, kind=kind)
+    response = jsonify({"query": query, "suggestions": suggestions})
+    response.cache_control.max_age = 60
+    return response
+
+
+@explore_bp.route("/explore/cache/stats", methods=["GET"])
+def cache_stats():
+    """Hit/miss counters of the explore result cache, for monitoring."""
+    return jsonify(ExploreService().get_cache_stats())
+
+
+@explore_bp.route("/explore/facets", methods=["GET"])
+def facet_snapshot():
+    """Catalog-wide filter options; the snapshot version doubles as ETag."""
+    facets = ExploreService().get_facet_snapshot()
+    response = jsonify(facets)
+    response.set_etag(facets["version"])
+    return response.make_conditional(request)
+
+
+@explore_bp.route("/explore/facets", methods=["POST"])
+def facets():
+    """Per-tag dataset counts for the results of the explore criteria (same JSON body as POST /explore)."""
+    criteria = request.get_json() or {}
+    for key in ("cursor", "page_size", "sorting"):
+        criteria.pop(key, None)
+    try:
+        tags = ExploreService().tag_facets(**criteria)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify({"tags": tags})
@@ -0,0 +1,625 @@
+import bisect
+import logging
+import math
+import os
+import re
+import threading
+import time
+from collections import defaultdict
+from functools import lru_cache
+
+import unidecode
+from sqlalchemy.orm import selectinload
+
+from app.modules.dataset.fingerprints import FingerprintChanges
+from app.modules.dataset.models import DataSet, DSMetaData
+from app.modules.dataset.repositories import DataSetRepository
+from app.modules.explore.repositories import (
+    DEFAULT_PAGE_SIZE,
+    STREAM_BATCH_SIZE,
+    ExplorePage,
+    ExploreRepository,
+    clamp_page_size,
+    decode_cursor,
+)
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of each document field in text relevance
+FIELD_WEIGHTS = {"title": 3.0, "tags": 2.0, "authors": 2.0, "description": 1.0}
+
+
+def tokenize(value) -> list:
+    """Accent-insensitive, lower-cased word tokens (same normalization as ExploreRepository)."""
+    if not value:
+        return []
+    return re.findall(r"\w+", unidecode.unidecode(value).lower())
+
+
+def dataset_document(dataset) -> dict:
+    """Searchable fields of a dataset, shared by every indexing backend."""
+    meta = dataset.ds_meta_data
+    return {
+        "id": dataset.id,
+        "title": meta.title,
+        "description": meta.description,
+        "tags": [tag.strip() for tag in meta.tags.split(",")] if meta.tags else [],
+        "authors": [
+            {"name": author.name, "affiliation": author.affiliation, "orcid": author.orcid} for author in meta.authors
+        ],
+        "publication_type": meta.publication_type.name if meta.publication_type else None,
+        "created_at": dataset.created_at.isoformat() if dataset.created_at else None,
+    }
+
+
+def iter_catalog(batch_size: int = 500):
+    """Every dataset with its metadata and authors, loaded in batches."""
+    query = DataSet.query.options(selectinload(DataSet.ds_meta_data).selectinload(DSMetaData.authors)).order_by(
+        DataSet.id
+    )
+    return query.yield_per(batch_size)
+
+
+class SearchBackend:
+    """
+    Text search used by ExploreService.filter.
+
+    Backends answer the free-text part of the criteria; structured filters
+    (dates, author, tags, publication type) and the DOI check always run in
+    SQL through ExploreRepository, so every backend returns the same kind of
+    results. Index maintenance is driven by DataSetService hooks.
+    """
+
+    name = None
+
+    def __init__(self, repository: ExploreRepository = None):
+        self.repository = repository or ExploreRepository()
+
+    def search(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        **kwargs,
+    ):
+        raise NotImplementedError
+
+    def search_page(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        cursor=None,
+        page_size=DEFAULT_PAGE_SIZE,
+        with_total=False,
+        **kwargs,
+    ) -> ExplorePage:
+        """One page of search() results (see ExploreRepository.filter_page)."""
+        raise NotImplementedError
+
+    def tag_facets(
+        self, query="", date_after=None, date_before=None, author="any", publication_type="any", tags=[], **kwargs
+    ) -> list:
+        """Per-tag dataset counts of the search() results (see ExploreRepository.tag_facets)."""
+        raise NotImplementedError
+
+    def iter_batches(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        batch_size=STREAM_BATCH_SIZE,
+        **kwargs,
+    ):
+        """search() results in lists of at most batch_size datasets (see ExploreRepository.iter_batches)."""
+        raise NotImplementedError
+
+    def index_dataset(self, dataset):
+        """Add or replace a dataset in the index."""
+
+    def remove_dataset(self, dataset_id: int):
+        """Drop a dataset from the index."""
+
+    def reindex(self) -> int:
+        """Rebuild the whole index from the database; returns the number of datasets indexed."""
+        return 0
+
+
+class SQLSearchBackend(SearchBackend):
+    """Full-text search straight on the database (FULLTEXT / FTS5 / ilike), nothing to index."""
+
+    name = "sql"
+
+    def search(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        **kwargs,
+    ):
+        return self.repository.filter(query, date_after, date_before, author, sorting, publication_type, tags, **kwargs)
+
+    def search_page(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        cursor=None,
+        page_size=DEFAULT_PAGE_SIZE,
+        with_total=False,
+        **kwargs,
+    ) -> ExplorePage:
+        return self.repository.filter_page(
+            query,
+            date_after,
+            date_before,
+            author,
+            sorting,
+            publication_type,
+            tags,
+            cursor=cursor,
+            page_size=page_size,
+            with_total=with_total,
+            **kwargs,
+        )
+
+    def tag_facets(
+        self, query="", date_after=None, date_before=None, author="any", publication_type="any", tags=[], **kwargs
+    ) -> list:
+        return self.repository.tag_facets(query, date_after, date_before, author, publication_type, tags, **kwargs)
+
+    def iter_batches(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        batch_size=STREAM_BATCH_SIZE,
+        **kwargs,
+    ):
+        return self.repository.iter_batches(
+            query,
+            date_after,
+            date_before,
+            author,
+            sorting,
+            publication_type,
+            tags,
+            batch_size=batch_size,
+            **kwargs,
+        )
+
+
+class IndexedSearchBackend(SearchBackend):
+    """Backends with their own text index: match ids there, then filter and load them in SQL."""
+
+    def match(self, words: list) -> dict:
+        """Return {dataset_id: relevance} for datasets matching any of the words."""
+        raise NotImplementedError
+
+    def search(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        **kwargs,
+    ):
+        words = self.repository._query_words(query)
+        if words:
+            scores = self.match(words)
+            if not scores:
+                return []
+            kwargs["dataset_ids"] = scores.keys()
+
+        datasets = self.repository.filter(
+            "", date_after, date_before, author, sorting, publication_type, tags, **kwargs
+        )
+        if words and sorting == "relevance":
+            datasets.sort(key=lambda dataset: scores.get(dataset.id, 0), reverse=True)
+        return datasets
+
+    def search_page(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        cursor=None,
+        page_size=DEFAULT_PAGE_SIZE,
+        with_total=False,
+        **kwargs,
+    ) -> ExplorePage:
+        """
+        Date sortings are keyset-paginated in SQL over the matched ids. The
+        index relevance only exists here, so relevance pages are offsets into
+        the filtered and ranked matches.
+        """
+        page_size = clamp_page_size(page_size)
+        words = self.repository._query_words(query)
+        if not words or sorting != "relevance":
+            if words:
+                scores = self.match(words)
+                if not scores:
+                    return ExplorePage([], None, page_size, 0 if with_total else None)
+                kwargs["dataset_ids"] = scores.keys()
+            return self.repository.filter_page(
+                "",
+                date_after,
+                date_before,
+                author,
+                sorting,
+                publication_type,
+                tags,
+                cursor=cursor,
+                page_size=page_size,
+                with_total=with_total,
+                **kwargs,
+            )
+
+        position = decode_cursor(cursor, sorting)
+        if position is not None and "offset" not in position:
+            raise ValueError("Invalid cursor: it does not match the requested results")
+        offset = position["offset"] if position is not None else 0
+
+        datasets = self.search(query, date_after, date_before, author, sorting, publication_type, tags, **kwargs)
+        total_estimate = len(datasets) if with_total and position is None else None
+        return ExplorePage.from_rows(
+            datasets[offset : offset + page_size + 1], sorting, page_size, offset=offset, total_estimate=total_estimate
+        )
+
+    def tag_facets(
+        self, query="", date_after=None, date_before=None, author="any", publication_type="any", tags=[], **kwargs
+    ) -> list:
+        words = self.repository._query_words(query)
+        if words:
+            scores = self.match(words)
+            if not scores:
+                return []
+            kwargs["dataset_ids"] = scores.keys()
+        return self.repository.tag_facets("", date_after, date_before, author, publication_type, tags, **kwargs)
+
+    def iter_batches(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        batch_size=STREAM_BATCH_SIZE,
+        **kwargs,
+    ):
+        """
+        Date sortings stream from SQL over the matched ids. For relevance only
+        the filtered ids are ranked in memory; datasets are still loaded one
+        batch at a time.
+        """
+        words = self.repository._query_words(query)
+        if words:
+            scores = self.match(words)
+            if not scores:
+                return
+            kwargs["dataset_ids"] = scores.keys()
+
+        if not words or sorting != "relevance":
+            yield from self.repository.iter_batches(
+                "", date_after, date_before, author, sorting, publication_type, tags, batch_size=batch_size, **kwargs
+            )
+            return
+
+        dataset_ids = self.repository.filter_ids(
+            "", date_after, date_before, author, sorting, publication_type, tags, **kwargs
+        )
+        dataset_ids.sort(key=lambda dataset_id: scores.get(dataset_id, 0), reverse=True)
+        for start in range(0, len(dataset_ids), batch_size):
+            yield self.repository.load_ordered(dataset_ids[start : start + batch_size])
+
+
+class InMemorySearchIndex:
+    """
+    Pure-Python inverted index from token to {dataset_id: weighted term frequency}.
+
+    Words match as prefixes (like the SQL full-text path) through a sorted
+    vocabulary and bisect; relevance is the TF-IDF of the matched tokens.
+    The index lives in process memory: DataSetService keeps it in sync, and
+    it is rebuilt from the database when the catalog fingerprint changes or
+    SEARCH_INDEX_TTL expires, which covers other workers and seeders.
+    """
+
+    def __init__(self, ttl_seconds: int = None):
+        if ttl_seconds is None:
+            ttl_seconds = int(os.getenv("SEARCH_INDEX_TTL", "300"))
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)
+        self._vocabulary = []
+        self._documents = {}
+        self._changes = FingerprintChanges()
+        self._fingerprint = None
+        self._built_at = None
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._vocabulary = []
+            self._documents.clear()
+            self._changes.clear()
+            self._fingerprint = None
+            self._built_at = None
+
+    @staticmethod
+    def _weighted_terms(document: dict) -> dict:
+        terms = defaultdict(float)
+        fields = {
+            "title": document["title"],
+            "description": document["description"],
+            "tags": " ".join(document["tags"]),
+            "authors": " ".join(
+                " ".join(filter(None, (author["name"], author["affiliation"], author["orcid"])))
+                for author in document["authors"]
+            ),
+        }
+        for field, value in fields.items():
+            for token in tokenize(value):
+                terms[token] += FIELD_WEIGHTS[field]
+        return terms
+
+    def add(self, document: dict):
+        with self._lock:
+            self.remove(document["id"])
+            terms = self._weighted_terms(document)
+            self._documents[document["id"]] = frozenset(terms)
+            self._changes.added(document["id"])
+            for token, weight in terms.items():
+                if token not in self._postings:
+                    bisect.insort(self._vocabulary, token)
+                self._postings[token][document["id"]] = weight
+
+    def remove(self, dataset_id: int):
+        with self._lock:
+            if dataset_id in self._documents:
+                self._changes.removed(dataset_id)
+            for token in self._documents.pop(dataset_id, ()):
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(dataset_id, None)
+                if not postings:
+                    del self._postings[token]
+                    position = bisect.bisect_left(self._vocabulary, token)
+                    if position < len(self._vocabulary) and self._vocabulary[position] == token:
+                        del self._vocabulary[position]
+
+    def rebuild(self, documents, fingerprint=None):
+        with self._lock:
+            self.clear()
+            for document in documents:
+                self.add(document)
+            self._changes.clear()
+            self._fingerprint = fingerprint
+            self._built_at = time.monotonic()
+        logger.info(f"In-memory search index rebuilt with {len(self._documents)} datasets")
+
+    def sync_fingerprint(self, repository):
+        """
+        Record the catalog fingerprint after incremental updates, or mark the
+        index stale when it changed by more than those updates (see fingerprints).
+        """
+        if self._built_at is None:
+            self._changes.clear()
+            return
+        fingerprint = repository.get_catalog_fingerprint()
+        with self._lock:
+            if self._changes.follows(self._fingerprint, fingerprint):
+                self._fingerprint = fingerprint
+            else:
+                # Another worker changed the catalog as well: rebuild on the next ensure_fresh
+                self._built_at = None
+
+    def ensure_fresh(self, repository):
+        fingerprint = repository.get_catalog_fingerprint()
+        expired = self._built_at is None or time.monotonic() - self._built_at > self.ttl_seconds
+        if expired or fingerprint != self._fingerprint:
+            self.rebuild((dataset_document(dataset) for dataset in iter_catalog()), fingerprint=fingerprint)
+
+    def _tokens_with_prefix(self, prefix: str) -> list:
+        start = bisect.bisect_left(self._vocabulary, prefix)
+        end = bisect.bisect_left(self._vocabulary, prefix + "\U0010ffff")
+        return self._vocabulary[start:end]
+
+    def match(self, words: list) -> dict:
+        scores = defaultdict(float)
+        with self._lock:
+            total = len(self._documents) or 1
+            for word in words:
+                for prefix in tokenize(word):
+                    for token in self._tokens_with_prefix(prefix):
+                        postings = self._postings[token]
+                        idf = math.log(1 + total / len(postings))
+                        for dataset_id, weight in postings.items():
+                            scores[dataset_id] += weight * idf
+        return dict(scores)
+
+    def __len__(self):
+        return len(self._documents)
+
+
+memory_search_index = InMemorySearchIndex()
+
+
+class InMemorySearchBackend(IndexedSearchBackend):
+    """Inverted index in process memory, no external service needed."""
+
+    name = "memory"
+
+    def __init__(self, repository: ExploreRepository = None, index: InMemorySearchIndex = None):
+        super().__init__(repository)
+        self.index = index or memory_search_index
+        self.dataset_repository = DataSetRepository()
+
+    def match(self, words: list) -> dict:
+        self.index.ensure_fresh(self.dataset_repository)
+        return self.index.match(words)
+
+    def index_dataset(self, dataset):
+        self.index.add(dataset_document(dataset))
+        self.index.sync_fingerprint(self.dataset_repository)
+
+    def remove_dataset(self, dataset_id: int):
+        self.index.remove(dataset_id)
+        self.index.sync_fingerprint(self.dataset_repository)
+
+    def reindex(self) -> int:
+        self.index.rebuild(
+            (dataset_document(dataset) for dataset in iter_catalog()),
+            fingerprint=self.dataset_repository.get_catalog_fingerprint(),
+        )
+        return len(self.index)
+
+
+@lru_cache(maxsize=None)
+def _elasticsearch_client(url: str):
+    from elasticsearch import Elasticsearch
+
+    return Elasticsearch(url)
+
+
+class ElasticsearchSearchBackend(IndexedSearchBackend):
+    """
+    Elasticsearch-compatible backend (ELASTICSEARCH_URL, ELASTICSEARCH_INDEX).
+
+    Every query word is a phrase_prefix multi_match over the weighted fields,
+    combined with OR; only ids and scores are read back. Every match is
+    read, ELASTICSEARCH_PAGE_SIZE hits per request, with search_after over a
+    point in time, so broad searches are not truncated and explore results
+    and totals match the SQL backend.
+    """
+
+    name = "elasticsearch"
+
+    FIELDS = ["title^3", "tags^2", "authors.name^2", "authors.affiliation", "authors.orcid", "description"]
+    MAPPINGS = {
+        "properties": {
+            "title": {"type": "text"},
+            "description": {"type": "text"},
+            "tags": {"type": "text"},
+            "authors": {
+                "properties": {
+                    "name": {"type": "text"},
+                    "affiliation": {"type": "text"},
+                    "orcid": {"type": "text"},
+                }
+            },
+            "publication_type": {"type": "keyword"},
+            "created_at": {"type": "date"},
+        }
+    }
+    SETTINGS = {
+        "analysis": {"analyzer": {"default": {"tokenizer": "standard", "filter": ["lowercase", "asciifolding"]}}}
+    }
+
+    def __init__(self, repository: ExploreRepository = None, client=None):
+        super().__init__(repository)
+        self.index_name = os.getenv("ELASTICSEARCH_INDEX", "uvlhub-datasets")
+        self.page_size = int(os.getenv("ELASTICSEARCH_PAGE_SIZE", "1000"))
+        self.client = client or _elasticsearch_client(os.getenv("ELASTICSEARCH_URL", "http://localhost:9200"))
+
+    def match(self, words: list) -> dict:
+        query = {
+            "bool": {
+                "should": [
+                    {"multi_match": {"query": word, "type": "phrase_prefix", "fields": self.FIELDS}} for word in words
+                ],
+                "minimum_should_match": 1,
+            }
+        }
+        # The point in time keeps pages consistent while documents are indexed in between
+        pit_id = self.client.open_point_in_time(index=self.index_name, keep_alive="1m")["id"]
+        scores = {}
+        search_after = None
+        try:
+            while True:
+                response = self.client.search(
+                    pit={"id": pit_id, "keep_alive": "1m"},
+                    query=query,
+                    sort=[{"_score": "desc"}, {"_shard_doc": "asc"}],
+                    search_after=search_after,
+                    size=self.page_size,
+                    track_scores=True,
+                    track_total_hits=False,
+                    source=False,
+                )
+                pit_id = response.get("pit_id", pit_id)
+                hits = response["hits"]["hits"]
+                scores.update((int(hit["_id"]), hit["_score"]) for hit in hits)
+                if len(hits) < self.page_size:
+                    return scores
+                search_after = hits[-1]["sort"]
+        finally:
+            self.client.close_point_in_time(id=pit_id)
+
+    def index_dataset(self, dataset):
+        self.client.index(index=self.index_name, id=dataset.id, document=dataset_document(dataset))
+
+    def remove_dataset(self, dataset_id: int):
+        self.client.options(ignore_status=404).delete(index=self.index_name, id=dataset_id)
+
+    def reindex(self) -> int:
+        from elasticsearch.helpers import bulk
+
+        self.client.options(ignore_status=404).indices.delete(index=self.index_name)
+        self.client.indices.create(index=self.index_name, mappings=self.MAPPINGS, settings=self.SETTINGS)
+        indexed, _ = bulk(
+            self.client,
+            (
+                {"_index": self.index_name, "_id": dataset.id, "_source": dataset_document(dataset)}
+                for dataset in iter_catalog()
+            ),
+        )
+        self.client.indices.refresh(index=self.index_name)
+        return indexed
+
+
+SEARCH_BACKENDS = {
+    backend.name: backend for backend in (SQLSearchBackend, InMemorySearchBackend, ElasticsearchSearchBackend)
+}
+
+
+def create_search_backend(repository: ExploreRepository = None) -> SearchBackend:
+    """Backend selected by SEARCH_BACKEND: "sql" (default), "memory" or "elasticsearch"."""
+    name = os.getenv("SEARCH_BACKEND", "sql").strip().lower()
+    if name not in SEARCH_BACKENDS:
+        logger.warning(f"Unknown SEARCH_BACKEND '{name}', using the SQL backend")
+        name = SQLSearchBackend.name
+    return SEARCH_BACKENDS[name](repository)
@@ -1,10 +1,32 @@
-from app.modules.explore.repositories import ExploreRepository
+from flask import url_for
+
+from app.modules.dataset.repositories import DataSetRepository
+from app.modules.dataset.serializers import DataSetBatchSerializer
+from app.modules.dataset.services_recommendations import recommendation_service
+from app.modules.explore.autocomplete import DEFAULT_SUGGESTIONS, autocomplete_index
+from app.modules.explore.cache import criteria_key, explore_result_cache, observation_criteria
+from app.modules.explore.facets import explore_facets
+from app.modules.explore.repositories import (
+    DEFAULT_PAGE_SIZE,
+    STREAM_BATCH_SIZE,
+    ExplorePage,
+    ExploreRepository,
+    clamp_page_size,
+)
+from app.modules.explore.search_backends import create_search_backend
+from app.modules.profile.repositories import UserProfileRepository
 from core.services.BaseService import BaseService
 
 
 class ExploreService(BaseService):
     def __init__(self):
         super().__init__(ExploreRepository())
+        self.search_backend = create_search_backend(self.repository)
+        self.dataset_repository = DataSetRepository()
+        self.profile_repository = UserProfileRepository()
+        self.result_cache = explore_result_cache
+        self.autocomplete_index = autocomplete_index
+        self.recommendation_service = recommendation_service
 
     def filter(
         self,
@@ -17,4 +39,156 @@ class ExploreService(BaseService):
         tags=[],
         **kwargs,
     ):
-        return self.repository.filter(query, date_after, date_before, author, sorting, publication_type, tags, **kwargs)
+        """
+        Results of the criteria. The ordered ids are cached per normalized
+        criteria, so repeated searches only load the datasets by primary key.
+        """
+        if "dataset_ids" in kwargs:
+            return self.search_backend.search(
+                query, date_after, date_before, author, sorting, publication_type, tags, **kwargs
+            )
+
+        key = criteria_key(
+            query, date_after, date_before, author, sorting, publication_type, tags, **observation_criteria(kwargs)
+        )
+        dataset_ids = self.result_cache.get(key)
+        if dataset_ids is not None:
+            return self.repository.load_ordered(list(dataset_ids))
+
+        datasets = self.search_backend.search(
+            query, date_after, date_before, author, sorting, publication_type, tags, **kwargs
+        )
+        self.result_cache.set(key, tuple(dataset.id for dataset in datasets))
+        return datasets
+
+    def filter_page(
+        self,
+        query="",
+        date_after=None,
+        date_before=None,
+        author="any",
+        sorting="newest",
+        publication_type="any",
+        tags=[],
+        cursor=None,
+        page_size=DEFAULT_PAGE_SIZE,
+        with_total=False,
+        **kwargs,
+    ) -> ExplorePage:
+        """One page of filter() results; pages are cached like filter(), keyed by cursor and size too."""
+        page_size = clamp_page_size(page_size)
+        key = None
+        if "dataset_ids" not in kwargs:
+            key = criteria_key(
+                query,
+                date_after,
+                date_before,
+                author,
+                sorting,
+                publication_type,
+                tags,
+                cursor=cursor,
+                page_size=page_size,
+                with_total=with_total,
+                **observation_criteria(kwargs),
+            )
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                dataset_ids, next_cursor, total_estimate = cached
+                datasets = self.repository.load_ordered(list(dataset_ids))
+                return ExplorePage(datasets, next_cursor, page_size, total_estimate)
+
+        page = self.search_backend.search_page(
+            query,
+            date_after,
+            date_before,
+            author,
+            sorting,
+            publication_type,
+            tags,
+            cursor=cursor,
+            page_size=page_size,
+            with_total=with_total,
+            **kwargs,
+        )
+        if key is not None:
+            self.result_cache.set(
+                key, (tuple(dataset.id for dataset in page.datasets), page.next_cursor, page.total_estimate)
+            )
+        return page
+
+    def tag_facets(
+        self, query="", date_after=None, date_before=None, author="any", publication_type="any", tags=[], **kwargs
+    ) -> list:
+        return self.search_backend.tag_facets(query, date_after, date_before, author, publication_type, tags, **kwargs)
+
+    def cone_search(self, ra: float, dec: float, radius: float) -> list:
+        """Serialized datasets observed within radius degrees of (ra, dec), with their observation and distance."""
+        matches = self.repository.cone_search(ra, dec, radius)
+        dataset_dicts = self.serialize_results([dataset for dataset, _, _ in matches])
+        for dataset_dict, (_, observation, separation) in zip(dataset_dicts, matches):
+            dataset_dict["observation"] = observation.to_dict()
+            dataset_dict["separation_deg"] = round(separation, 6)
+        return dataset_dicts
+
+    def get_cache_stats(self) -> dict:
+        return self.result_cache.stats()
+
+    def get_facet_snapshot(self) -> dict:
+        """Filter options for the explore page, served from the in-memory snapshot."""
+        explore_facets.ensure_fresh(self.dataset_repository)
+        return explore_facets.snapshot()
+
+    def warm_autocomplete(self):
+        """Build the suggestion index before the first keystroke (rendering the explore page)."""
+        self.autocomplete_index.ensure_fresh(self.dataset_repository)
+
+    def get_suggestions(self, prefix: str, limit: int = DEFAULT_SUGGESTIONS, kind: str = None) -> list:
+        """Titles, object names and authors starting with prefix, served from the in-memory index."""
+        self.autocomplete_index.ensure_fresh(self.dataset_repository)
+        return self.autocomplete_index.suggest(prefix, limit=limit, kind=kind)
+
+    def serialize_results(self, datasets: list) -> list:
+        """
+        Explore results as JSON-ready dicts: DataSet.to_dict() plus the top
+        recommendations and the creator of each dataset, loaded for the whole
+        list at once.
+        """
+        dataset_dicts = DataSetBatchSerializer().serialize(datasets)
+
+        # Precomputed recommendations for every result in one pass. Refreshed rows are
+        # committed at the end: committing now would expire the page and reload it row by row
+        recommendations_map = self.recommendation_service.get_for_datasets(
+            [dataset.id for dataset in datasets], limit=3, commit=False
+        )
+        profiles = self.profile_repository.get_by_user_ids({dataset.user_id for dataset in datasets})
+
+        for dataset, dataset_dict in zip(datasets, dataset_dicts):
+            dataset_dict["recommendations"] = [
+                {
+                    "title": rec["dataset"].ds_meta_data.title,
+                    "url": f"/doi/{rec['dataset'].ds_meta_data.dataset_doi}/",
+                    "score": rec["score"],
+                    "downloads": rec["downloads"],
+                    "coincidences": rec["coincidences"],
+                }
+                for rec in recommendations_map.get(dataset.id, [])
+            ]
+
+            dataset_creator = profiles.get(dataset.user_id)
+            dataset_dict["creator"] = (
+                {
+                    "name": dataset_creator.name,
+                    "surname": dataset_creator.surname,
+                    "profile_url": url_for("profile.author_profile", user_id=dataset.user_id),
+                }
+                if dataset_creator
+                else None
+            )
+        self.recommendation_service.repository.session.commit()
+        return dataset_dicts
+
+    def stream_results(self, batch_size: int = STREAM_BATCH_SIZE, **criteria):
+        """Every result of the criteria, serialized like serialize_results(), loaded one batch at a time."""
+        for datasets in self.search_backend.iter_batches(batch_size=batch_size, **criteria):
+            yield from self.serialize_results(datasets)
@@ -0,0 +1,45 @@
+import json
+import os
+import random
+
+import pytest
+
+from app.modules.dataset.benchmarks import delete_synthetic_catalog, generate_synthetic_catalog, write_report
+from app.modules.explore.benchmarks import benchmark_fuzzy_search, synthetic_author_names, with_typo
+
+# Opt into the full-size run with e.g. FUZZY_SEARCH_BENCHMARK_AUTHORS=100000
+BENCHMARK_AUTHORS = [int(size) for size in os.getenv("FUZZY_SEARCH_BENCHMARK_AUTHORS", "2000").split(",")]
+
+
+@pytest.fixture(scope="module", params=BENCHMARK_AUTHORS, ids=lambda size: f"{size}-authors")
+def synthetic_catalog(request, test_client):
+    catalog = generate_synthetic_catalog(
+        request.param // 2, seed=0, author_names=synthetic_author_names(request.param), published=True
+    )
+    yield catalog
+    delete_synthetic_catalog(catalog)
+
+
+def test_synthetic_names_and_typos():
+    names = synthetic_author_names(500, seed=1)
+    assert len(set(names)) == 500
+
+    typo = with_typo("Ana Barolo", random.Random(0))
+    assert typo != "Ana Barolo" and typo.startswith("Ana ")
+
+
+def test_fuzzy_search_benchmark(synthetic_catalog, tmp_path):
+    result = benchmark_fuzzy_search(synthetic_catalog, sample=20)
+
+    recall = result["recall"]
+    # The trigram filter finds everything the substring scan finds, and survives typos
+    assert recall["trigram_full_name"] == recall["scan_full_name"] == 1.0
+    assert recall["trigram_surname"] == 1.0
+    assert recall["trigram_typo"] > 0.8 > recall["scan_typo"]
+    if result["authors"] >= 100000:
+        assert result["speedup_p50"]["full_name"] > 1
+
+    report_path = os.getenv("FUZZY_SEARCH_BENCHMARK_REPORT") or str(tmp_path / "fuzzy_search.json")
+    write_report({"results": [result]}, report_path)
+    with open(report_path) as f:
+        assert json.load(f)["results"][0]["authors"] == result["authors"]
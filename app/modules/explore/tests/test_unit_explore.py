@@ -1,11 +1,36 @@
-from datetime import datetime
+import json
+from datetime import date, datetime
 from unittest.mock import Mock, patch
 
 import pytest
+from sqlalchemy.dialects import mysql
 
-from app import create_app
-from app.modules.dataset.models import PublicationType
+from app import create_app, db
+from app.modules.auth.models import User
+from app.modules.dataset.benchmarks import count_queries
+from app.modules.dataset.models import Author, DataSet, DSMetaData, Observation, PublicationType, Tag
+from app.modules.dataset.repositories import TagRepository
+from app.modules.dataset.serializers import DataSetBatchSerializer
+from app.modules.dataset.sky import angular_separation
+from app.modules.explore.autocomplete import AutocompleteIndex, autocomplete_index
+from app.modules.explore.cache import ExploreResultCache, criteria_key, explore_result_cache
+from app.modules.explore.facets import ExploreFacetSnapshot, explore_facets
+from app.modules.explore.repositories import ExploreRepository, decode_cursor, encode_cursor, observation_conditions
+from app.modules.explore.search_backends import (
+    ElasticsearchSearchBackend,
+    InMemorySearchBackend,
+    InMemorySearchIndex,
+    SQLSearchBackend,
+    create_search_backend,
+)
 from app.modules.explore.services import ExploreService
+from app.modules.hubfile.models import Hubfile
+
+
+@pytest.fixture(autouse=True)
+def empty_result_cache():
+    """Cached ids must not leak between tests: they restart after every drop_all."""
+    explore_result_cache.clear()
 
 
 class TestExploreUnit:
@@ -299,3 +324,947 @@ class TestExploreUnit:
             assert "Epsilon dataset" in titles
             assert "Delta dataset" in titles
             assert "Sigma dataset" not in titles
+
+
+class TestExploreFullTextSearch:
+    """
+    Full-text search in ExploreRepository.filter (FULLTEXT on MariaDB, FTS5 on SQLite).
+    """
+
+    @staticmethod
+    def _dataset(user, title, description, tags, authors, created_at):
+        meta = DSMetaData(
+            title=title,
+            description=description,
+            publication_type=PublicationType.DATA_PAPER,
+            dataset_doi=f"10.1234/{title.lower().replace(' ', '-')}",
+            tags=tags,
+            authors=[Author(name=name, affiliation=affiliation) for name, affiliation in authors],
+        )
+        dataset = DataSet(user_id=user.id, ds_meta_data=meta, created_at=created_at)
+        db.session.add(dataset)
+        return dataset
+
+    @pytest.fixture
+    def catalog(self, test_client, clean_database):
+        user = User(email="fts@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        datasets = {
+            "nebula": self._dataset(
+                user,
+                "Orion nebula",
+                "Nebula photometry, nebula spectra",
+                "nebula, orion",
+                [("Ana Ruiz", "Uni Sevilla"), ("Luis Ruiz", "Uni Sevilla")],
+                datetime(2024, 1, 1),
+            ),
+            "galaxy": self._dataset(
+                user, "Andromeda galaxy", "A nearby nebula-free galaxy", "galaxy", [], datetime(2024, 6, 1)
+            ),
+            "cluster": self._dataset(
+                user,
+                "Hercules cluster",
+                "Globular cluster",
+                "cluster",
+                [("Jules Verne", "Uni Nantes")],
+                datetime(2023, 1, 1),
+            ),
+        }
+        db.session.commit()
+        return datasets
+
+    def test_matches_are_ranked_by_relevance(self, catalog):
+        results = ExploreRepository().filter(query="nebula", sorting="relevance")
+
+        assert [dataset.id for dataset in results] == [catalog["nebula"].id, catalog["galaxy"].id]
+
+    def test_author_matches_are_not_duplicated(self, catalog):
+        results = ExploreRepository().filter(query="sevilla ruiz")
+
+        assert [dataset.id for dataset in results] == [catalog["nebula"].id]
+
+    def test_datasets_without_authors_are_searchable(self, catalog):
+        results = ExploreRepository().filter(query="andromeda")
+
+        assert [dataset.id for dataset in results] == [catalog["galaxy"].id]
+
+    def test_prefix_and_accent_insensitive_match(self, catalog):
+        results = ExploreRepository().filter(query="Hércu")
+
+        assert [dataset.id for dataset in results] == [catalog["cluster"].id]
+
+    def test_index_follows_edits(self, catalog):
+        ExploreRepository().filter(query="nebula")
+
+        catalog["cluster"].ds_meta_data.title = "Hercules nebula candidate"
+        catalog["cluster"].ds_meta_data.authors[0].name = "Ada Lovelace"
+        db.session.commit()
+
+        assert catalog["cluster"].id in [dataset.id for dataset in ExploreRepository().filter(query="nebula")]
+        assert [dataset.id for dataset in ExploreRepository().filter(query="lovelace")] == [catalog["cluster"].id]
+        assert ExploreRepository().filter(query="verne") == []
+
+    def test_mysql_search_uses_fulltext_match(self, test_client):
+        repository = ExploreRepository()
+        base = DataSet.query.join(DataSet.ds_meta_data)
+
+        datasets, relevance = repository._mysql_text_search(base, ["nebula", "m3"])
+        sql = str(datasets.statement.compile(dialect=mysql.dialect()))
+
+        assert "MATCH (ds_meta_data.title, ds_meta_data.description, ds_meta_data.tags) AGAINST" in sql
+        assert "IN BOOLEAN MODE" in sql
+        # Words below the FULLTEXT token size still match by substring
+        assert "lower(ds_meta_data.title) LIKE lower(" in sql
+        assert relevance is not None
+
+
+class TestSearchBackends:
+    """
+    Pluggable text search behind ExploreService.filter.
+    """
+
+    @staticmethod
+    def _document(dataset_id, title, description="", tags=(), authors=()):
+        return {
+            "id": dataset_id,
+            "title": title,
+            "description": description,
+            "tags": list(tags),
+            "authors": [{"name": name, "affiliation": None, "orcid": None} for name in authors],
+        }
+
+    def test_backend_is_selected_from_environment(self, monkeypatch):
+        monkeypatch.setenv("SEARCH_BACKEND", "memory")
+        assert isinstance(create_search_backend(), InMemorySearchBackend)
+
+        monkeypatch.setenv("SEARCH_BACKEND", "nonexistent")
+        assert isinstance(create_search_backend(), SQLSearchBackend)
+
+        monkeypatch.delenv("SEARCH_BACKEND")
+        assert isinstance(create_search_backend(), SQLSearchBackend)
+
+    def test_memory_index_prefix_match_weights_title_over_description(self):
+        index = InMemorySearchIndex()
+        index.add(self._document(1, "Orion nebula", tags=["nebula"]))
+        index.add(self._document(2, "Andromeda galaxy", description="No nebulae here"))
+        index.add(self._document(3, "Hercules cluster", authors=["Ana Núñez"]))
+
+        scores = index.match(["nebul"])
+
+        assert set(scores) == {1, 2}
+        assert scores[1] > scores[2]
+        assert set(index.match(["nunez"])) == {3}
+
+    def test_memory_index_follows_updates_and_removals(self):
+        index = InMemorySearchIndex()
+        index.add(self._document(1, "Orion nebula"))
+        index.add(self._document(1, "Hercules cluster"))
+
+        assert index.match(["orion"]) == {}
+        assert set(index.match(["hercules"])) == {1}
+
+        index.remove(1)
+        assert index.match(["hercules"]) == {}
+        assert len(index) == 0
+
+    def test_indexed_backend_filters_matches_in_sql(self):
+        repository = Mock(spec=ExploreRepository)
+        repository._query_words = ExploreRepository._query_words
+        first, second = Mock(id=1), Mock(id=2)
+        repository.filter.return_value = [first, second]
+        backend = InMemorySearchBackend(repository=repository, index=Mock())
+        backend.dataset_repository = Mock()
+        backend.index.match.return_value = {1: 0.5, 2: 3.0}
+
+        results = backend.search(query="Nebula", sorting="relevance", tags=["x"])
+
+        assert results == [second, first]
+        backend.index.match.assert_called_once_with(["nebula"])
+        args, kwargs = repository.filter.call_args
+        assert args[0] == ""
+        assert set(kwargs["dataset_ids"]) == {1, 2}
+
+    def test_indexed_backend_without_matches_skips_database(self):
+        repository = Mock(spec=ExploreRepository)
+        repository._query_words = ExploreRepository._query_words
+        backend = InMemorySearchBackend(repository=repository, index=Mock())
+        backend.dataset_repository = Mock()
+        backend.index.match.return_value = {}
+
+        assert backend.search(query="nothing") == []
+        repository.filter.assert_not_called()
+
+    def test_elasticsearch_backend_queries_every_word(self):
+        client = Mock()
+        client.open_point_in_time.return_value = {"id": "pit"}
+        client.search.return_value = {"hits": {"hits": [{"_id": "7", "_score": 2.5}]}}
+        backend = ElasticsearchSearchBackend(repository=Mock(spec=ExploreRepository), client=client)
+
+        assert backend.match(["orion", "ruiz"]) == {7: 2.5}
+
+        query = client.search.call_args.kwargs["query"]["bool"]
+        assert [clause["multi_match"]["query"] for clause in query["should"]] == ["orion", "ruiz"]
+        assert query["should"][0]["multi_match"]["type"] == "phrase_prefix"
+
+        backend.remove_dataset(7)
+        client.options.assert_called_with(ignore_status=404)
+        client.options.return_value.delete.assert_called_once_with(index=backend.index_name, id=7)
+
+    def test_elasticsearch_backend_reads_every_page(self):
+        client = Mock()
+        client.open_point_in_time.return_value = {"id": "pit-1"}
+        hits = [{"_id": str(n), "_score": 10.0 - n, "sort": [10.0 - n, n]} for n in range(5)]
+        client.search.side_effect = [
+            {"pit_id": "pit-2", "hits": {"hits": hits[:2]}},
+            {"pit_id": "pit-3", "hits": {"hits": hits[2:4]}},
+            {"pit_id": "pit-3", "hits": {"hits": hits[4:]}},
+        ]
+        backend = ElasticsearchSearchBackend(repository=Mock(spec=ExploreRepository), client=client)
+        backend.page_size = 2
+
+        assert backend.match(["orion"]) == {n: 10.0 - n for n in range(5)}
+
+        calls = [call.kwargs for call in client.search.call_args_list]
+        assert [kwargs["search_after"] for kwargs in calls] == [None, [9.0, 1], [7.0, 3]]
+        assert [kwargs["pit"]["id"] for kwargs in calls] == ["pit-1", "pit-2", "pit-3"]
+        client.close_point_in_time.assert_called_once_with(id="pit-3")
+
+    def test_memory_backend_matches_sql_backend(self, test_client, clean_database):
+        user = User(email="search@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        nebula = TestExploreFullTextSearch._dataset(
+            user, "Orion nebula", "Nebula photometry", "nebula", [("Ana Ruiz", "Uni Sevilla")], datetime(2024, 1, 1)
+        )
+        TestExploreFullTextSearch._dataset(user, "Hercules cluster", "Globular", "cluster", [], datetime(2023, 1, 1))
+        db.session.commit()
+
+        memory_backend = InMemorySearchBackend(index=InMemorySearchIndex())
+        assert memory_backend.reindex() == 2
+
+        for query in ("nebula", "sevilla", "orio"):
+            expected = [dataset.id for dataset in SQLSearchBackend().search(query=query)]
+            assert [dataset.id for dataset in memory_backend.search(query=query)] == expected == [nebula.id]
+
+    def test_memory_backend_indexes_saved_dataset_without_rebuilding(self, test_client, clean_database):
+        user = User(email="incremental@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        TestExploreFullTextSearch._dataset(user, "Hercules cluster", "Globular", "cluster", [], datetime(2023, 1, 1))
+        db.session.commit()
+        memory_backend = InMemorySearchBackend(index=InMemorySearchIndex())
+        memory_backend.reindex()
+
+        nebula = TestExploreFullTextSearch._dataset(
+            user, "Orion nebula", "Nebula photometry", "nebula", [], datetime(2024, 1, 1)
+        )
+        db.session.commit()
+        with patch.object(memory_backend.index, "rebuild") as rebuild:
+            memory_backend.index_dataset(nebula)
+            assert [dataset.id for dataset in memory_backend.search(query="orion")] == [nebula.id]
+
+        rebuild.assert_not_called()
+
+
+class TestExplorePagination:
+    """
+    Keyset pagination of explore results on (created_at, id).
+    """
+
+    @pytest.fixture
+    def catalog(self, test_client, clean_database):
+        user = User(email="pages@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        created = [datetime(2024, 1, 1), datetime(2024, 2, 1), datetime(2024, 2, 1), datetime(2024, 3, 1)]
+        datasets = [
+            TestExploreFullTextSearch._dataset(
+                user, f"Nebula survey {i}", "Nebula" if i % 2 else "Cluster", "survey", [], created_at
+            )
+            for i, created_at in enumerate(created)
+        ]
+        db.session.commit()
+        return datasets
+
+    @staticmethod
+    def _walk(page_size, **criteria):
+        repository = ExploreRepository()
+        ids, cursor = [], None
+        while True:
+            page = repository.filter_page(cursor=cursor, page_size=page_size, **criteria)
+            ids.extend(dataset.id for dataset in page.datasets)
+            if page.next_cursor is None:
+                return ids
+            cursor = page.next_cursor
+
+    @pytest.mark.parametrize("sorting", ["newest", "oldest"])
+    def test_pages_follow_filter_order_without_gaps(self, catalog, sorting):
+        expected = [dataset.id for dataset in ExploreRepository().filter(sorting=sorting)]
+
+        assert self._walk(1, sorting=sorting) == expected
+        assert self._walk(3, sorting=sorting) == expected
+        assert len(expected) == 4
+
+    def test_relevance_pages_by_offset(self, catalog):
+        expected = [dataset.id for dataset in ExploreRepository().filter(query="nebula", sorting="relevance")]
+
+        assert self._walk(1, query="nebula", sorting="relevance") == expected
+
+    def test_total_estimate_only_on_first_page(self, catalog):
+        first = ExploreRepository().filter_page(page_size=3, with_total=True)
+        second = ExploreRepository().filter_page(page_size=3, with_total=True, cursor=first.next_cursor)
+
+        assert first.total_estimate == 4
+        assert second.total_estimate is None
+        assert len(second.datasets) == 1 and second.next_cursor is None
+
+    def test_invalid_cursors_are_rejected(self, catalog):
+        page = ExploreRepository().filter_page(page_size=1, sorting="newest")
+
+        with pytest.raises(ValueError):
+            ExploreRepository().filter_page(cursor=page.next_cursor, sorting="oldest")
+        with pytest.raises(ValueError):
+            ExploreRepository().filter_page(cursor="not-a-cursor")
+
+    def test_cursor_round_trip(self):
+        dataset = Mock(id=7, created_at=datetime(2024, 5, 1, 10, 30))
+
+        assert decode_cursor(encode_cursor("newest", dataset=dataset), "newest") == {
+            "created_at": datetime(2024, 5, 1, 10, 30),
+            "id": 7,
+        }
+        assert decode_cursor(encode_cursor("relevance", offset=40), "relevance") == {"offset": 40}
+        assert decode_cursor(None, "newest") is None
+
+    def test_explore_endpoint_returns_pages(self, test_client, catalog):
+        response = test_client.post("/explore", json={"page_size": 3, "sorting": "newest"})
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert len(data["datasets"]) == 3
+        assert data["total_estimate"] == 4
+        assert data["next_cursor"]
+
+        response = test_client.post(
+            "/explore", json={"page_size": 3, "sorting": "newest", "cursor": data["next_cursor"]}
+        )
+        assert [dataset["id"] for dataset in response.get_json()["datasets"]] == [catalog[0].id]
+
+        assert test_client.post("/explore", json={"cursor": "bogus"}).status_code == 400
+
+
+class TestExploreTags:
+    """
+    Normalized tag table: exact tag filters and facet counts.
+    """
+
+    @pytest.fixture
+    def catalog(self, test_client, clean_database):
+        user = User(email="tags@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        datasets = {
+            name: TestExploreFullTextSearch._dataset(user, title, "Survey", tags, [], created_at)
+            for name, title, tags, created_at in (
+                ("first", "Tagged one", "tag1, Nebula", datetime(2024, 1, 1)),
+                ("tenth", "Tagged ten", "tag10, nebula ", datetime(2024, 2, 1)),
+                ("plain", "Untagged", None, datetime(2024, 3, 1)),
+            )
+        }
+        db.session.commit()
+        return datasets
+
+    def test_tags_are_normalized_on_save(self, catalog):
+        assert sorted(tag.name for tag in catalog["first"].normalized_tags) == ["nebula", "tag1"]
+        assert Tag.query.filter_by(name="nebula").count() == 1
+        assert TagRepository().get_names_in_use() == ["nebula", "tag1", "tag10"]
+
+    def test_tag_filter_matches_whole_tags_only(self, catalog):
+        results = ExploreRepository().filter(tags=["tag1"])
+
+        assert [dataset.id for dataset in results] == [catalog["first"].id]
+        assert len(ExploreRepository().filter(tags=["NEBULA"])) == 2
+
+    def test_tag_edits_are_synchronized(self, catalog):
+        catalog["plain"].ds_meta_data.tags = "tag1"
+        catalog["first"].ds_meta_data.tags = "galaxy"
+        db.session.commit()
+
+        assert [dataset.id for dataset in ExploreRepository().filter(tags=["tag1"])] == [catalog["plain"].id]
+        assert [dataset.id for dataset in ExploreRepository().filter(tags=["galaxy"])] == [catalog["first"].id]
+
+    def test_tag_facets_count_current_results(self, catalog):
+        assert ExploreRepository().tag_facets() == [
+            {"name": "nebula", "count": 2},
+            {"name": "tag1", "count": 1},
+            {"name": "tag10", "count": 1},
+        ]
+        assert ExploreRepository().tag_facets(tags=["tag10"]) == [
+            {"name": "nebula", "count": 1},
+            {"name": "tag10", "count": 1},
+        ]
+
+    def test_facets_endpoint(self, test_client, catalog):
+        response = test_client.post("/explore/facets", json={"query": "", "tags": ["tag1"], "sorting": "newest"})
+
+        assert response.status_code == 200
+        assert response.get_json() == {"tags": [{"name": "nebula", "count": 1}, {"name": "tag1", "count": 1}]}
+
+
+class TestExploreFacetSnapshot:
+    """
+    In-memory facets of the explore page.
+    """
+
+    @staticmethod
+    def _snapshot():
+        snapshot = ExploreFacetSnapshot(ttl_seconds=300, check_interval=60)
+        snapshot.add(1, datetime(2024, 1, 1), "data_paper", {"nebula", "tag1"}, {"Ana Ruiz"})
+        snapshot.add(2, datetime(2024, 6, 1), "thesis", {"nebula"}, {"ana ruiz", "Luis"})
+        return snapshot
+
+    def test_snapshot_holds_distinct_values_and_bounds(self):
+        facets = self._snapshot().snapshot()
+
+        assert facets["authors"] == ["Ana Ruiz", "ana ruiz", "Luis"]
+        assert facets["tags"] == ["nebula", "tag1"]
+        assert facets["publication_types"] == {"data_paper": 1, "thesis": 1}
+        assert (facets["date_min"], facets["date_max"]) == ("2024-01-01", "2024-06-01")
+
+    def test_incremental_updates_change_the_version(self):
+        snapshot = self._snapshot()
+        version = snapshot.snapshot()["version"]
+
+        snapshot.add(1, datetime(2023, 1, 1), "thesis", {"galaxy"}, {"Luis"})
+        edited = snapshot.snapshot()
+        assert edited["version"] != version
+        assert edited["tags"] == ["galaxy", "nebula"]
+        assert edited["authors"] == ["ana ruiz", "Luis"]
+        assert edited["date_min"] == "2023-01-01"
+
+        snapshot.remove(1)
+        snapshot.remove(2)
+        assert snapshot.snapshot()["tags"] == [] and snapshot.snapshot()["date_min"] is None
+
+    def test_same_content_same_version(self):
+        assert self._snapshot().snapshot()["version"] == self._snapshot().snapshot()["version"]
+
+    def test_fingerprint_is_checked_at_most_once_per_interval(self):
+        repository = Mock()
+        repository.get_catalog_fingerprint.return_value = (1, 1)
+        repository.get_facet_rows.return_value = [
+            (1, datetime(2024, 1, 1), PublicationType.DATA_PAPER, "Nebula, tag1", "Ana Ruiz"),
+            (1, datetime(2024, 1, 1), PublicationType.DATA_PAPER, "Nebula, tag1", "Luis"),
+        ]
+        snapshot = ExploreFacetSnapshot(ttl_seconds=300, check_interval=60)
+
+        snapshot.ensure_fresh(repository)
+        snapshot.ensure_fresh(repository)
+        snapshot.ensure_fresh(repository)
+
+        assert repository.get_facet_rows.call_count == 1
+        assert repository.get_catalog_fingerprint.call_count == 1
+        assert snapshot.snapshot()["authors"] == ["Ana Ruiz", "Luis"]
+        assert snapshot.snapshot()["publication_types"] == {"data_paper": 1}
+
+    def test_facet_snapshot_endpoint_supports_etags(self, test_client, clean_database):
+        user = User(email="facets@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        TestExploreFullTextSearch._dataset(
+            user, "Orion nebula", "Photometry", "Nebula", [("Ana Ruiz", None)], datetime(2024, 1, 1)
+        )
+        db.session.commit()
+        explore_facets.clear()
+
+        response = test_client.get("/explore/facets")
+        facets = response.get_json()
+
+        assert response.status_code == 200
+        assert facets["tags"] == ["nebula"] and facets["authors"] == ["Ana Ruiz"]
+        cached = test_client.get("/explore/facets", headers={"If-None-Match": f'"{facets["version"]}"'})
+        assert cached.status_code == 304
+
+
+class TestExploreSerialization:
+    """
+    Explore results are serialized in a number of queries independent of the page size.
+    """
+
+    @pytest.fixture
+    def catalog(self, test_client, clean_database):
+        user = User(email="serialize@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        for i in range(12):
+            dataset = TestExploreFullTextSearch._dataset(
+                user,
+                f"Nebula survey {i}",
+                "Photometry",
+                "nebula, survey",
+                [(f"Author {i}", "Uni Sevilla"), ("Ana Ruiz", None)],
+                datetime(2024, 1, 1 + i),
+            )
+            dataset.hubfiles = [Hubfile(name=f"model{i}_{j}.uvl", checksum="abc", size=1024 * j + 1) for j in range(3)]
+        db.session.commit()
+        db.session.expunge_all()
+
+    @staticmethod
+    def _count_page_queries(page_size):
+        db.session.expunge_all()
+        with count_queries() as counter:
+            page = ExploreRepository().filter_page(page_size=page_size)
+            ExploreService().serialize_results(page.datasets)
+        return counter["queries"]
+
+    def test_serializer_matches_to_dict(self, test_client, catalog):
+        datasets = DataSet.query.order_by(DataSet.id).all()
+
+        with test_client.application.test_request_context("/explore"):
+            assert DataSetBatchSerializer().serialize(datasets) == [dataset.to_dict() for dataset in datasets]
+
+    def test_query_count_does_not_grow_with_page_size(self, test_client, catalog):
+        with test_client.application.test_request_context("/explore"):
+            # The first page also builds the in-memory recommendation index for the new catalog
+            self._count_page_queries(1)
+            assert self._count_page_queries(2) == self._count_page_queries(12)
+
+    def test_explore_endpoint_keeps_result_shape(self, test_client, catalog):
+        response = test_client.post("/explore", json={"page_size": 5})
+        dataset = response.get_json()["datasets"][0]
+
+        assert response.status_code == 200
+        assert dataset["files_count"] == 3
+        assert [author["name"] for author in dataset["authors"]] == ["Author 11", "Ana Ruiz"]
+        assert dataset["creator"] is None
+        assert isinstance(dataset["recommendations"], list)
+
+    def test_batches_follow_filter_order(self, test_client, catalog):
+        repository = ExploreRepository()
+        expected = [dataset.id for dataset in repository.filter(sorting="oldest")]
+        batches = list(repository.iter_batches(sorting="oldest", batch_size=5))
+
+        assert [len(batch) for batch in batches] == [5, 5, 2]
+        assert [dataset.id for batch in batches for dataset in batch] == expected
+
+    def test_explore_endpoint_streams_ndjson(self, test_client, catalog):
+        response = test_client.post(
+            "/explore", json={"page_size": 5, "sorting": "newest"}, headers={"Accept": "application/x-ndjson"}
+        )
+        lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+
+        assert response.status_code == 200
+        assert response.mimetype == "application/x-ndjson"
+        assert len(lines) == 12
+        assert lines[0]["title"] == "Nebula survey 11" and lines[0]["files_count"] == 3
+        assert "recommendations" in lines[0] and "creator" in lines[0]
+
+        invalid = test_client.post(
+            "/explore", json={"date_after": "yesterday"}, headers={"Accept": "application/x-ndjson"}
+        )
+        assert invalid.status_code == 400
+
+
+class TestExploreResultCache:
+    """
+    Criteria-keyed LRU/TTL cache of ordered result ids in ExploreService.
+    """
+
+    def test_equivalent_criteria_share_a_key(self):
+        assert criteria_key(query="Orion  nebula", tags=["Nebula", " orion"], author=" Ana Ruiz") == criteria_key(
+            query="orion nebula", tags=["orion", "nebula"], author="anaruiz"
+        )
+        # "224 ngc" and "ngc ngc 224" do not fuzzy-match "ngc224" like "ngc 224" does
+        assert criteria_key(query="ngc 224") != criteria_key(query="224 ngc")
+        assert criteria_key(query="ngc 224") != criteria_key(query="ngc ngc 224")
+        assert criteria_key(query="nebula") != criteria_key(query="nebula", sorting="oldest")
+        assert criteria_key(cursor=None, page_size=20) != criteria_key(cursor="abc", page_size=20)
+
+    def test_lru_eviction_ttl_and_counters(self):
+        cache = ExploreResultCache(max_entries=2, ttl_seconds=60)
+        cache.set("a", (1,))
+        cache.set("b", (2,))
+        assert cache.get("a") == (1,)
+        cache.set("c", (3,))
+
+        assert cache.get("b") is None
+        assert cache.stats()["evictions"] == 1
+        assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+        cache.ttl_seconds = 0
+        with patch("app.modules.explore.cache.time.monotonic", return_value=10**9):
+            assert cache.get("a") is None
+        assert len(cache) == 1
+
+    def test_disabled_cache_stores_nothing(self):
+        cache = ExploreResultCache(max_entries=0)
+        cache.set("a", (1,))
+        assert cache.get("a") is None and len(cache) == 0
+
+    def test_repeated_filter_skips_the_search_backend(self, test_client, clean_database):
+        user = User(email="cache@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        for i in range(3):
+            TestExploreFullTextSearch._dataset(
+                user, f"Nebula {i}", "Photometry", "nebula", [], datetime(2024, 1, 1 + i)
+            )
+        db.session.commit()
+        service = ExploreService()
+        expected = [dataset.id for dataset in service.filter(tags=["nebula"])]
+
+        with patch.object(service.search_backend, "search") as search:
+            assert [dataset.id for dataset in service.filter(tags=[" Nebula"])] == expected
+        search.assert_not_called()
+        assert explore_result_cache.stats()["hits"] == 1
+
+        with patch.object(service.search_backend, "search_page", wraps=service.search_backend.search_page) as page:
+            first = service.filter_page(page_size=2, with_total=True)
+            again = service.filter_page(page_size=2, with_total=True)
+        assert page.call_count == 1
+        assert [dataset.id for dataset in again.datasets] == [dataset.id for dataset in first.datasets]
+        assert again.next_cursor == first.next_cursor and again.total_estimate == 3
+
+    def test_dataset_changes_invalidate_the_cache(self, test_client, clean_database):
+        from app.modules.dataset.services import DataSetService
+
+        user = User(email="cache@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        dataset = TestExploreFullTextSearch._dataset(user, "Nebula", "Photometry", "nebula", [], datetime(2024, 1, 1))
+        db.session.commit()
+        service = ExploreService()
+        assert [found.id for found in service.filter()] == [dataset.id]
+
+        DataSetService().update_dsmetadata(dataset.ds_meta_data_id, dataset_doi=None)
+
+        assert len(explore_result_cache) == 0
+        assert service.filter() == []
+        invalidations = explore_result_cache.stats()["invalidations"]
+        DataSetService()._on_dataset_deleted(dataset.id)
+        assert explore_result_cache.stats()["invalidations"] == invalidations + 1
+
+    def test_cache_stats_endpoint(self, test_client, clean_database):
+        test_client.post("/explore", json={"sorting": "newest"})
+        test_client.post("/explore", json={"sorting": "newest"})
+
+        stats = test_client.get("/explore/cache/stats").get_json()
+        assert stats["misses"] == 1 and stats["hits"] == 1
+        assert stats["hit_ratio"] == 0.5
+
+
+class TestExploreConeSearch:
+    """
+    Cone search over the numeric observation coordinates and the (dec_zone, ra_deg) index.
+    """
+
+    POSITIONS = {
+        "M31": ("00:42:44.330", "+41:16:07.50"),
+        "M33": ("01:33:50.020", "+30:39:36.70"),
+        "M42": ("05:35:17.300", "-05:23:28.00"),
+        "wrap": ("23:59:30.000", "+41:00:00.00"),
+        "polaris": ("02:31:49.090", "+89:15:50.80"),
+    }
+
+    @pytest.fixture
+    def catalog(self, test_client, clean_database):
+        user = User(email="cone@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        datasets = {}
+        for name, (ra, dec) in self.POSITIONS.items():
+            dataset = TestExploreFullTextSearch._dataset(user, name, "Photometry", "sky", [], datetime(2024, 1, 1))
+            dataset.ds_meta_data.observation = Observation(
+                object_name=name, ra=ra, dec=dec, observation_date=date(2024, 1, 1)
+            )
+            datasets[name] = dataset
+        db.session.commit()
+        return datasets
+
+    @staticmethod
+    def _names(matches):
+        return [observation.object_name for _, observation, _ in matches]
+
+    def test_matches_brute_force_nearest_first(self, catalog):
+        observations = Observation.query.all()
+        for ra, dec, radius in [(10.68, 41.27, 1.0), (10.68, 41.27, 10.0), (0.5, 41.0, 2.0), (120.0, 89.0, 1.0)]:
+            expected = sorted(
+                (angular_separation(ra, dec, o.ra_deg, o.dec_deg), o.object_name)
+                for o in observations
+                if angular_separation(ra, dec, o.ra_deg, o.dec_deg) <= radius
+            )
+            assert self._names(ExploreRepository().cone_search(ra, dec, radius)) == [name for _, name in expected]
+
+    def test_cone_crossing_ra_zero(self, catalog):
+        assert self._names(ExploreRepository().cone_search(359.9, 41.0, 0.5)) == ["wrap"]
+
+    def test_unpublished_datasets_are_only_in_the_api_search(self, catalog):
+        catalog["M42"].ds_meta_data.dataset_doi = None
+        db.session.commit()
+
+        assert ExploreRepository().cone_search(83.82, -5.39, 0.5) == []
+        assert self._names(ExploreRepository().cone_search(83.82, -5.39, 0.5, published_only=False)) == ["M42"]
+
+    def test_cone_endpoint(self, test_client, catalog):
+        # The stored position of M31, so the nearest match is at zero separation
+        response = test_client.get("/explore/cone?ra=00:42:44.330&dec=%2B41:16:07.50&radius=10")
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert [dataset["title"] for dataset in data["datasets"]] == ["M31", "wrap"]
+        assert data["datasets"][0]["separation_deg"] < 0.001
+        assert data["datasets"][0]["observation"]["object_name"] == "M31"
+
+        assert test_client.get("/explore/cone?ra=10&dec=41").status_code == 400
+        assert test_client.get("/explore/cone?ra=10&dec=41&radius=90").status_code == 400
+
+
+class TestExploreObservationFilters:
+    """
+    Filters on the observation of each dataset (object, filter, date, magnitude),
+    backed by the composite indexes on Observation.
+    """
+
+    OBSERVATIONS = [
+        ("M31 R 2024 bright", "M31", "R", date(2024, 3, 1), 11.2),
+        ("M31 R 2024 faint", "M31", "R", date(2024, 5, 1), 13.5),
+        ("M31 V 2024", "M31", "V", date(2024, 3, 1), 10.0),
+        ("M31 R 2023", "M31", "R", date(2023, 12, 31), 11.0),
+        ("M33 R 2024", "M33", "R", date(2024, 6, 1), 9.0),
+        ("M31 no magnitude", "M31", "R", date(2024, 7, 1), None),
+    ]
+
+    @pytest.fixture
+    def catalog(self, test_client, clean_database):
+        user = User(email="observations@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        for day, (title, object_name, filter_used, observation_date, magnitude) in enumerate(self.OBSERVATIONS):
+            dataset = TestExploreFullTextSearch._dataset(
+                user, title, "Photometry", "sky", [], datetime(2024, 1, day + 1)
+            )
+            dataset.ds_meta_data.observation = Observation(
+                object_name=object_name,
+                ra="00:42:44.330",
+                dec="+41:16:07.50",
+                magnitude=magnitude,
+                observation_date=observation_date,
+                filter_used=filter_used,
+            )
+        # A dataset without observation is only excluded once an observation filter is set
+        TestExploreFullTextSearch._dataset(user, "No observation", "Photometry", "sky", [], datetime(2024, 2, 1))
+        db.session.commit()
+
+    @staticmethod
+    def _titles(datasets):
+        return sorted(dataset.ds_meta_data.title for dataset in datasets)
+
+    def test_combined_filters(self, catalog):
+        datasets = ExploreRepository().filter(
+            object_name="M31",
+            filter_used="R",
+            magnitude_max="12",
+            observed_after="2024-01-01",
+            observed_before="2024-12-31",
+        )
+
+        assert self._titles(datasets) == ["M31 R 2024 bright"]
+
+    def test_single_filters(self, catalog):
+        repository = ExploreRepository()
+
+        assert len(repository.filter(filter_used="R")) == 5
+        assert self._titles(repository.filter(magnitude_min=11, magnitude_max=11.5)) == [
+            "M31 R 2023",
+            "M31 R 2024 bright",
+        ]
+        assert self._titles(repository.filter(observed_before="2023-12-31")) == ["M31 R 2023"]
+        assert self._titles(repository.filter(observed_after="2024-06-01")) == ["M31 no magnitude", "M33 R 2024"]
+
+    def test_empty_filters_are_ignored(self, catalog):
+        datasets = ExploreRepository().filter(object_name="", filter_used=" ", magnitude_max="", observed_after=None)
+
+        assert len(datasets) == len(self.OBSERVATIONS) + 1
+
+    def test_invalid_values_raise(self):
+        with pytest.raises(ValueError):
+            observation_conditions(magnitude_max="bright")
+        with pytest.raises(ValueError):
+            observation_conditions(observed_after="2024-13-01")
+
+    def test_filters_are_part_of_the_cache_key(self, catalog):
+        service = ExploreService()
+
+        assert len(service.filter(filter_used="R")) == 5
+        assert len(service.filter(filter_used="V")) == 1
+        assert len(service.filter(filter_used="R", magnitude_max="12")) == 3
+
+    def test_explore_endpoint(self, test_client, catalog):
+        response = test_client.post(
+            "/explore", json={"object_name": "M31", "filter_used": "R", "magnitude_max": "12", "sorting": "oldest"}
+        )
+        data = response.get_json()
+
+        assert response.status_code == 200
+        assert [dataset["title"] for dataset in data["datasets"]] == ["M31 R 2024 bright", "M31 R 2023"]
+        assert test_client.post("/explore", json={"magnitude_min": "x"}).status_code == 400
+
+    def test_query_uses_the_composite_index_columns(self, catalog):
+        datasets, _ = ExploreRepository()._filtered_query(object_name="M31", filter_used="R", magnitude_max=12)
+        sql = str(datasets.statement.compile(dialect=mysql.dialect()))
+
+        assert "JOIN observation" in sql
+        assert "observation.object_name = " in sql
+        assert "observation.filter_used = " in sql
+        assert "observation.magnitude <= " in sql
+
+
+class TestExploreAutocomplete:
+    """
+    In-memory suggestions for the search box, ranked by downloads.
+    """
+
+    @staticmethod
+    def _index(**kwargs):
+        index = AutocompleteIndex(ttl_seconds=300, check_interval=60, **kwargs)
+        index.add(1, 50, titles=["Andromeda photometry"], objects=["M31"], authors=["Ana Ruiz"])
+        index.add(2, 5, titles=["Andromeda spectra"], objects=["M31"], authors=["Luis Ruiz"])
+        index.add(3, 20, titles=["Orion nebula"], objects=["M42"], authors=["Ana Ruiz"])
+        return index
+
+    @staticmethod
+    def _texts(suggestions):
+        return [suggestion["text"] for suggestion in suggestions]
+
+    def test_prefix_ranked_by_downloads(self):
+        index = self._index()
+
+        assert self._texts(index.suggest("andro")) == ["Andromeda photometry", "Andromeda spectra"]
+        assert self._texts(index.suggest("AN")) == ["Ana Ruiz", "Andromeda photometry", "Andromeda spectra"]
+        assert index.suggest("a") == []
+
+    def test_word_starts_and_shared_terms(self):
+        index = self._index()
+        suggestions = index.suggest("ruiz")
+
+        assert self._texts(suggestions) == ["Ana Ruiz", "Luis Ruiz"]
+        assert suggestions[0]["downloads"] == 70
+        assert index.suggest("m3", kind="object") == [{"text": "M31", "kind": "object", "downloads": 55}]
+        assert self._texts(index.suggest("neb")) == ["Orion nebula"]
+
+    def test_changes_replace_memoized_suggestions(self):
+        index = self._index()
+        assert self._texts(index.suggest("ruiz")) == ["Ana Ruiz", "Luis Ruiz"]
+
+        index.add(2, 500, titles=["Andromeda spectra"], objects=["M31"], authors=["Luis Ruiz"])
+        assert self._texts(index.suggest("ruiz")) == ["Luis Ruiz", "Ana Ruiz"]
+
+        index.remove(1)
+        index.remove(3)
+        assert self._texts(index.suggest("ruiz")) == ["Luis Ruiz"]
+        assert index.suggest("orion") == []
+
+    def test_memory_cap_keeps_the_most_downloaded_terms(self):
+        index = AutocompleteIndex(max_terms=10, ttl_seconds=300, check_interval=60)
+        for dataset_id in range(20):
+            index.add(dataset_id, dataset_id, titles=[f"Survey {dataset_id}"])
+
+        assert len(index) <= 10
+        assert self._texts(index.suggest("survey", limit=3)) == ["Survey 19", "Survey 18", "Survey 17"]
+
+    def test_rebuilt_from_repository_rows(self):
+        repository = Mock()
+        repository.get_published_fingerprint.return_value = (2, 2)
+        repository.get_autocomplete_rows.return_value = [
+            (1, 3, "Orion nebula", "M42", "Ana Ruiz"),
+            (1, 3, "Orion nebula", "M42", "Luis"),
+            (2, 9, "Pleiades", None, None),
+        ]
+        index = AutocompleteIndex(ttl_seconds=300, check_interval=60)
+
+        index.ensure_fresh(repository)
+        index.ensure_fresh(repository)
+
+        assert repository.get_autocomplete_rows.call_count == 1
+        assert self._texts(index.suggest("lu")) == ["Luis"]
+        assert self._texts(index.suggest("pl")) == ["Pleiades"]
+
+    def test_autocomplete_endpoint(self, test_client, clean_database):
+        user = User(email="autocomplete@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        dataset = TestExploreFullTextSearch._dataset(
+            user, "Orion nebula", "Photometry", "nebula", [("Ana Ruiz", None)], datetime(2024, 1, 1)
+        )
+        dataset.ds_meta_data.observation = Observation(
+            object_name="M42", ra="05:35:17.3", dec="-05:23:28", observation_date=date(2024, 1, 1)
+        )
+        db.session.commit()
+        autocomplete_index.clear()
+
+        data = test_client.get("/explore/autocomplete?q=ori").get_json()
+        assert data["suggestions"] == [{"text": "Orion nebula", "kind": "title", "downloads": 0}]
+        assert test_client.get("/explore/autocomplete?q=m4&kind=object").get_json()["suggestions"][0]["text"] == "M42"
+        assert test_client.get("/explore/autocomplete?q=ana&kind=tag").status_code == 400
+
+
+class TestExploreFuzzyNames:
+    """
+    Typo-tolerant author and object matching through the name_trigram table.
+    """
+
+    @pytest.fixture
+    def catalog(self, test_client, clean_database):
+        user = User(email="fuzzy@example.com", password="test1234")
+        db.session.add(user)
+        db.session.commit()
+        datasets = {
+            "andromeda": TestExploreFullTextSearch._dataset(
+                user, "Deep field", "Photometry", "sky", [("Jules Verne", None)], datetime(2024, 1, 1)
+            ),
+            "orion": TestExploreFullTextSearch._dataset(
+                user, "Nebula survey", "Photometry", "sky", [("Ana Ruíz", None)], datetime(2024, 2, 1)
+            ),
+        }
+        datasets["andromeda"].ds_meta_data.observation = Observation(
+            object_name="Andromeda", ra="00:42:44.330", dec="+41:16:07.50", observation_date=date(2024, 1, 1)
+        )
+        db.session.commit()
+        return datasets
+
+    def test_author_filter_tolerates_typos(self, catalog):
+        repository = ExploreRepository()
+
+        assert repository.filter_ids(author="Julse Verne") == [catalog["andromeda"].id]
+        assert repository.filter_ids(author="ana ruiz") == [catalog["orion"].id]
+        assert repository.filter_ids(author="Verne") == [catalog["andromeda"].id]
+        assert repository.filter_ids(author="Carl Sagan") == []
+
+    def test_query_tolerates_misspelled_object(self, catalog):
+        assert ExploreRepository().filter_ids(query="Andromda") == [catalog["andromeda"].id]
+
+    def test_scan_when_fuzzy_names_are_off(self, catalog):
+        repository = ExploreRepository()
+        repository.fuzzy_names = False
+
+        assert repository.filter_ids(author="Verne") == [catalog["andromeda"].id]
+        assert repository.filter_ids(author="Julse Verne") == []
+
+    def test_trigrams_follow_edits(self, catalog):
+        author = catalog["andromeda"].ds_meta_data.authors[0]
+        author.name = "Carl Sagan"
+        db.session.commit()
+        repository = ExploreRepository()
+
+        assert repository.filter_ids(author="Carl Sagn") == [catalog["andromeda"].id]
+        assert repository.filter_ids(author="Jules Verne") == []
+
+    def test_fuzzy_name_search_ranks_by_similarity(self, catalog):
+        repository = ExploreRepository()
+        meta_ids = [meta_id for meta_id, _ in repository.fuzzy_name_search("Andromda")]
+
+        assert meta_ids == [catalog["andromeda"].ds_meta_data_id]
+        assert repository.fuzzy_name_search("Verne")[0][1] == 1.0
+        assert repository.fuzzy_name_search("ju") == []
+        assert ExploreRepository.name_matches("a.b") is None
@@ -0,0 +1,95 @@
+"""
+Hand file downloads over to the web server in front of the app.
+
+With DOWNLOAD_OFFLOAD set, a download view still authorizes the request and
+records the download, but answers with an empty response carrying the file
+location: nginx serves X-Accel-Redirect from an internal location
+(DOWNLOAD_OFFLOAD_PREFIX, /_protected_uploads/ in docker/nginx), Apache
+(mod_xsendfile) and lighttpd serve X-Sendfile from the absolute path. The
+gunicorn worker is free again as soon as the headers are sent, however slow
+the client is, and the web server handles Range requests itself.
+"""
+
+import mimetypes
+import os
+import unicodedata
+from urllib.parse import quote
+
+from flask import Response, request
+
+OFFLOAD_X_ACCEL_REDIRECT = "x-accel-redirect"
+OFFLOAD_X_SENDFILE = "x-sendfile"
+OFFLOAD_MODES = (OFFLOAD_X_ACCEL_REDIRECT, OFFLOAD_X_SENDFILE)
+
+
+def attachment_headers(response: Response, download_name: str):
+    """Content-Disposition for download_name, with an RFC 5987 filename* when it is not ASCII (as send_file does)."""
+    try:
+        download_name.encode("ascii")
+    except UnicodeEncodeError:
+        simple = unicodedata.normalize("NFKD", download_name).encode("ascii", "ignore").decode("ascii")
+        quoted = quote(download_name, safe="!#$&+^`|~")
+        value = {"filename": simple, "filename*": f"UTF-8''{quoted}"}
+        response.headers.set("Content-Disposition", "attachment", **value)
+    else:
+        response.headers.set("Content-Disposition", "attachment", filename=download_name)
+
+
+class DownloadOffload:
+    """
+    DOWNLOAD_OFFLOAD picks the header (x-accel-redirect or x-sendfile; empty
+    or anything else keeps serving from Python). Only files under
+    DOWNLOAD_OFFLOAD_ROOT (the uploads folder by default) are offloaded,
+    which is also what the internal nginx location exposes.
+    """
+
+    def __init__(self, mode: str = None, root: str = None, internal_prefix: str = None):
+        if mode is None:
+            mode = os.getenv("DOWNLOAD_OFFLOAD", "")
+        if root is None:
+            root = os.getenv("DOWNLOAD_OFFLOAD_ROOT") or os.path.join(os.getenv("WORKING_DIR", ""), "uploads")
+        if internal_prefix is None:
+            internal_prefix = os.getenv("DOWNLOAD_OFFLOAD_PREFIX", "/_protected_uploads/")
+        mode = mode.strip().lower()
+        self.mode = mode if mode in OFFLOAD_MODES else None
+        self.root = os.path.realpath(root)
+        self.internal_prefix = "/" + internal_prefix.strip("/") + "/"
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode is not None
+
+    def response(self, path: str, download_name: str, mimetype: str = None, etag: str = None):
+        """
+        Empty attachment response telling the web server to send path (or a
+        304 when the request's validators match etag and the file mtime), or
+        None when offloading is off or path is not a file under root (the
+        caller then serves it itself).
+        """
+        if not self.enabled:
+            return None
+        path = os.path.realpath(path)
+        if os.path.commonpath([path, self.root]) != self.root or not os.path.isfile(path):
+            return None
+
+        if mimetype is None:
+            mimetype = mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+        response = Response(mimetype=mimetype)
+        attachment_headers(response, download_name)
+        if self.mode == OFFLOAD_X_ACCEL_REDIRECT:
+            relative = os.path.relpath(path, self.root).replace(os.sep, "/")
+            response.headers["X-Accel-Redirect"] = self.internal_prefix + quote(relative)
+        else:
+            response.headers["X-Sendfile"] = path
+        if etag:
+            response.set_etag(etag)
+        response.last_modified = os.path.getmtime(path)
+        response.make_conditional(request)
+        if response.status_code != 200:
+            # The web server would send the file whatever the status, so only a 200 may carry the header
+            response.headers.pop("X-Accel-Redirect", None)
+            response.headers.pop("X-Sendfile", None)
+        return response
+
+
+download_offload = DownloadOffload()
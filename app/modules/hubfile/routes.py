@@ -1,8 +1,6 @@
-import io
+import logging
 import os
 import uuid
-import zipfile
-from datetime import datetime, timezone
 
 # Note: FlamaPy removed — export will return original files only
 from flask import (
@@ -13,18 +11,20 @@ from flask import (
     redirect,
     render_template,
     request,
-    send_file,
     send_from_directory,
     url_for,
 )
 from flask_login import current_user, login_required
 
-from app import db
+from app.modules.dataset.archives import dataset_archive_cache
+from app.modules.dataset.tracking import FILE_DOWNLOAD, FILE_VIEW, tracking_buffer
 from app.modules.hubfile import hubfile_bp
-from app.modules.hubfile.models import HubfileDownloadRecord, HubfileViewRecord
-from app.modules.hubfile.services import HubfileDownloadRecordService, HubfileService
+from app.modules.hubfile.offload import download_offload
+from app.modules.hubfile.services import HubfileService
 from app.modules.jsonChecker import validate_json_file
 
+logger = logging.getLogger(__name__)
+
 
 @hubfile_bp.route("/file/download/<int:file_id>", methods=["GET"])
 def download_file(file_id):
@@ -35,28 +35,33 @@ def download_file(file_id):
     parent_directory_path = os.path.dirname(current_app.root_path)
     file_path = os.path.join(parent_directory_path, directory_path)
 
+    # The stored checksum hashes the content, so it is a strong ETag: with the
+    # file mtime, it answers If-None-Match / If-Modified-Since with 304 and
+    # lets clients resume with Range (206)
+    resp = download_offload.response(os.path.join(file_path, filename), filename, etag=file.checksum)
+    if resp is None:
+        resp = make_response(
+            send_from_directory(directory=file_path, path=filename, as_attachment=True, etag=file.checksum or True)
+        )
+
+    # Revalidations (304) and failed preconditions (412) send no file, so they are not downloads
+    if resp.status_code not in (200, 206):
+        return resp
+    # Werkzeug only advertises ranges on range requests; clients check it before resuming
+    resp.headers["Accept-Ranges"] = "bytes"
+
     # Get the cookie from the request or generate a new one if it does not
     # exist
     user_cookie = request.cookies.get("file_download_cookie")
     if not user_cookie:
         user_cookie = str(uuid.uuid4())
 
-    # Check if the download record already exists for this cookie
-    existing_record = HubfileDownloadRecord.query.filter_by(
-        user_id=current_user.id if current_user.is_authenticated else None, file_id=file_id, download_cookie=user_cookie
-    ).first()
-
-    if not existing_record:
-        # Record the download in your database
-        HubfileDownloadRecordService().create(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            file_id=file_id,
-            download_date=datetime.now(timezone.utc),
-            download_cookie=user_cookie,
-        )
+    # Record the download (once per cookie), written by tracking_buffer in the background
+    tracking_buffer.record(
+        FILE_DOWNLOAD, file_id, user_cookie, user_id=current_user.id if current_user.is_authenticated else None
+    )
 
     # Save the cookie to the user's browser
-    resp = make_response(send_from_directory(directory=file_path, path=filename, as_attachment=True))
     resp.set_cookie("file_download_cookie", user_cookie)
 
     return resp
@@ -113,23 +118,10 @@ def view_file(file_id):
             if not user_cookie:
                 user_cookie = str(uuid.uuid4())
 
-            # Check if the view record already exists for this cookie
-            existing_record = HubfileViewRecord.query.filter_by(
-                user_id=current_user.id if current_user.is_authenticated else None,
-                file_id=file_id,
-                view_cookie=user_cookie,
-            ).first()
-
-            if not existing_record:
-                # Register file view
-                new_view_record = HubfileViewRecord(
-                    user_id=current_user.id if current_user.is_authenticated else None,
-                    file_id=file_id,
-                    view_date=datetime.now(),
-                    view_cookie=user_cookie,
-                )
-                db.session.add(new_view_record)
-                db.session.commit()
+            # Register file view (once per cookie), written by tracking_buffer in the background
+            tracking_buffer.record(
+                FILE_VIEW, file_id, user_cookie, user_id=current_user.id if current_user.is_authenticated else None
+            )
 
             # Prepare response
             payload = {"success": True, "content": content}
@@ -238,48 +230,35 @@ def download_all_saved():
     if not user_cookie:
         user_cookie = str(uuid.uuid4())
 
-    # Creamos un ZIP en memoria
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, "w") as zipf:
-        for file in saved_files:
-            try:
-                dataset = file.get_dataset()
-                # Construimos la ruta al archivo original
-                directory_path = f"uploads/user_{dataset.user_id}/dataset_{dataset.id}/"
-                parent_directory_path = os.path.dirname(current_app.root_path)
-                original_path = os.path.join(parent_directory_path, directory_path, file.name)
-
-                # Add the original file into the ZIP if it exists
-                if os.path.exists(original_path):
-                    zipf.write(original_path, arcname=file.name)
-                else:
-                    print(f"Warning: File not found {original_path}")
-
-                # Creación del registro de descarga (opcional)
-                existing_record = HubfileDownloadRecord.query.filter_by(
-                    user_id=current_user.id, file_id=file.id, download_cookie=user_cookie
-                ).first()
-
-                if not existing_record:
-                    HubfileDownloadRecordService().create(
-                        user_id=current_user.id,
-                        file_id=file.id,
-                        download_date=datetime.now(timezone.utc),
-                        download_cookie=user_cookie,
-                    )
-
-            except Exception as e:
-                print(f"Error processing file {file.id} for export: {e}")
+    # Ficheros que entran en el ZIP, con su ruta original
+    included, entries = [], []
+    for file in saved_files:
+        try:
+            dataset = file.get_dataset()
+            # Construimos la ruta al archivo original
+            directory_path = f"uploads/user_{dataset.user_id}/dataset_{dataset.id}/"
+            parent_directory_path = os.path.dirname(current_app.root_path)
+            original_path = os.path.join(parent_directory_path, directory_path, file.name)
+
+            # Files missing on disk are left out of the ZIP
+            if not os.path.exists(original_path):
+                logger.warning(f"Saved file {file.id} not found at {original_path}")
                 continue
+            included.append(file)
+            entries.append((original_path, file.name))
 
-    zip_buffer.seek(0)
-    resp = make_response(
-        send_file(
-            zip_buffer,
-            mimetype="application/zip",
-            as_attachment=True,
-            download_name=f"saved_files_JSON.zip",
-        )
-    )
+            # Creación del registro de descarga (opcional)
+            tracking_buffer.record(FILE_DOWNLOAD, file.id, user_cookie, user_id=current_user.id)
+
+        except Exception as e:
+            logger.warning(f"Error processing file {file.id} for export: {e}")
+            continue
+
+    if not included:
+        return "No saved files to download.", 404
+
+    # The archive cache is keyed by the files alone, so the same selection is
+    # zipped once, then served (or offloaded) like a dataset download
+    resp = dataset_archive_cache.response(included, entries, "saved_files_JSON.zip", offload=download_offload)
     resp.set_cookie("file_download_cookie", user_cookie)
     return resp
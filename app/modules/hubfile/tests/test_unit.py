@@ -1,5 +1,14 @@
+import hashlib
+import os
+import shutil
+
 import pytest
 
+from app import db
+from app.modules.auth.models import User
+from app.modules.dataset.models import DataSet, DSMetaData, PublicationType
+from app.modules.hubfile.models import Hubfile, HubfileDownloadRecord
+
 
 @pytest.fixture(scope="module")
 def test_client(test_client):
@@ -23,3 +32,84 @@ def test_sample_assertion(test_client):
     """
     greeting = "Hello, World!"
     assert greeting == "Hello, World!", "The greeting does not coincide with 'Hello, World!'"
+
+
+class TestDownloadFileConditional:
+    """ETag, conditional GET and Range handling of /file/download/<id>."""
+
+    CONTENT = b"features\n    Andromeda\n        optional\n            M31\n"
+
+    @pytest.fixture
+    def hubfile(self, test_client):
+        # Set up and torn down in their own app contexts: requests made while
+        # one is pushed would pop it out of order
+        with test_client.application.app_context():
+            user = User.query.filter_by(email="test@example.com").first()
+            meta = DSMetaData(title="Conditional", description="Photometry", publication_type=PublicationType.NONE)
+            dataset = DataSet(user_id=user.id, ds_meta_data=meta)
+            file = Hubfile(name="andromeda.uvl", checksum=hashlib.md5(self.CONTENT).hexdigest(), size=len(self.CONTENT))
+            dataset.hubfiles.append(file)
+            db.session.add(dataset)
+            db.session.commit()
+
+            directory = os.path.join(
+                os.path.dirname(test_client.application.root_path),
+                "uploads",
+                f"user_{user.id}",
+                f"dataset_{dataset.id}",
+            )
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, file.name), "wb") as f:
+                f.write(self.CONTENT)
+
+            file_id, dataset_id, checksum = file.id, dataset.id, file.checksum
+
+        yield file_id, checksum
+
+        shutil.rmtree(directory, ignore_errors=True)
+        with test_client.application.app_context():
+            HubfileDownloadRecord.query.filter_by(file_id=file_id).delete()
+            db.session.delete(db.session.get(DataSet, dataset_id))
+            db.session.commit()
+
+    @staticmethod
+    def _downloads(test_client, file_id):
+        with test_client.application.app_context():
+            return HubfileDownloadRecord.query.filter_by(file_id=file_id).count()
+
+    def test_strong_etag_and_revalidation(self, test_client, hubfile):
+        file_id, checksum = hubfile
+
+        response = test_client.get(f"/file/download/{file_id}")
+        assert response.status_code == 200
+        assert response.headers["ETag"] == f'"{checksum}"'
+        assert response.headers["Accept-Ranges"] == "bytes"
+        assert response.data == self.CONTENT
+        assert self._downloads(test_client, file_id) == 1
+
+        test_client.delete_cookie("file_download_cookie")
+        response = test_client.get(f"/file/download/{file_id}", headers={"If-None-Match": f'"{checksum}"'})
+        assert response.status_code == 304
+        assert response.data == b""
+
+        last_modified = test_client.get(f"/file/download/{file_id}").headers["Last-Modified"]
+        test_client.delete_cookie("file_download_cookie")
+        response = test_client.get(f"/file/download/{file_id}", headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+        assert self._downloads(test_client, file_id) == 2
+
+    def test_byte_ranges(self, test_client, hubfile):
+        file_id, checksum = hubfile
+
+        response = test_client.get(f"/file/download/{file_id}", headers={"Range": "bytes=9-"})
+        assert response.status_code == 206
+        assert response.data == self.CONTENT[9:]
+        assert response.headers["Content-Range"] == f"bytes 9-{len(self.CONTENT) - 1}/{len(self.CONTENT)}"
+
+        # A resumed download whose file changed in between gets the whole new file
+        response = test_client.get(f"/file/download/{file_id}", headers={"Range": "bytes=9-", "If-Range": '"stale"'})
+        assert response.status_code == 200
+        assert response.data == self.CONTENT
+
+        response = test_client.get(f"/file/download/{file_id}", headers={"Range": "bytes=9999-"})
+        assert response.status_code == 416
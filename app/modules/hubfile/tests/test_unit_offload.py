@@ -0,0 +1,102 @@
+import io
+import os
+import zipfile
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from flask import Flask
+
+from app.modules.dataset.archives import DatasetArchiveCache, iter_zip
+from app.modules.hubfile.offload import DownloadOffload
+
+
+class TestDownloadOffload:
+
+    @staticmethod
+    def _uploads(tmp_path):
+        directory = tmp_path / "uploads" / "user_1" / "dataset_2"
+        directory.mkdir(parents=True)
+        (directory / "m31 photometry.uvl").write_text("features\n    M31\n")
+        (tmp_path / "secret.txt").write_text("not an upload")
+        return tmp_path / "uploads", directory / "m31 photometry.uvl"
+
+    def test_off_by_default(self, tmp_path):
+        root, path = self._uploads(tmp_path)
+        offload = DownloadOffload(mode="", root=str(root))
+
+        with Flask(__name__).test_request_context():
+            assert not offload.enabled
+            assert offload.response(str(path), path.name) is None
+
+    def test_x_accel_redirect_points_to_the_internal_location(self, tmp_path):
+        root, path = self._uploads(tmp_path)
+        offload = DownloadOffload(mode="X-Accel-Redirect", root=str(root), internal_prefix="_protected_uploads")
+
+        with Flask(__name__).test_request_context():
+            response = offload.response(str(path), path.name, etag="abc123")
+
+        assert response.status_code == 200
+        assert response.get_data() == b""
+        assert response.headers["X-Accel-Redirect"] == "/_protected_uploads/user_1/dataset_2/m31%20photometry.uvl"
+        assert response.headers["Content-Disposition"] == 'attachment; filename="m31 photometry.uvl"'
+        assert response.headers["ETag"] == '"abc123"'
+        assert "X-Sendfile" not in response.headers
+
+    def test_x_sendfile_and_revalidation(self, tmp_path):
+        root, path = self._uploads(tmp_path)
+        offload = DownloadOffload(mode="x-sendfile", root=str(root))
+
+        with Flask(__name__).test_request_context():
+            assert offload.response(str(path), "Ñebula.uvl").headers["X-Sendfile"] == os.path.realpath(path)
+            disposition = offload.response(str(path), "Ñebula.uvl").headers["Content-Disposition"]
+        assert "filename=Nebula.uvl" in disposition and "filename*=UTF-8''%C3%91ebula.uvl" in disposition
+
+        with Flask(__name__).test_request_context(headers={"If-None-Match": '"abc123"'}):
+            response = offload.response(str(path), path.name, etag="abc123")
+        assert response.status_code == 304
+        assert "X-Sendfile" not in response.headers
+
+    def test_only_files_under_the_root_are_offloaded(self, tmp_path):
+        root, path = self._uploads(tmp_path)
+        offload = DownloadOffload(mode="x-accel-redirect", root=str(root))
+
+        with Flask(__name__).test_request_context():
+            assert offload.response(str(root / ".." / "secret.txt"), "secret.txt") is None
+            assert offload.response(str(path.parent / "missing.uvl"), "missing.uvl") is None
+
+    def test_archives_are_streamed_then_offloaded_once_cached(self, tmp_path):
+        root, path = self._uploads(tmp_path)
+        offload = DownloadOffload(mode="x-accel-redirect", root=str(root))
+        cache = DatasetArchiveCache(directory=str(root / "archives"), max_bytes=10**6)
+        hubfiles = [SimpleNamespace(name=path.name, checksum="abc123", size=path.stat().st_size)]
+        entries = [(str(path), path.name)]
+
+        with Flask(__name__).test_request_context():
+            streamed = cache.response(hubfiles, entries, "dataset_2.zip", offload=offload)
+            assert streamed.is_streamed
+            assert "X-Accel-Redirect" not in streamed.headers
+            body = b"".join(streamed.response)
+            response = cache.response(hubfiles, entries, "dataset_2.zip", offload=offload)
+
+        key = cache.archive_key(hubfiles)
+        assert zipfile.ZipFile(io.BytesIO(body)).namelist() == [path.name]
+        assert response.headers["X-Accel-Redirect"] == f"/_protected_uploads/archives/{key}.zip"
+        assert response.mimetype == "application/zip"
+        assert os.path.isfile(cache.path_for(key))
+
+    def test_archives_with_missing_files_are_streamed_once(self, tmp_path):
+        root, path = self._uploads(tmp_path)
+        offload = DownloadOffload(mode="x-accel-redirect", root=str(root))
+        cache = DatasetArchiveCache(directory=str(root / "archives"), max_bytes=10**6)
+        hubfiles = [SimpleNamespace(name=path.name, checksum="abc123", size=path.stat().st_size)]
+        entries = [(str(path), path.name), (str(path.parent / "missing.uvl"), "missing.uvl")]
+
+        with patch("app.modules.dataset.archives.iter_zip", wraps=iter_zip) as zipped:
+            with Flask(__name__).test_request_context():
+                response = cache.response(hubfiles, entries, "dataset_2.zip", offload=offload)
+                body = b"".join(response.response)
+
+        assert zipped.call_count == 1
+        assert "X-Accel-Redirect" not in response.headers
+        assert zipfile.ZipFile(io.BytesIO(body)).namelist() == [path.name]
+        assert cache.get(cache.archive_key(hubfiles)) is None
@@ -5,3 +5,10 @@ from core.repositories.BaseRepository import BaseRepository
 class UserProfileRepository(BaseRepository):
     def __init__(self):
         super().__init__(UserProfile)
+
+    def get_by_user_ids(self, user_ids) -> dict:
+        """{user_id: profile} for several users in one query; users without a profile are left out."""
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        return {profile.user_id: profile for profile in self.model.query.filter(self.model.user_id.in_(user_ids))}
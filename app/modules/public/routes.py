@@ -3,6 +3,7 @@ import logging
 from flask import render_template
 
 from app.modules.dataset.services import DataSetService
+from app.modules.dataset.services_recommendations import recommendation_service
 from app.modules.profile.models import UserProfile
 from app.modules.public import public_bp
 
@@ -27,23 +28,12 @@ def index():
     latest_datasets = dataset_service.latest_synchronized()
     logger.info(f"Found {len(latest_datasets)} latest datasets")
 
-    # Get recommendations for each dataset
+    # Get recommendations for each dataset (precomputed rows, one pass)
     recommendations_map = {}
     try:
-        for dataset in latest_datasets:
-            logger.info(
-                f"Getting recommendations for dataset {
-                    dataset.id}: "
-                f"{
-                    dataset.ds_meta_data.title}"
-            )
-            recommendations = dataset_service.get_recommendations(dataset.id, limit=3)
-            logger.info(
-                f"Found {
-                    len(recommendations)} recommendations for dataset {
-                    dataset.id}"
-            )
-            recommendations_map[dataset.id] = recommendations
+        recommendations_map = recommendation_service.get_for_datasets(
+            [dataset.id for dataset in latest_datasets], limit=3, commit=False
+        )
     except Exception as e:
         logger.error(f"Error getting recommendations: {e}", exc_info=True)
 
@@ -64,7 +54,7 @@ def index():
                 exc_info=True,
             )
 
-    return render_template(
+    page = render_template(
         "public/index.html",
         datasets=latest_datasets,
         recommendations_map=recommendations_map,
@@ -72,3 +62,6 @@ def index():
         total_dataset_downloads=total_dataset_downloads,
         total_dataset_views=total_dataset_views,
     )
+    # Refreshed recommendations are committed once the page no longer reads the loaded datasets
+    recommendation_service.repository.session.commit()
+    return page
@@ -0,0 +1,31 @@
+from flask import Response, current_app, request, stream_with_context
+
+NDJSON_MIMETYPE = "application/x-ndjson"
+
+_END = object()
+
+
+def wants_ndjson() -> bool:
+    """True when the client prefers newline-delimited JSON over a single JSON document."""
+    return request.accept_mimetypes.best_match(["application/json", NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(rows) -> Response:
+    """
+    Stream an iterable of JSON-serializable rows, one per line.
+
+    The first row is produced before the response is returned, so a failing
+    query still ends in a proper error status; the rest is generated while
+    the client reads, inside the request context.
+    """
+    rows = iter(rows)
+    first = next(rows, _END)
+
+    def generate():
+        if first is _END:
+            return
+        yield current_app.json.dumps(first) + "\n"
+        for row in rows:
+            yield current_app.json.dumps(row) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,50 @@
+"""materialized dataset recommendations
+
+Revision ID: 002_dataset_recommendation
+Revises: 001_reset
+Create Date: 2026-10-17 10:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+
+revision = '002_dataset_recommendation'
+down_revision = '001_reset'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rows are filled lazily: a dataset without a state row is materialized
+    # the first time its recommendations are read.
+    op.create_table(
+        'dataset_recommendation',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('dataset_id', sa.Integer(), nullable=False),
+        sa.Column('recommended_dataset_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=False),
+        sa.Column('downloads', sa.Integer(), nullable=False),
+        sa.Column('coincidences', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['recommended_dataset_id'], ['data_set.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('dataset_id', 'rank', name='uq_dataset_recommendation_dataset_id_rank'),
+    )
+    op.create_index(
+        'ix_dataset_recommendation_recommended_dataset_id', 'dataset_recommendation', ['recommended_dataset_id']
+    )
+    op.create_table(
+        'dataset_recommendation_state',
+        sa.Column('dataset_id', sa.Integer(), nullable=False),
+        sa.Column('is_stale', sa.Boolean(), nullable=False),
+        sa.Column('download_tier1_max', sa.Integer(), nullable=True),
+        sa.Column('download_tier2_max', sa.Integer(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('dataset_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('dataset_recommendation_state')
+    op.drop_table('dataset_recommendation')
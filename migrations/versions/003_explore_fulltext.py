@@ -0,0 +1,38 @@
+"""full-text indexes for explore search
+
+Revision ID: 003_explore_fulltext
+Revises: 002_dataset_recommendation
+Create Date: 2026-10-17 12:00:00.000000
+"""
+from alembic import op
+
+revision = '003_explore_fulltext'
+down_revision = '002_dataset_recommendation'
+branch_labels = None
+depends_on = None
+
+
+def _is_mysql():
+    return op.get_bind().dialect.name in ('mysql', 'mariadb')
+
+
+def upgrade():
+    # SQLite runs keep an FTS5 table maintained by triggers instead (see ExploreRepository)
+    if not _is_mysql():
+        return
+    op.create_index(
+        'ft_ds_meta_data_title_description_tags',
+        'ds_meta_data',
+        ['title', 'description', 'tags'],
+        mysql_prefix='FULLTEXT',
+    )
+    op.create_index(
+        'ft_author_name_affiliation_orcid', 'author', ['name', 'affiliation', 'orcid'], mysql_prefix='FULLTEXT'
+    )
+
+
+def downgrade():
+    if not _is_mysql():
+        return
+    op.drop_index('ft_author_name_affiliation_orcid', table_name='author')
+    op.drop_index('ft_ds_meta_data_title_description_tags', table_name='ds_meta_data')
@@ -0,0 +1,20 @@
+"""index for keyset pagination of explore results
+
+Revision ID: 004_explore_keyset_index
+Revises: 003_explore_fulltext
+Create Date: 2026-10-17 13:00:00.000000
+"""
+from alembic import op
+
+revision = '004_explore_keyset_index'
+down_revision = '003_explore_fulltext'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_data_set_created_at_id', 'data_set', ['created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_data_set_created_at_id', table_name='data_set')
@@ -0,0 +1,61 @@
+"""normalized tags for datasets
+
+Revision ID: 005_dataset_tags
+Revises: 004_explore_keyset_index
+Create Date: 2026-10-17 14:00:00.000000
+"""
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import mysql
+
+revision = '005_dataset_tags'
+down_revision = '004_explore_keyset_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tag = op.create_table(
+        'tag',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column(
+            'name',
+            sa.String(length=120).with_variant(mysql.VARCHAR(120, collation='utf8mb4_bin'), 'mysql', 'mariadb'),
+            nullable=False,
+        ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    dataset_tag = op.create_table(
+        'dataset_tag',
+        sa.Column('dataset_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['dataset_id'], ['data_set.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tag_id'], ['tag.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('dataset_id', 'tag_id'),
+    )
+    op.create_index('ix_dataset_tag_tag_id_dataset_id', 'dataset_tag', ['tag_id', 'dataset_id'])
+
+    # Backfill from the comma-separated DSMetaData.tags, normalized like
+    # app.modules.dataset.recommendation_index.normalize_tags
+    query = sa.text(
+        'SELECT d.id, m.tags FROM data_set d JOIN ds_meta_data m ON m.id = d.ds_meta_data_id '
+        'WHERE m.tags IS NOT NULL'
+    )
+    rows = op.get_bind().execute(query).fetchall()
+
+    tag_ids = {}
+    links = []
+    for dataset_id, tag_string in rows:
+        for name in sorted({name.strip().lower() for name in tag_string.split(',')} - {''}):
+            tag_id = tag_ids.setdefault(name, len(tag_ids) + 1)
+            links.append({'dataset_id': dataset_id, 'tag_id': tag_id})
+
+    if tag_ids:
+        op.bulk_insert(tag, [{'id': tag_id, 'name': name} for name, tag_id in tag_ids.items()])
+        op.bulk_insert(dataset_tag, links)
+
+
+def downgrade():
+    op.drop_table('dataset_tag')
+    op.drop_table('tag')
@@ -0,0 +1,77 @@
+"""numeric observation coordinates for cone search
+
+Revision ID: 006_observation_coordinates
+Revises: 005_dataset_tags
+Create Date: 2026-10-17 16:00:00.000000
+"""
+import math
+import re
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = '006_observation_coordinates'
+down_revision = '005_dataset_tags'
+branch_labels = None
+depends_on = None
+
+# Same parsing and zone height as app.modules.dataset.sky
+ZONE_HEIGHT = 0.5
+_SEXAGESIMAL = re.compile(r'^\s*([+-]?)(\d{1,3})[:\s]+(\d{1,2})[:\s]+(\d{1,2}(?:\.\d*)?)\s*$')
+
+
+def _sexagesimal(value):
+    match = _SEXAGESIMAL.match(value or '')
+    if not match:
+        return None
+    sign, units, minutes, seconds = match.groups()
+    if int(minutes) >= 60 or float(seconds) >= 60:
+        return None
+    magnitude = int(units) + int(minutes) / 60 + float(seconds) / 3600
+    return -magnitude if sign == '-' else magnitude
+
+
+def _coordinates(ra, dec):
+    hours = _sexagesimal(ra)
+    ra_deg = hours * 15.0 if hours is not None and 0 <= hours < 24 else None
+    dec_deg = _sexagesimal(dec)
+    if dec_deg is not None and not -90 <= dec_deg <= 90:
+        dec_deg = None
+    zone = None
+    if dec_deg is not None:
+        zone = min(int(math.floor((dec_deg + 90.0) / ZONE_HEIGHT)), int(180 / ZONE_HEIGHT) - 1)
+    return ra_deg, dec_deg, zone
+
+
+def upgrade():
+    op.add_column('observation', sa.Column('ra_deg', sa.Float(), nullable=True))
+    op.add_column('observation', sa.Column('dec_deg', sa.Float(), nullable=True))
+    op.add_column('observation', sa.Column('dec_zone', sa.Integer(), nullable=True))
+    op.create_index('ix_observation_dec_zone_ra_deg', 'observation', ['dec_zone', 'ra_deg'])
+
+    # DEC is a reserved word in MySQL: go through a table construct so it gets quoted
+    observation = sa.table(
+        'observation',
+        sa.column('id', sa.Integer()),
+        sa.column('ra', sa.String()),
+        sa.column('dec', sa.String()),
+        sa.column('ra_deg', sa.Float()),
+        sa.column('dec_deg', sa.Float()),
+        sa.column('dec_zone', sa.Integer()),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(sa.select(observation.c.id, observation.c.ra, observation.c.dec)).fetchall()
+    for observation_id, ra, dec in rows:
+        ra_deg, dec_deg, zone = _coordinates(ra, dec)
+        bind.execute(
+            observation.update()
+            .where(observation.c.id == observation_id)
+            .values(ra_deg=ra_deg, dec_deg=dec_deg, dec_zone=zone)
+        )
+
+
+def downgrade():
+    op.drop_index('ix_observation_dec_zone_ra_deg', table_name='observation')
+    op.drop_column('observation', 'dec_zone')
+    op.drop_column('observation', 'dec_deg')
+    op.drop_column('observation', 'ra_deg')
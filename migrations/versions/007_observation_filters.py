@@ -0,0 +1,32 @@
+"""indexes for observation filters in explore
+
+Revision ID: 007_observation_filters
+Revises: 006_observation_coordinates
+Create Date: 2026-10-17 17:00:00.000000
+"""
+from alembic import op
+
+revision = '007_observation_filters'
+down_revision = '006_observation_coordinates'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_observation_object_filter_date_magnitude',
+        'observation',
+        ['object_name', 'filter_used', 'observation_date', 'magnitude'],
+    )
+    op.create_index(
+        'ix_observation_filter_date_magnitude', 'observation', ['filter_used', 'observation_date', 'magnitude']
+    )
+    op.create_index('ix_observation_date_magnitude', 'observation', ['observation_date', 'magnitude'])
+    op.create_index('ix_observation_magnitude', 'observation', ['magnitude'])
+
+
+def downgrade():
+    op.drop_index('ix_observation_magnitude', table_name='observation')
+    op.drop_index('ix_observation_date_magnitude', table_name='observation')
+    op.drop_index('ix_observation_filter_date_magnitude', table_name='observation')
+    op.drop_index('ix_observation_object_filter_date_magnitude', table_name='observation')
@@ -0,0 +1,65 @@
+"""name trigrams for fuzzy author and object search
+
+Revision ID: 008_name_trigrams
+Revises: 007_observation_filters
+Create Date: 2026-10-17 18:00:00.000000
+"""
+import re
+
+import sqlalchemy as sa
+import unidecode
+from alembic import op
+
+revision = '008_name_trigrams'
+down_revision = '007_observation_filters'
+branch_labels = None
+depends_on = None
+
+# Same normalization and padding as app.modules.dataset.trigrams
+_NOT_ALPHANUMERIC = re.compile(r'[^a-z0-9]+')
+BATCH_SIZE = 5000
+
+
+def _trigrams(name):
+    term = _NOT_ALPHANUMERIC.sub('', unidecode.unidecode(name or '').lower())[:255]
+    if not term:
+        return term, set()
+    padded = '$$' + term + '$'
+    return term, {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def upgrade():
+    name_trigram = op.create_table(
+        'name_trigram',
+        sa.Column('kind', sa.String(length=16), nullable=False),
+        sa.Column('trigram', sa.String(length=3), nullable=False),
+        sa.Column('ds_meta_data_id', sa.Integer(), nullable=False),
+        sa.Column('term', sa.String(length=255), nullable=False),
+        sa.ForeignKeyConstraint(['ds_meta_data_id'], ['ds_meta_data.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('kind', 'trigram', 'ds_meta_data_id', 'term'),
+    )
+    op.create_index('ix_name_trigram_ds_meta_data_id', 'name_trigram', ['ds_meta_data_id'])
+
+    bind = op.get_bind()
+    names = bind.execute(
+        sa.text(
+            "SELECT ds_meta_data_id, 'author', name FROM author WHERE ds_meta_data_id IS NOT NULL "
+            "UNION ALL "
+            "SELECT ds_meta_data_id, 'object', object_name FROM observation WHERE ds_meta_data_id IS NOT NULL"
+        )
+    ).fetchall()
+    rows = set()
+    for ds_meta_data_id, kind, name in names:
+        term, trigrams = _trigrams(name)
+        rows.update((kind, trigram, ds_meta_data_id, term) for trigram in trigrams)
+    rows = [
+        {'kind': kind, 'trigram': trigram, 'ds_meta_data_id': ds_meta_data_id, 'term': term}
+        for kind, trigram, ds_meta_data_id, term in rows
+    ]
+    for start in range(0, len(rows), BATCH_SIZE):
+        op.bulk_insert(name_trigram, rows[start : start + BATCH_SIZE])
+
+
+def downgrade():
+    op.drop_index('ix_name_trigram_ds_meta_data_id', table_name='name_trigram')
+    op.drop_table('name_trigram')
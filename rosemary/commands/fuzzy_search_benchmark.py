@@ -0,0 +1,47 @@
+import click
+from flask.cli import with_appcontext
+
+from app.modules.dataset.benchmarks import write_report
+from app.modules.explore.benchmarks import DEFAULT_AUTHORS, run_fuzzy_search_benchmark
+
+
+@click.command(
+    "explore:benchmark-fuzzy",
+    help="Benchmarks the trigram author filter against the substring scan and writes a JSON report.",
+)
+@click.option("--authors", default=DEFAULT_AUTHORS, show_default=True, help="Author rows in the synthetic catalog.")
+@click.option("--sample", default=50, show_default=True, help="Authors looked up per query kind.")
+@click.option("--seed", default=0, show_default=True, help="Seed of the synthetic catalog.")
+@click.option(
+    "--output",
+    default="benchmarks/fuzzy_search.json",
+    show_default=True,
+    type=click.Path(dir_okay=False),
+    help="Where to write the JSON report.",
+)
+@click.option("--keep", is_flag=True, help="Keep the synthetic datasets in the database afterwards.")
+@click.option("-y", "--yes", is_flag=True, help="Confirm the operation without prompting.")
+@with_appcontext
+def fuzzy_search_benchmark(authors, sample, seed, output, keep, yes):
+    if not yes:
+        click.confirm(
+            click.style(
+                f"This inserts a synthetic catalog with about {authors} authors into the configured database. "
+                "Continue?",
+                fg="yellow",
+            ),
+            abort=True,
+        )
+
+    report = run_fuzzy_search_benchmark(authors=authors, sample=sample, seed=seed, keep=keep)
+    write_report(report, output)
+
+    for result in report["results"]:
+        click.echo(click.style(f"{result['authors']} authors in {result['size']} datasets", fg="green"))
+        for name, metrics in result["variants"].items():
+            click.echo(
+                f"  {name:<20} p50 {metrics['latency_ms']['p50']:>10} ms  "
+                f"recall {result['recall'][name]:>6}  queries {metrics['queries']['mean']:>5}"
+            )
+        click.echo(f"  speedup (p50): {result['speedup_p50']}")
+    click.echo(click.style(f"Report written to {output}", fg="blue"))
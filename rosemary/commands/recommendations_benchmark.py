@@ -0,0 +1,55 @@
+import click
+from flask.cli import with_appcontext
+
+from app.modules.dataset.benchmarks import DEFAULT_SIZES, run_recommendation_benchmark, write_report
+
+
+@click.command(
+    "recommendations:benchmark",
+    help="Benchmarks the recommender against synthetic catalogs and writes a JSON report.",
+)
+@click.option(
+    "--sizes",
+    default=",".join(str(size) for size in DEFAULT_SIZES),
+    show_default=True,
+    help="Comma-separated catalog sizes.",
+)
+@click.option("--sample", default=50, show_default=True, help="Datasets queried per catalog.")
+@click.option("--limit", default=10, show_default=True, help="Recommendations requested per dataset.")
+@click.option("--seed", default=0, show_default=True, help="Seed of the synthetic catalogs.")
+@click.option(
+    "--output",
+    default="benchmarks/recommendations.json",
+    show_default=True,
+    type=click.Path(dir_okay=False),
+    help="Where to write the JSON report.",
+)
+@click.option("--keep", is_flag=True, help="Keep the synthetic datasets in the database afterwards.")
+@click.option("-y", "--yes", is_flag=True, help="Confirm the operation without prompting.")
+@with_appcontext
+def recommendations_benchmark(sizes, sample, limit, seed, output, keep, yes):
+    try:
+        sizes = [int(size) for size in sizes.split(",") if size.strip()]
+    except ValueError:
+        raise click.BadParameter("sizes must be comma-separated integers", param_hint="--sizes")
+
+    if not yes:
+        click.confirm(
+            click.style(
+                f"This inserts synthetic catalogs of {sizes} datasets into the configured database. Continue?",
+                fg="yellow",
+            ),
+            abort=True,
+        )
+
+    report = run_recommendation_benchmark(sizes=sizes, sample=sample, limit=limit, seed=seed, keep=keep)
+    write_report(report, output)
+
+    for result in report["results"]:
+        click.echo(click.style(f"{result['size']} datasets ({result['download_records']} downloads)", fg="green"))
+        for name, metrics in result["variants"].items():
+            click.echo(
+                f"  {name:<30} p50 {metrics['latency_ms']['p50']:>10} ms  "
+                f"queries {metrics['queries']['mean']:>7}  peak {metrics['peak_memory_kb']:>10} KiB"
+            )
+    click.echo(click.style(f"Report written to {output}", fg="blue"))
@@ -0,0 +1,41 @@
+import json
+
+import click
+from flask.cli import with_appcontext
+
+from app.modules.dataset.services import DataSetService
+
+
+@click.command(
+    "recommendations:recall",
+    help="Reports the recall of the approximate (MinHash/LSH) recommendation engine against the exact one.",
+)
+@click.option("-k", "--k", "k", default=10, show_default=True, help="Number of recommendations compared.")
+@click.option("--sample", default=200, show_default=True, help="Number of datasets sampled from the catalog.")
+@click.option("--seed", default=0, show_default=True, help="Seed of the dataset sample.")
+@click.option("--output", type=click.Path(dir_okay=False), help="Also write the report to this JSON file.")
+@with_appcontext
+def recommendations_recall(k, sample, seed, output):
+    report = DataSetService().recommendation_recall_report(k=k, sample_size=sample, seed=seed)
+
+    if not report["evaluated"]:
+        click.echo(click.style("No dataset with tag/author neighbours to evaluate.", fg="yellow"))
+        return
+
+    click.echo(
+        click.style(
+            f"Recall@{k}: mean {report['mean_recall_at_k']}, min {report['min_recall_at_k']} "
+            f"over {report['evaluated']} datasets",
+            fg="green",
+        )
+    )
+    click.echo(
+        f"Candidates: {report['mean_approximate_candidates']} approximate vs "
+        f"{report['mean_exact_candidates']} exact on average "
+        f"({report['permutations']} permutations, {report['bands']} bands)"
+    )
+
+    if output:
+        with open(output, "w") as f:
+            json.dump(report, f, indent=2)
+        click.echo(click.style(f"Report written to {output}", fg="blue"))
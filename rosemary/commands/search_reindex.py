@@ -0,0 +1,19 @@
+import click
+from flask.cli import with_appcontext
+
+from app.modules.explore.search_backends import create_search_backend
+
+
+@click.command("search:reindex", help="Rebuilds the explore search index of the configured SEARCH_BACKEND.")
+@with_appcontext
+def search_reindex():
+    backend = create_search_backend()
+    if backend.name == "sql":
+        click.echo(
+            click.style("The SQL search backend queries the database directly, nothing to reindex.", fg="yellow")
+        )
+        return
+
+    click.echo(f"Reindexing datasets in the {backend.name} search backend...")
+    indexed = backend.reindex()
+    click.echo(click.style(f"{indexed} datasets indexed.", fg="green"))